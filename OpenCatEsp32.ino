@@ -29,6 +29,8 @@
 // #define ROBOT_ARM                 // for attaching head clip arm
 #include "src/OpenCat.h"
 #include "src/turn.h"
+#include "src/planUpload.h"
+#include "src/binaryFrames.h"
 
 
 void setup() {
@@ -55,10 +57,16 @@ void loop() {
   readEnvironment();  // update the gyro data
   //  //— special behaviors based on sensor events
   dealWithExceptions();  // low battery, fall over, lifted, etc.
-  print6Axis();
+  if (binaryFrames) {
+    sendImuFrame();  // Binary IMU frames instead of the ICM: text line
+  } else {
+    print6Axis();
+  }
   
   // Check turn progress every loop iteration
   checkTurnProgress();
+  // Start the next step of an uploaded plan when its time is up
+  checkPlanProgress();
   
   if (!tQueue->cleared()) {
     tQueue->popTask();
@@ -70,6 +78,12 @@ void loop() {
     if (token == 'e') {
       startTurnRight90(); // Right turn
     }
+    if (newCmdIdx && token == PLAN_TOKEN) {
+      uploadPlan(newCmd); // Whole motion plan in one line; only once per received command
+    }
+    if (newCmdIdx && token == FRAME_TOKEN) {
+      setFrameMode(newCmd); // "F1" binary IMU frames, "F0" back to text
+    }
     
 #ifdef QUICK_DEMO
     if (moduleList[moduleIndex] == EXTENSION_QUICK_DEMO)
@@ -0,0 +1,218 @@
+# ackTracker.py
+# Matches the tokens OpenCat echoes back to the commands that were sent, so
+# every command gets a measured round trip instead of being fire-and-forget.
+# Latencies go into per-command histograms (p50/p95/p99) and the number of
+# commands still waiting for their echo is the queue depth: when it keeps
+# growing, the link or the firmware cannot keep up with the send rate.
+#
+# The echoes are read by an ImuReader, which passes every non-IMU line to the
+# tracker, so the tracker itself never reads from the port.
+
+import math
+import threading
+import time
+from collections import deque
+
+# --- Tracker Configuration ---
+ACK_TIMEOUT = 2.0          # A command not echoed within this long is counted as lost
+MIN_LATENCY = 0.0001       # Lower edge of the first histogram bucket (seconds)
+BUCKET_GROWTH = 1.1        # Each bucket is 10% wider than the one before it
+BUCKET_COUNT = 128         # Up to MIN_LATENCY * BUCKET_GROWTH ** BUCKET_COUNT (about 20 s)
+SATURATED_DEPTH = 8        # Warn when this many commands are waiting for their echo
+
+
+def command_name(command):
+    """
+    Returns the name latencies of a command are filed under: the skill for
+    'k' commands ('kwkF', 'kbalance', 'kvtR' for 'k vtR 90') and the first
+    word otherwise ('i3' for 'i3 45', 'd', 'gb').
+    """
+    words = command.decode(errors="ignore").split()
+    if not words:
+        return None
+    if words[0] == 'k' and len(words) > 1:
+        return 'k' + words[1]
+    return words[0]
+
+
+class LatencyHistogram:
+    """
+    A fixed-size histogram of latencies with logarithmic buckets, so it costs
+    the same memory after a minute or a day. Percentiles are accurate to one
+    bucket (10%).
+    """
+
+    def __init__(self):
+        self.buckets = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency):
+        index = 0
+        if latency > MIN_LATENCY:
+            index = min(int(math.log(latency / MIN_LATENCY, BUCKET_GROWTH)), BUCKET_COUNT - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    def percentile(self, fraction):
+        """Returns the latency below which fraction (0..1) of the samples fall, or None."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for index, hits in enumerate(self.buckets):
+            seen += hits
+            if seen >= rank:
+                # Upper edge of the bucket, but never more than the worst sample.
+                return min(MIN_LATENCY * BUCKET_GROWTH ** (index + 1), self.max)
+        return self.max
+
+    def merge(self, other):
+        """Adds the samples of another histogram (e.g. from another robot) to this one."""
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+class AckTracker:
+    """
+    Wraps a serial connection and times every command until its echo arrives.
+
+    Commands are acknowledged in order, so a pending queue is enough to match
+    them: an echo acknowledges the oldest pending command with that token, and
+    any older commands it skips over were lost. Like CommandWriter, every
+    other attribute is forwarded to the wrapped connection, so the tracker can
+    be passed anywhere a serial object is expected; wrap it in a
+    CommandWriter (not the other way round) so only commands that really go
+    out are tracked.
+
+    Args:
+        ser: The serial connection (or FakeBittle).
+        reader: A running ImuReader on the same connection; the tracker
+            registers itself as a listener. Without one, feed it lines with
+            on_line(line, t).
+        timeout: Seconds after which an unanswered command is counted as lost.
+    """
+
+    def __init__(self, ser, reader=None, timeout=ACK_TIMEOUT):
+        self.ser = ser
+        self.timeout = timeout
+        self.pending = deque()     # (token, name, time sent), oldest first
+        self.histograms = {}       # command name -> LatencyHistogram
+        self.overall = LatencyHistogram()
+        self.sent = 0
+        self.acknowledged = 0
+        self.lost = 0
+        self.lost_at = {}          # command name -> send time of its newest lost command
+        self.max_depth = 0
+        self._saturated = False
+        self._lock = threading.Lock()
+        if reader is not None:
+            reader.add_listener(self.on_line)
+
+    def __getattr__(self, name):
+        return getattr(self.ser, name)
+
+    def write(self, data):
+        """Sends data (one or more newline-terminated commands) and starts their clocks."""
+        written = self.ser.write(data)
+        now = time.monotonic()
+        with self._lock:
+            for command in data.split(b'\n'):
+                name = command_name(command)
+                if name is None:
+                    continue
+                self.pending.append((name[0], name, now))
+                self.sent += 1
+            self._expire(now)
+            depth = len(self.pending)
+            self.max_depth = max(self.max_depth, depth)
+        if depth >= SATURATED_DEPTH and not self._saturated:
+            print(f"WARNING: {depth} commands waiting for an echo; the robot is not keeping up.")
+        self._saturated = depth >= SATURATED_DEPTH
+        return written
+
+    def on_line(self, line, t):
+        """ImuReader listener: matches an echoed token to the oldest pending command."""
+        if len(line) != 1:
+            return
+        with self._lock:
+            for position, (token, name, sent_at) in enumerate(self.pending):
+                if token == line:
+                    break
+            else:
+                return  # An echo for something we did not send (another script, a reset)
+            for _ in range(position):
+                self._lose(self.pending.popleft())
+            self.pending.popleft()
+            latency = t - sent_at
+            self.histograms.setdefault(name, LatencyHistogram()).add(latency)
+            self.overall.add(latency)
+            self.acknowledged += 1
+
+    def _expire(self, now):
+        while self.pending and now - self.pending[0][2] > self.timeout:
+            self._lose(self.pending.popleft())
+
+    def _lose(self, entry):
+        _, name, sent_at = entry
+        self.lost += 1
+        self.lost_at[name] = sent_at
+
+    def lost_since(self, command, since):
+        """
+        True if a command with the same name as command, sent at or after
+        since (time.monotonic()), was lost. CommandWriter asks this before
+        it skips a resend.
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            sent_at = self.lost_at.get(command_name(command))
+        return sent_at is not None and sent_at >= since
+
+    def depth(self):
+        """Returns how many commands are still waiting for their echo."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self.pending)
+
+    def saturated(self):
+        """True when the queue is deep enough that the robot is falling behind."""
+        return self.depth() >= SATURATED_DEPTH
+
+    def wait_idle(self, timeout=ACK_TIMEOUT):
+        """Waits until every command sent so far has been echoed (or lost). Returns True if idle."""
+        deadline = time.monotonic() + timeout
+        while self.depth() and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return self.depth() == 0
+
+    def summary(self):
+        """Returns a one-line description of the round trips so far."""
+        p50, p95, p99 = (self.overall.percentile(f) for f in (0.5, 0.95, 0.99))
+        if p50 is None:
+            return f"{self.sent} commands sent, none acknowledged"
+        return (f"{self.acknowledged}/{self.sent} acknowledged, {self.lost} lost, "
+                f"round trip p50 {1000 * p50:.1f} ms  p95 {1000 * p95:.1f} ms  p99 {1000 * p99:.1f} ms, "
+                f"max queue depth {self.max_depth}")
+
+    def print_report(self):
+        """Prints the latency percentiles per command."""
+        print("\n--- COMMAND ROUND TRIPS ---")
+        print(f"  {'command':<12} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+        with self._lock:
+            rows = sorted(self.histograms.items())
+        for name, histogram in rows + [("all", self.overall)]:
+            if not histogram.count:
+                continue
+            p50, p95, p99 = (1000 * histogram.percentile(f) for f in (0.5, 0.95, 0.99))
+            print(f"  {name:<12} {histogram.count:>6} {p50:7.1f}ms {p95:7.1f}ms {p99:7.1f}ms "
+                  f"{1000 * histogram.max:7.1f}ms")
+        print(f"  {self.summary()}")
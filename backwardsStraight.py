@@ -1,24 +1,25 @@
-import cv2
 import serial
 import time
-import numpy as np
 from serial.tools import list_ports
 
+from connection import prepare_connection
+from discovery import find_bittle_ports
 
-ports = list_ports.comports()
-for port in ports:
-    print(f"{port.device}: {port.description}")
+
+def print_serial_ports():
+    # Shown when no Bittle port is found, to help pick SERIAL_PORT by hand.
+    for port in list_ports.comports():
+        print(f"{port.device}: {port.description}")
 
 
 def auto_detect_bittle_port():
-    ports = list_ports.comports()
-    for port in ports:
-        if "CH340" in port.description or "USB-SERIAL" in port.description or "Bittle" in port.description:
-            return port.device
-    return None
+    # The first Bittle-looking port; fleet.py uses all of them.
+    ports = find_bittle_ports()
+    return ports[0] if ports else None
 
 # --- SERIAL CONFIGURATION ---
-SERIAL_PORT =auto_detect_bittle_port()
+# None = auto-detect when connecting (not at import, which would scan the ports).
+SERIAL_PORT = None
 BAUD_RATE = 115200
 
 # --- DURATIONS (seconds) ---
@@ -36,20 +37,19 @@ SPIN_RIGHT = b'kcrR\n'
 REST = b'd\n'
 
 def connect_to_bittle():
+    port = SERIAL_PORT or auto_detect_bittle_port()
+    if not port:
+        print("❌ No Bittle port found. Available ports:")
+        print_serial_ports()
+        return None
     try:
-        ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
-        print(f"Opened port {SERIAL_PORT}, testing communication...")
-        time.sleep(2)  # Let the serial settle
-
-        # Try sending a basic command to test communication
-        ser.write(BALANCE)
-        time.sleep(0.5)
-        
-        # Attempt to read response (not all commands respond, so this is soft validation)
-        if ser.in_waiting:
-            response = ser.readline().decode(errors='ignore').strip()
-            print(f"Received from Bittle: {response}")
-            print(f"✅ Confirmed connection to Bittle on {SERIAL_PORT}")
+        ser = serial.Serial(port, BAUD_RATE, timeout=1)
+        print(f"Opened port {port}, testing communication...")
+
+        # Send a basic command as soon as the firmware is up and wait for its
+        # echo (soft validation: we carry on either way)
+        if prepare_connection(ser, [BALANCE]):
+            print(f"✅ Confirmed connection to Bittle on {port}")
         else:
             print("⚠️ No response from device — Bittle may not be connected or silent.")
 
@@ -86,12 +86,23 @@ def backward_pattern(bittle, step_idx):
         time.sleep(0.1)
 
 def main():
+    # The GUI is only imported once it is actually used.
+    import cv2
+    from hud import Hud
+
     print("STARTING MAIN")
     bittle = connect_to_bittle()
     if not bittle:
         print("⚠️ Could not connect to Bittle. Continuing with GUI only.")
 
-    control_window = np.zeros((200, 400, 3), dtype=np.uint8)
+    # The help text is rendered once; the window is only redrawn when the
+    # connection line changes.
+    control_window = Hud("Bittle Control")
+    control_window.add_text("Bittle Driver Control", (10, 30), 0.8, (255,255,255), 2)
+    control_window.add_text("w/s: forward/back", (10, 70))
+    control_window.add_text("a/d: spin L/R", (10, 100))
+    control_window.add_text("space: stop | q: quit", (10, 130))
+    control_window.add_text(f"Balance every {BALANCE_INTERVAL}s", (10, 160), 0.5, (0,255,0), 1)
     current_mode = None
     last_balance_time = time.time()
     backward_step = 0
@@ -104,17 +115,9 @@ def main():
     try:
         print("Entering main loop...")
         while True:
-            window = control_window.copy()
-            cv2.putText(window, "Bittle Driver Control", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255,255,255), 2)
-            cv2.putText(window, "w/s: forward/back", (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 1)
-            cv2.putText(window, "a/d: spin L/R", (10, 100), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 1)
-            cv2.putText(window, "space: stop | q: quit", (10, 130), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 1)
-            cv2.putText(window, f"Balance every {BALANCE_INTERVAL}s", (10, 160), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 1)
-
-            if not bittle:
-                cv2.putText(window, "Not connected to Bittle", (10, 190), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-
-            cv2.imshow("Bittle Control", window)
+            control_window.set_status("connection", None if bittle else "Not connected to Bittle",
+                                      (10, 190), 0.6, (0, 0, 255), 2)
+            control_window.refresh()
             key = cv2.waitKey(1) & 0xFF
 
             # Handle keypresses
@@ -0,0 +1,81 @@
+#ifndef BINARY_FRAMES_H
+#define BINARY_FRAMES_H
+// Optional binary IMU output. After "F1" the IMU sample is sent as a
+// fixed-layout frame instead of the "ICM:" text line of print6Axis();
+// "F0" switches back to text. Everything else (echoes, turn and plan
+// messages) stays text. Frame layout, all little-endian:
+//
+//   0xA5 0x5A | length | type | payload (length bytes) | CRC-16
+//
+// type 1 (IMU): uint32 millis(), float ax, ay, az, yaw, pitch, roll (28 bytes).
+// The CRC is CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) over length, type
+// and payload. The host decodes it in binaryFrames.py.
+// Copy this file next to turn.h in src/ (see OpenCatEsp32.ino).
+
+#define FRAME_TOKEN 'F'       // Change if it collides with a token of your OpenCat version
+#define FRAME_SYNC_1 0xA5
+#define FRAME_SYNC_2 0x5A
+#define FRAME_IMU 1
+#define FRAME_INTERVAL 5      // Milliseconds between IMU frames (200 Hz fits 115200 baud)
+
+struct __attribute__((packed)) ImuFrame {
+  uint8_t sync[2];
+  uint8_t length;
+  uint8_t type;
+  uint32_t ms;
+  float values[6];            // ax, ay, az, yaw, pitch, roll
+  uint16_t crc;
+};
+
+bool binaryFrames = false;
+unsigned long lastFrameTime = 0;
+
+uint16_t frameCrc(const uint8_t *data, int length) {
+  uint16_t crc = 0xFFFF;
+  for (int i = 0; i < length; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (int bit = 0; bit < 8; bit++)
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+  }
+  return crc;
+}
+
+void setFrameMode(char *args) {
+  binaryFrames = (atoi(args) == 1);
+  PTL(binaryFrames ? "Binary frames on" : "Binary frames off");
+}
+
+void sendImuFrame() {
+  if (millis() - lastFrameTime < FRAME_INTERVAL) return;
+  lastFrameTime = millis();
+
+  float *ypr = NULL;
+  float *accel = NULL;
+#ifdef IMU_ICM42670
+  if (icmQ) {
+    ypr = icm.ypr;
+    accel = icm.a_real;
+  }
+#endif
+#ifdef IMU_MPU6050
+  if (mpuQ) {
+    ypr = mpu.ypr;
+    accel = mpu.a_real;
+  }
+#endif
+  if (ypr == NULL) return;
+
+  ImuFrame frame;
+  frame.sync[0] = FRAME_SYNC_1;
+  frame.sync[1] = FRAME_SYNC_2;
+  frame.length = sizeof(frame.ms) + sizeof(frame.values);
+  frame.type = FRAME_IMU;
+  frame.ms = lastFrameTime;
+  for (int i = 0; i < 3; i++) {
+    frame.values[i] = accel[i];
+    frame.values[3 + i] = ypr[i];
+  }
+  frame.crc = frameCrc(&frame.length, 2 + frame.length);
+  Serial.write((uint8_t *)&frame, sizeof(frame));
+}
+#endif
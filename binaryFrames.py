@@ -0,0 +1,232 @@
+# binaryFrames.py
+# Host side of the binary IMU frames in binaryFrames.h. Instead of an
+# "ICM:\t..." text line that has to be decoded, split and float()-ed on every
+# sample, the firmware can send each IMU sample as a fixed-layout frame:
+#
+#   A5 5A | length | type | payload (length bytes) | CRC-16 (little-endian)
+#
+# The IMU payload (type 1) is uint32 millis() followed by six float32 values,
+# ax ay az yaw pitch roll, all little-endian. The CRC is CRC-16/CCITT-FALSE
+# over length, type and payload, so a frame damaged on a noisy Bluetooth
+# link is dropped instead of producing a wild yaw.
+#
+# Frames share the stream with the ordinary text output (command echoes,
+# turn.h messages), and text never contains the 0xA5 sync byte, so
+# split_stream can take both apart. ImuReader always parses both: if the
+# firmware does not know the frame token it simply keeps sending text, and
+# nothing else changes. Commands stay ASCII; they are a few bytes a second.
+#
+# The gain is modest: a frame is 34 bytes against about 39 for the text line
+# (roughly 12% more samples fit through the link) and decodes somewhat
+# faster. What it mainly buys is the CRC. The drawing scripts therefore stay
+# on text; this tool switches frames on to measure them, and off again.
+#
+# Usage:
+#   python binaryFrames.py --bench            # parsing cost, text vs. binary
+#   python binaryFrames.py --fake             # stream frames from a simulated robot
+#   python binaryFrames.py --port /dev/tty.BittleC4_SSP --seconds 10
+
+import argparse
+import binascii
+import struct
+import time
+from collections import namedtuple
+
+# --- Command Definitions ---
+FRAMES_ON = b'F1\n'        # FRAME_TOKEN in binaryFrames.h, then the mode
+FRAMES_OFF = b'F0\n'
+
+# --- Frame Format ---
+SYNC = b'\xa5\x5a'
+FRAME_HEADER = struct.Struct('<2sBB')      # sync, payload length, frame type
+FRAME_CRC = struct.Struct('<H')
+IMU_PAYLOAD = struct.Struct('<I6f')        # millis(), ax, ay, az, yaw, pitch, roll
+FRAME_IMU = 1
+IMU_FRAME = struct.Struct('<2sBBI6fH')     # A whole IMU frame, for decoding runs of them at once
+IMU_PREFIX = SYNC + bytes((IMU_PAYLOAD.size, FRAME_IMU))
+MAX_PAYLOAD = 64                           # Longer "frames" are sync bytes inside noise
+CRC_INIT = 0xFFFF
+
+# --- Fallback Configuration ---
+ENABLE_TIMEOUT = 1.0       # Seconds to wait for the first frame after FRAMES_ON
+
+# --- Link Configuration ---
+BAUD_RATE = 115200
+BYTES_PER_SECOND = BAUD_RATE / 10    # 8N1: ten bits on the wire per byte
+
+# One IMU frame as the firmware sent it; ms is the robot's millis().
+ImuSample = namedtuple('ImuSample', ['ms', 'ax', 'ay', 'az', 'yaw', 'pitch', 'roll'])
+
+
+def frame_crc(data):
+    """CRC-16/CCITT-FALSE of data, as computed by frameCrc() in binaryFrames.h."""
+    return binascii.crc_hqx(data, CRC_INIT)
+
+
+def encode_frame(kind, payload):
+    """Wraps payload in a frame of the given type."""
+    body = bytes((len(payload), kind)) + payload
+    return SYNC + body + FRAME_CRC.pack(frame_crc(body))
+
+
+def encode_imu_frame(ms, ax, ay, az, yaw, pitch, roll):
+    """Builds the IMU frame the firmware sends for one sample."""
+    return encode_frame(FRAME_IMU, IMU_PAYLOAD.pack(ms & 0xFFFFFFFF, ax, ay, az, yaw, pitch, roll))
+
+
+def split_stream(buffer):
+    """
+    Takes a mixed stream of text lines and binary frames apart.
+
+    Args:
+        buffer: Bytes read from the robot, starting where the previous call
+            left off.
+
+    Returns:
+        (items, rest, errors): items in stream order, each either a text line
+        (bytes, without the newline) or an ImuSample; rest is the incomplete
+        tail to pass back in with the next read; errors counts frames
+        dropped for a bad CRC or length.
+    """
+    items = []
+    errors = 0
+    pos = 0
+    size = len(buffer)
+    while pos < size:
+        sync = buffer.find(SYNC, pos)
+        text_end = size if sync < 0 else sync
+        newline = buffer.find(b'\n', pos, text_end)
+        while newline >= 0:
+            items.append(buffer[pos:newline])
+            pos = newline + 1
+            newline = buffer.find(b'\n', pos, text_end)
+        if sync < 0:
+            break
+        if sync > pos:
+            # Text cut off by a frame; the firmware never does that, so it is noise.
+            items.append(buffer[pos:sync])
+            pos = sync
+
+        # Fast path: a run of back-to-back IMU frames, the usual case once
+        # binary mode is on, is unpacked in one iter_unpack pass.
+        run = sync
+        while run + IMU_FRAME.size <= size and buffer.startswith(IMU_PREFIX, run):
+            run += IMU_FRAME.size
+        if run > sync:
+            crc_end = IMU_FRAME.size - FRAME_CRC.size
+            for offset, fields in zip(range(sync, run, IMU_FRAME.size),
+                                      IMU_FRAME.iter_unpack(memoryview(buffer)[sync:run])):
+                if frame_crc(buffer[offset + 2:offset + crc_end]) == fields[-1]:
+                    items.append(ImuSample._make(fields[3:10]))
+                else:
+                    errors += 1
+            pos = run
+            continue
+
+        if size - sync < FRAME_HEADER.size:
+            break
+        _, length, kind = FRAME_HEADER.unpack_from(buffer, sync)
+        if length > MAX_PAYLOAD:
+            errors += 1
+            pos = sync + 1
+            continue
+        end = sync + FRAME_HEADER.size + length + FRAME_CRC.size
+        if end > size:
+            break
+        if frame_crc(buffer[sync + 2:end - FRAME_CRC.size]) != FRAME_CRC.unpack_from(buffer, end - FRAME_CRC.size)[0]:
+            # Resynchronise on the next sync pattern after this one.
+            errors += 1
+            pos = sync + 1
+            continue
+        if kind == FRAME_IMU and length == IMU_PAYLOAD.size:
+            items.append(ImuSample._make(IMU_PAYLOAD.unpack_from(buffer, sync + FRAME_HEADER.size)))
+        pos = end
+    return items, buffer[pos:], errors
+
+
+def enable_binary_frames(ser, reader, timeout=ENABLE_TIMEOUT):
+    """
+    Asks the firmware to switch its IMU output to binary frames and waits
+    for the first one to reach reader.
+
+    Returns:
+        True if frames are arriving; False if the firmware did not answer
+        with any, in which case the text protocol just carries on.
+    """
+    frames = reader.binary_frames
+    ser.write(FRAMES_ON)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if reader.binary_frames > frames:
+            print("INFO: Receiving binary IMU frames.")
+            return True
+        time.sleep(0.02)
+    print("WARNING: The firmware sent no binary frames; staying on the text protocol.")
+    return False
+
+
+def benchmark(samples):
+    """Times decoding samples IMU samples as text lines and as binary frames."""
+    from imuReader import parse_imu_line
+
+    text = b''.join(f"ICM:\t0.{i % 97:02d} -0.02 9.80 {i % 360}.25 1.50 -0.75\n".encode()
+                    for i in range(samples))
+    binary = b''.join(encode_imu_frame(i * 5, 0.01 * (i % 97), -0.02, 9.8, (i % 360) + 0.25, 1.5, -0.75)
+                      for i in range(samples))
+
+    # Both go through split_stream, as they do in ImuReader.
+    began = time.perf_counter()
+    lines, _, _ = split_stream(text)
+    parsed = sum(1 for raw in lines if parse_imu_line(raw.decode(errors="ignore").strip()) is not None)
+    text_time = time.perf_counter() - began
+
+    began = time.perf_counter()
+    items, _, _ = split_stream(binary)
+    binary_time = time.perf_counter() - began
+
+    print(f"\n--- PARSING {samples} IMU SAMPLES ---")
+    for name, data, count, seconds in (("text", text, parsed, text_time), ("binary", binary, len(items), binary_time)):
+        per_sample = len(data) / samples
+        print(f"  {name:<7} {per_sample:5.1f} bytes/sample  max {BYTES_PER_SECOND / per_sample:5.0f} samples/s at {BAUD_RATE} baud  "
+              f"{seconds * 1e6 / count:5.2f} µs/sample")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Switch the IMU stream to binary frames, or benchmark the parser.")
+    parser.add_argument("--bench", action="store_true", help="compare text and binary parsing cost")
+    parser.add_argument("--samples", type=int, default=100000, help="samples for --bench")
+    parser.add_argument("--port", help="serial port of the robot (default: found by discovery.py)")
+    parser.add_argument("--fake", action="store_true", help="stream from a simulated robot")
+    parser.add_argument("--seconds", type=float, default=5.0, help="how long to stream")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.samples)
+        return
+
+    from connection import prepare_connection
+    from discovery import open_robot
+    from imuReader import ImuReader
+
+    opened = open_robot(args, telemetry_rate=200.0)
+    if opened is None:
+        return
+    _, ser = opened
+
+    prepare_connection(ser)
+    reader = ImuReader(ser).start()
+    try:
+        binary = enable_binary_frames(ser, reader)
+        count = reader.ring.count
+        time.sleep(args.seconds)
+        rate = (reader.ring.count - count) / args.seconds
+        print(f"INFO: {rate:.0f} IMU samples/s ({'binary' if binary else 'text'}), "
+              f"{reader.binary_frames} frames, {reader.frame_errors} dropped for bad CRC or length.")
+    finally:
+        ser.write(FRAMES_OFF)
+        reader.stop()
+        ser.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+# calibration.py
+# Measures how far and how fast a particular Bittle actually walks and turns,
+# and turns that into a MotionModel, so plans can be written in centimetres
+# and degrees instead of hand-tuned seconds.
+#
+# Walking trials draw a line of a known duration with the marker down; you
+# measure it with a ruler and type the length in. Turn trials are measured
+# from the IMU yaw stream, so they need no input.
+#
+# Usage:
+#   python calibration.py --port /dev/tty.BittleC4_SSP
+#   python calibration.py                       # open the robot found by discovery.py
+#   python calibration.py --fake                # try it on a simulated robot
+#   python calibration.py --show BittleC4       # print a stored model
+
+import argparse
+import json
+import math
+import os
+import time
+
+from motionPlan import turn_step, walk_step, run_plan
+from turnControl import TurnTracker
+
+# --- Command Definitions ---
+WALK_FORWARD = b'kwkF\n'
+WALK_BACKWARD = b'kbkF\n'
+TURN_RIGHT_IN_PLACE = b'kvtR\n'
+TURN_LEFT_IN_PLACE = b'kvtL\n'
+MARKER_DOWN = b'i3 45\n'
+MARKER_UP = b'i3 -45\n'
+TURN_OFF_BALANCE = b'gb\n'
+REST = b'd\n'
+
+# --- Calibration Configuration ---
+CALIBRATION_PATH = os.path.expanduser("~/.bittle_calibration.json")
+TRIAL_DURATIONS = (1.0, 2.0, 3.0)   # Seconds per trial; at least two so an offset can be fitted
+TURN_SETTLE = 0.6                   # Wait after a turn before reading the final yaw
+MIN_RATE = 1.0                      # Slower fits (cm/s or °/s) come from bad trials, not a working gait
+
+# motion -> (rate per second, offset). A motion run for t seconds covers
+# rate * t + offset (cm or degrees); the offset absorbs the start-up and
+# stopping of the gait. The defaults are rough values for an uncalibrated robot.
+DEFAULT_RATES = {
+    'forward': (8.0, 0.0),
+    'backward': (5.0, 0.0),
+    'turn_right': (45.0, 0.0),
+    'turn_left': (45.0, 0.0),
+}
+
+
+def fit_rate(samples):
+    """
+    Least-squares fit of amount = rate * seconds + offset.
+
+    Args:
+        samples: A list of (seconds, amount) pairs.
+
+    Returns:
+        (rate, offset). With a single sample (or all trials the same length)
+        the line is forced through the origin.
+    """
+    count = len(samples)
+    mean_t = sum(t for t, _ in samples) / count
+    mean_a = sum(a for _, a in samples) / count
+    spread = sum((t - mean_t) ** 2 for t, _ in samples)
+    if count < 2 or spread == 0:
+        return sum(a for _, a in samples) / sum(t for t, _ in samples), 0.0
+    rate = sum((t - mean_t) * (a - mean_a) for t, a in samples) / spread
+    return rate, mean_a - rate * mean_t
+
+
+def usable_fit(fit):
+    """True if a (rate, offset) fit describes a motion that actually moves, so durations stay finite."""
+    rate, offset = fit
+    return math.isfinite(rate) and math.isfinite(offset) and rate >= MIN_RATE
+
+
+class MotionModel:
+    """
+    A per-robot model of walking speed and turn rate that builds plan segments
+    from distances and angles.
+
+    Positive angles are right turns, as everywhere else in this repo.
+    """
+
+    def __init__(self, rates=None, name=None):
+        self.name = name
+        self.rates = dict(DEFAULT_RATES)
+        if rates:
+            self.rates.update({motion: tuple(value) for motion, value in rates.items()})
+
+    def duration(self, motion, amount):
+        """Seconds motion has to run to cover amount (cm or degrees, never negative)."""
+        rate, offset = self.rates[motion]
+        return max((abs(amount) - offset) / rate, 0.0)
+
+    def walk(self, cm, marker, backward=False, settle=None):
+        """A walk_step that covers cm centimetres."""
+        motion, command, label = ('backward', WALK_BACKWARD, "BACKWARD") if backward else ('forward', WALK_FORWARD, "FORWARD")
+        state = "DOWN" if marker == MARKER_DOWN else "UP"
+        return walk_step(f"Marker {state}, moving {label} {cm:.1f} cm.", command, marker,
+                         round(self.duration(motion, cm), 2), settle, distance=cm)
+
+    def turn(self, degrees, marker=MARKER_UP, settle=None):
+        """
+        A turn_step of degrees (positive is right). It is closed-loop on the
+        yaw when the plan runs with an ImuReader; the timed fallback sends the
+        'k vtR <angle>' skill and allows the calibrated time for it.
+        """
+        side = "RIGHT" if degrees >= 0 else "LEFT"
+        command = f"k vt{side[0]} {abs(degrees):.0f}\n".encode()
+        state = "DOWN" if marker == MARKER_DOWN else "UP"
+        return turn_step(f"Marker {state}, turning {side} {abs(degrees):.0f}°.", command, marker,
+                         round(self.duration('turn_right' if degrees >= 0 else 'turn_left', degrees), 2),
+                         settle, angle=round(degrees, 1))
+
+    def to_dict(self):
+        return {motion: list(value) for motion, value in self.rates.items()}
+
+
+def load_model(name, path=CALIBRATION_PATH):
+    """
+    Returns the stored MotionModel for the named robot, or a default model if
+    that robot has not been calibrated yet.
+    """
+    try:
+        with open(path) as store:
+            rates = json.load(store).get(name)
+    except (OSError, ValueError):
+        rates = None
+    if rates is None and name is not None:
+        print(f"WARNING: No calibration for {name}, using default speeds.")
+    stored = {}
+    for motion in DEFAULT_RATES:
+        if rates and motion in rates:
+            if usable_fit(rates[motion]):
+                stored[motion] = rates[motion]
+            else:
+                print(f"WARNING: Stored {motion} rate of {name} ({rates[motion][0]:.2f}/s) is unusable; "
+                      f"using the default. Calibrate again.")
+    return MotionModel(stored, name)
+
+
+def save_model(model, path=CALIBRATION_PATH):
+    """Stores model under its robot name, keeping the other robots' entries."""
+    try:
+        with open(path) as store:
+            models = json.load(store)
+    except (OSError, ValueError):
+        models = {}
+    entry = model.to_dict()
+    entry['updated'] = time.strftime("%Y-%m-%d %H:%M:%S")
+    models[model.name] = entry
+    temporary = path + ".tmp"
+    with open(temporary, "w") as store:
+        json.dump(models, store, indent=2)
+    os.replace(temporary, path)
+
+
+def ask_distance(motion, seconds):
+    """Asks the operator for the length of the line the last trial drew."""
+    while True:
+        answer = input(f"  Length of the {motion} line drawn in {seconds:.1f}s (cm): ").strip()
+        try:
+            return float(answer)
+        except ValueError:
+            print("  Please enter a number, e.g. 18.5")
+
+
+def walk_trial(ser, command, seconds, marker=MARKER_DOWN):
+    """Walks for seconds with the marker down, then balances and settles."""
+    run_plan(ser, [walk_step(f"Calibration walk for {seconds:.1f} seconds.", command, marker, seconds)])
+
+
+def turn_trial(ser, reader, command, seconds):
+    """Runs the in-place turn gait for seconds and returns the degrees turned (right positive)."""
+    time.sleep(TURN_SETTLE)
+    seq = reader.ring.count
+    run_plan(ser, [walk_step(f"Calibration turn for {seconds:.1f} seconds.", command, MARKER_UP, seconds)])
+    time.sleep(TURN_SETTLE)
+    tracker = TurnTracker(0.0)
+    frames, _ = reader.ring.since(seq)
+    for frame in frames:
+        tracker.update(frame.yaw, frame.ok)
+    return tracker.turned
+
+
+def calibrate(ser, reader, name, measure_distance=ask_distance, durations=TRIAL_DURATIONS, walk=True, turn=True):
+    """
+    Runs the calibration trials and fits a MotionModel.
+
+    Args:
+        ser: The active serial connection to the Bittle.
+        reader: A running ImuReader on the same connection (for the turn trials).
+        name: The robot's name, used as the key in the calibration store.
+        measure_distance: measure_distance(motion, seconds) returning the cm
+            covered by the last walk trial.
+        durations: Length of each trial in seconds.
+        walk / turn: Which trials to run; motions that are skipped keep their
+            stored (or default) values.
+
+    Returns:
+        The fitted MotionModel.
+    """
+    model = load_model(name)
+    if walk:
+        for motion, command in (('forward', WALK_FORWARD), ('backward', WALK_BACKWARD)):
+            samples = []
+            for seconds in durations:
+                print(f"\nACTION: Walking {motion} for {seconds:.1f}s with the marker down...")
+                walk_trial(ser, command, seconds)
+                samples.append((seconds, measure_distance(motion, seconds)))
+            _store_fit(model, motion, samples)
+    if turn:
+        for motion, command, sign in (('turn_right', TURN_RIGHT_IN_PLACE, 1), ('turn_left', TURN_LEFT_IN_PLACE, -1)):
+            samples = []
+            for seconds in durations:
+                print(f"\nACTION: Turning ({motion}) for {seconds:.1f}s...")
+                turned = sign * turn_trial(ser, reader, command, seconds)
+                print(f"INFO: Turned {turned:.1f}°.")
+                samples.append((seconds, turned))
+            _store_fit(model, motion, samples)
+    return model
+
+
+def _store_fit(model, motion, samples):
+    # A fit that does not move forward would make MotionModel.duration divide
+    # by zero or go negative; keep the previous rate instead.
+    fit = fit_rate(samples)
+    if usable_fit(fit):
+        model.rates[motion] = fit
+    else:
+        print(f"ERROR: The {motion} trials fit {fit[0]:.2f}/s, which cannot be right; "
+              f"keeping {model.rates[motion][0]:.2f}/s. Check the measurements and repeat.")
+
+
+def print_model(model):
+    print(f"\n--- MOTION MODEL ({model.name}) ---")
+    for motion, (rate, offset) in model.rates.items():
+        unit = "°" if motion.startswith('turn') else " cm"
+        print(f"  {motion:<11} {rate:6.2f}{unit}/s  offset {offset:+6.2f}{unit}   "
+              f"e.g. {'90°' if unit == '°' else '40 cm'} takes {model.duration(motion, 90 if unit == '°' else 40):.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate a Bittle's walking speed and turn rate.")
+    parser.add_argument("--port", help="serial port of the robot (default: found by discovery.py)")
+    parser.add_argument("--fake", action="store_true", help="calibrate a simulated robot")
+    parser.add_argument("--durations", type=float, nargs="+", default=list(TRIAL_DURATIONS),
+                        help="trial lengths in seconds")
+    parser.add_argument("--skip-walk", action="store_true", help="only run the turn trials")
+    parser.add_argument("--skip-turn", action="store_true", help="only run the walking trials")
+    parser.add_argument("--show", metavar="ROBOT", help="print the stored model of ROBOT and exit")
+    args = parser.parse_args()
+
+    if args.show:
+        print_model(load_model(args.show))
+        return
+
+    from connection import prepare_connection
+    from discovery import open_robot
+    from imuReader import ImuReader
+    measure_distance = ask_distance
+    opened = open_robot(args)
+    if opened is None:
+        return
+    name, ser = opened
+    if args.fake:
+        last_position = [ser.pose()[:2]]
+
+        def measure_distance(motion, seconds):
+            # The simulator knows exactly how far it walked.
+            position = ser.pose()[:2]
+            distance = math.dist(position, last_position[0])
+            last_position[0] = position
+            print(f"  Simulated {motion} line: {distance:.1f} cm")
+            return distance
+
+    prepare_connection(ser, [TURN_OFF_BALANCE])
+    reader = ImuReader(ser).start()
+    try:
+        model = calibrate(ser, reader, name, measure_distance, args.durations,
+                          walk=not args.skip_walk, turn=not args.skip_turn)
+        save_model(model)
+        print_model(model)
+        print(f"INFO: Saved to {CALIBRATION_PATH}")
+    finally:
+        reader.stop()
+        ser.write(REST)
+        time.sleep(0.5)
+        ser.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# commandWriter.py
+# A drop-in wrapper around the Bittle serial connection that stops the drawing
+# and teleop loops from flooding the link with commands the robot is already
+# executing. Wrapped around an AckTracker, it goes by what the robot echoed:
+# a command that was lost on the link is sent again on the next write.
+
+import threading
+import time
+
+# --- Writer Configuration ---
+# A command identical to the robot's current state is re-sent at most this
+# often (seconds), as a keep-alive in case the original was lost.
+KEEPALIVE_INTERVAL = 1.0
+
+
+def command_channel(command):
+    """
+    Returns the piece of robot state a command sets, or None if the command is
+    not idempotent and must always be sent.
+
+    All 'k' skills share one channel (a new gait or BALANCE replaces the old
+    one). 'i' and 'm' joint commands own the joints they move, so the marker
+    (joint 3) and the head (joint 0) are tracked independently.
+    """
+    text = command.decode(errors="ignore").strip()
+    if not text:
+        return None
+    token = text[0]
+    if token == 'k':
+        return 'skill'
+    if token in ('i', 'm'):
+        values = text[1:].split()
+        joints = tuple(values[0::2])
+        if joints and len(values) % 2 == 0:
+            return ('joint',) + joints
+    return None
+
+
+class CommandWriter:
+    """
+    Wraps a serial connection and suppresses redundant writes.
+
+    The writer remembers the last command sent on every channel (see
+    command_channel). Writing the same command again is skipped unless
+    KEEPALIVE_INTERVAL has passed since it was last sent, or the wrapped
+    connection is an AckTracker (anything with lost_since) that has counted
+    it as lost. Without a tracker the writer only knows what it sent, and a
+    dropped command waits for the keep-alive. Any attribute that is
+    not part of the writer (readline, in_waiting, is_open, close, ...) is
+    forwarded to the wrapped connection, so the writer can be passed anywhere a
+    serial object is expected.
+    """
+
+    def __init__(self, ser, keepalive=KEEPALIVE_INTERVAL):
+        self.ser = ser
+        self.keepalive = keepalive
+        self.state = {}  # channel -> (command, time last sent)
+        self.sent = 0
+        self.suppressed = 0
+        self.bytes_sent = 0
+        self.bytes_suppressed = 0
+        self.resent = 0  # Repeats sent because the robot never echoed the last one
+        self.lost_since = getattr(ser, 'lost_since', None)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.ser, name)
+
+    def write(self, command, force=False):
+        """
+        Sends a command unless the robot is already in the state it sets.
+
+        Returns the number of bytes written (0 if the command was suppressed).
+        """
+        channel = command_channel(command)
+        with self._lock:
+            now = time.monotonic()
+            if not force and channel is not None:
+                last = self.state.get(channel)
+                if last is not None and last[0] == command and now - last[1] < self.keepalive:
+                    if not (self.lost_since and self.lost_since(command, last[1])):
+                        self.suppressed += 1
+                        self.bytes_suppressed += len(command)
+                        return 0
+                    self.resent += 1
+            written = self.ser.write(command)
+            if command.startswith(b'd'):
+                # Rest powers the servos down, so nothing we sent before still holds.
+                self.state.clear()
+            elif channel is not None:
+                self.state[channel] = (command, now)
+            self.sent += 1
+            self.bytes_sent += len(command)
+            return written
+
+    def forget(self):
+        """Drops the remembered state so the next command on every channel is sent."""
+        with self._lock:
+            self.state.clear()
+
+    def summary(self):
+        """Returns a one-line description of how much traffic was saved."""
+        total = self.sent + self.suppressed
+        saved = 100.0 * self.suppressed / total if total else 0.0
+        return (f"{self.sent} commands sent ({self.bytes_sent} bytes), "
+                f"{self.suppressed} suppressed ({self.bytes_suppressed} bytes, {saved:.0f}% of writes), "
+                f"{self.resent} resent after a lost echo")
@@ -0,0 +1,139 @@
+# connection.py
+# Gets a freshly opened Bittle connection ready without fixed sleeps: watch
+# the serial stream until the firmware is up, send all the init commands in a
+# single write, and return as soon as the robot has acknowledged them.
+# The stream is taken apart with split_stream, so a robot that was left
+# sending binary IMU frames (binaryFrames.py) is recognised and put back on
+# the text protocol instead of its frames swallowing the echoes.
+
+import time
+
+from binaryFrames import FRAMES_OFF, split_stream
+from imuReader import parse_imu_line
+from profiling import phase
+
+# --- Readiness Configuration ---
+READY_MARKER = "Ready!"   # Printed by OpenCat at the end of its boot
+QUERY = b'?\n'            # Harmless probe for a board that is already running
+READY_TIMEOUT = 5.0       # Give up waiting for the firmware after this long
+ACK_TIMEOUT = 2.0         # Give up waiting for the init acknowledgements after this long
+PROBE_INTERVAL = 0.3      # Probe again after this long without any output
+READ_TIMEOUT = 0.05       # Serial timeout used while watching the stream
+MODELS = ("Bittle", "Nybble")
+
+
+def read_items(ser, pending=b''):
+    """
+    Reads whatever has arrived on ser (waiting at most its timeout) and
+    splits it into text lines and binary IMU frames.
+
+    Args:
+        ser: The serial connection.
+        pending: The incomplete tail returned by the previous call.
+
+    Returns:
+        (items, pending): the text lines (stripped str) and ImuSamples in
+        stream order, and the tail to pass back in.
+    """
+    data = ser.read(max(1, ser.in_waiting))
+    if not data:
+        return [], pending
+    items, pending, _ = split_stream(pending + data)
+    return [item.decode(errors="ignore").strip() if isinstance(item, bytes) else item for item in items], pending
+
+
+def wait_until_ready(ser, timeout=READY_TIMEOUT):
+    """
+    Waits until the firmware on ser is running and able to take commands.
+
+    A board that was just reset (USB) prints its boot messages and then
+    "Ready!". A board that was already running (Bluetooth) prints nothing, so
+    after PROBE_INTERVAL of silence it is sent the '?' query; any answer, a
+    command echo or IMU telemetry shows it is listening. A board still
+    sending binary IMU frames from an earlier session is switched back to
+    text with FRAMES_OFF.
+
+    Returns:
+        True once the robot is ready, False if timeout passed first.
+    """
+    deadline = time.monotonic() + timeout
+    next_probe = time.monotonic() + PROBE_INTERVAL
+    pending = b''
+    while time.monotonic() < deadline:
+        items, pending = read_items(ser, pending)
+        lines = [item for item in items if isinstance(item, str)]
+        if len(lines) < len(items):
+            ser.write(FRAMES_OFF)
+            return True
+        if any(READY_MARKER in line or line == QUERY.decode().strip() or line.startswith(MODELS)
+               or parse_imu_line(line) is not None for line in lines):
+            return True
+        if any(items) or pending:
+            # Boot output: the board is alive but not finished; wait for more.
+            next_probe = time.monotonic() + PROBE_INTERVAL
+        elif time.monotonic() >= next_probe:
+            ser.write(QUERY)
+            next_probe = time.monotonic() + PROBE_INTERVAL
+    return False
+
+
+def wait_for_acks(ser, commands, timeout=ACK_TIMEOUT):
+    """
+    Waits until OpenCat has echoed the token of every command, in order.
+    Binary IMU frames still arriving are switched off like in wait_until_ready.
+
+    Returns:
+        True if all were acknowledged, False if timeout passed first.
+    """
+    tokens = [command.decode(errors="ignore").strip()[:1] for command in commands]
+    tokens = [token for token in tokens if token]
+    deadline = time.monotonic() + timeout
+    pending = b''
+    frames_off = False
+    while tokens and time.monotonic() < deadline:
+        items, pending = read_items(ser, pending)
+        for item in items:
+            if not isinstance(item, str):
+                if not frames_off:
+                    # Binary frames left on by an earlier session; back to text.
+                    ser.write(FRAMES_OFF)
+                    frames_off = True
+            elif tokens and item == tokens[0]:
+                tokens.pop(0)
+    return not tokens
+
+
+def prepare_connection(ser, init_commands=(), ready_timeout=READY_TIMEOUT, ack_timeout=ACK_TIMEOUT):
+    """
+    Readies a newly opened connection: waits for the firmware, sends
+    init_commands as one batched write and waits for their acknowledgements.
+
+    Args:
+        ser: The freshly opened serial connection.
+        init_commands: Commands to run once the robot is up, e.g.
+            [TURN_OFF_BALANCE, TURN_OFF_VOICE].
+
+    Returns:
+        True if the robot answered and acknowledged everything, False if it
+        stayed silent (the commands are still sent, as before).
+    """
+    start = time.monotonic()
+    saved_timeout = ser.timeout
+    ser.timeout = READ_TIMEOUT
+    try:
+        with phase("wait for firmware", "connect"):
+            ready = wait_until_ready(ser, ready_timeout)
+        with phase("init commands", "connect"):
+            if init_commands:
+                ser.write(b''.join(init_commands))
+            acknowledged = wait_for_acks(ser, init_commands, ack_timeout) if ready else False
+    finally:
+        ser.timeout = saved_timeout
+    elapsed = time.monotonic() - start
+    if ready and acknowledged:
+        print(f"INFO: Bittle ready in {elapsed:.2f}s.")
+    elif ready:
+        print(f"WARNING: Bittle is up but did not acknowledge the init commands ({elapsed:.2f}s).")
+    else:
+        print(f"WARNING: No response from Bittle after {elapsed:.2f}s; continuing anyway.")
+    return ready and acknowledged
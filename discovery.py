@@ -0,0 +1,245 @@
+# discovery.py
+# Finds the Bittles that are connected and works out which robot is on which
+# port, so scripts do not have to hard-code a single SERIAL_PORT.
+#
+# Every candidate port is probed at the same time with the firmware's '?'
+# query, so finding all robots takes one short handshake instead of a fixed
+# wait per port. The port -> robot mapping is cached on disk, and the next
+# launch can open a known robot straight from the cache without probing.
+#
+# Usage:
+#   python discovery.py            # probe all ports and print what was found
+#   python discovery.py --cached   # print the cached mapping only
+
+import argparse
+import json
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+from serial.tools import list_ports
+
+# Substrings of a port's description (or device name) that mark it as a Bittle:
+# the USB adapters used with the robot, and the Bluetooth SPP ports that are
+# named after it (e.g. /dev/tty.BittleC4_SSP).
+BITTLE_PORT_HINTS = ("CH340", "USB-SERIAL", "Bittle")
+
+# --- Handshake Configuration ---
+BAUD_RATE = 115200
+QUERY = b'?\n'            # OpenCat replies with the model name and firmware version
+MODELS = ("Bittle", "Nybble")
+PROBE_TIMEOUT = 1.5       # Give up on a port after this many seconds without a reply
+PROBE_INTERVAL = 0.3      # Re-send the query this often (the board may still be booting)
+CACHE_PATH = os.path.expanduser("~/.bittle_ports.json")
+
+# One identified robot. name is stable across launches: the Bluetooth name
+# for SPP ports (e.g. BittleC4), otherwise the model plus the USB serial number.
+BittleInfo = namedtuple('BittleInfo', ['name', 'port', 'model', 'version', 'hwid'])
+
+
+def find_bittle_ports():
+    """
+    Returns the device names of every port that looks like a Bittle, in the
+    order the operating system lists them.
+    """
+    devices = []
+    for port in list_ports.comports():
+        if any(hint in port.description or hint in port.device for hint in BITTLE_PORT_HINTS):
+            devices.append(port.device)
+    return devices
+
+
+def _port_hwids():
+    return {port.device: port.hwid or '' for port in list_ports.comports()}
+
+
+def robot_name(port, model, hwid=''):
+    """Builds the stable name of the robot answering on port."""
+    match = re.search(r"(Bittle\w*?)(?:_SSP|$)", os.path.basename(port))
+    if match:
+        return match.group(1)
+    serial_number = re.search(r"SER=(\w+)", hwid)
+    return f"{model}-{serial_number.group(1) if serial_number else os.path.basename(port)}"
+
+
+def probe_port(port, hwid='', timeout=PROBE_TIMEOUT, opener=None):
+    """
+    Opens port and asks the firmware who it is.
+
+    Args:
+        port: Device name of the port.
+        hwid: The port's hardware id, used to name USB-connected robots.
+        timeout: How long to wait for a reply, in seconds.
+        opener: Optional opener(port) returning a serial-like object
+            (default: serial.Serial at BAUD_RATE).
+
+    Returns:
+        (BittleInfo, open serial connection) if a robot answered, otherwise
+        None (the port is closed again in that case).
+    """
+    try:
+        ser = opener(port) if opener else serial.Serial(port, BAUD_RATE, timeout=PROBE_INTERVAL)
+    except (serial.SerialException, OSError):
+        return None
+
+    model = None
+    deadline = time.monotonic() + timeout
+    next_query = time.monotonic()
+    try:
+        while time.monotonic() < deadline:
+            if time.monotonic() >= next_query:
+                ser.write(QUERY)
+                next_query += PROBE_INTERVAL
+            line = ser.readline().decode(errors="ignore").strip()
+            if model is None:
+                model = next((name for name in MODELS if line.startswith(name)), None)
+            elif line and not line.startswith(("ICM:", "MCU:")) and line != '?':
+                # The line after the model name is the firmware version.
+                return BittleInfo(robot_name(port, model, hwid), port, model, line, hwid), ser
+        if model is not None:
+            return BittleInfo(robot_name(port, model, hwid), port, model, '', hwid), ser
+    except (serial.SerialException, OSError):
+        pass
+    ser.close()
+    return None
+
+
+def load_cache(path=CACHE_PATH):
+    """Returns the cached {name: BittleInfo} mapping (empty if there is none)."""
+    try:
+        with open(path) as cache:
+            entries = json.load(cache)
+        return {name: BittleInfo(name, entry['port'], entry['model'], entry['version'], entry['hwid'])
+                for name, entry in entries.items()}
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def save_cache(robots, path=CACHE_PATH):
+    """Merges the given BittleInfos into the on-disk cache."""
+    cached = load_cache(path)
+    for info in robots:
+        cached[info.name] = info
+    entries = {name: {'port': info.port, 'model': info.model, 'version': info.version, 'hwid': info.hwid}
+               for name, info in cached.items()}
+    temporary = path + ".tmp"
+    with open(temporary, "w") as cache:
+        json.dump(entries, cache, indent=2)
+    os.replace(temporary, path)
+
+
+def discover_bittles(ports=None, timeout=PROBE_TIMEOUT, opener=None, keep_open=False, cache_path=CACHE_PATH):
+    """
+    Probes every candidate port concurrently and returns the robots that answered.
+
+    Args:
+        ports: Ports to probe (default: find_bittle_ports()).
+        timeout: Handshake timeout per port, in seconds. All ports share it,
+            so this is also roughly the total time taken.
+        opener: Optional opener passed on to probe_port.
+        keep_open: Return the open connections instead of closing them.
+        cache_path: Where to record the mapping (None to skip the cache).
+
+    Returns:
+        A list of (BittleInfo, serial connection or None) pairs, in port order.
+    """
+    hwids = _port_hwids()
+    ports = find_bittle_ports() if ports is None else ports
+    if not ports:
+        return []
+    with ThreadPoolExecutor(max_workers=len(ports)) as pool:
+        probes = list(pool.map(lambda port: probe_port(port, hwids.get(port, ''), timeout, opener), ports))
+
+    found = []
+    for probe in probes:
+        if probe is None:
+            continue
+        info, ser = probe
+        if not keep_open:
+            ser.close()
+            ser = None
+        found.append((info, ser))
+    if cache_path and found:
+        save_cache([info for info, _ in found], cache_path)
+    return found
+
+
+def open_bittle(name=None, timeout=PROBE_TIMEOUT, cache_path=CACHE_PATH):
+    """
+    Opens a robot, using the cached port if it is still present.
+
+    Args:
+        name: The robot to open (default: any cached or discovered robot).
+
+    Returns:
+        (BittleInfo, open serial connection), or None if the robot was not found.
+    """
+    present = _port_hwids()
+    for info in load_cache(cache_path).values():
+        if (name is None or info.name == name) and present.get(info.port, '') == info.hwid:
+            try:
+                return info, serial.Serial(info.port, BAUD_RATE, timeout=2)
+            except serial.SerialException:
+                break  # Stale entry: the port exists but is not our robot any more.
+
+    for info, ser in discover_bittles(timeout=timeout, keep_open=True, cache_path=cache_path):
+        if name is None or info.name == name:
+            return info, ser
+        ser.close()
+    return None
+
+
+def open_robot(args, **fake_kwargs):
+    """
+    Opens the robot a command-line tool was pointed at: a FakeBittle with
+    --fake, the robot on --port, or else the one open_bittle() finds.
+
+    Args:
+        args: Parsed arguments with .fake and .port.
+        fake_kwargs: Extra FakeBittle arguments (the timeout defaults to 0.1 s).
+
+    Returns:
+        (robot name, open connection), with the name "fake" for the
+        simulator, or None (after printing an error) if no robot was found.
+    """
+    if args.fake:
+        from fakeBittle import FakeBittle
+        fake_kwargs.setdefault('timeout', 0.1)
+        return "fake", FakeBittle(**fake_kwargs)
+    if args.port:
+        try:
+            return robot_name(args.port, "Bittle"), serial.Serial(args.port, BAUD_RATE, timeout=2)
+        except serial.SerialException as e:
+            print(f"ERROR: Could not open {args.port}: {e}")
+            return None
+    found = open_bittle()
+    if found is None:
+        print("ERROR: No Bittle found. Pass its port with --port.")
+        return None
+    info, ser = found
+    return info.name, ser
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the connected Bittles.")
+    parser.add_argument("--cached", action="store_true", help="only print the cached port mapping")
+    parser.add_argument("--timeout", type=float, default=PROBE_TIMEOUT, help="handshake timeout in seconds")
+    args = parser.parse_args()
+
+    if args.cached:
+        robots = list(load_cache().values())
+    else:
+        start = time.monotonic()
+        robots = [info for info, _ in discover_bittles(timeout=args.timeout)]
+        print(f"INFO: Probed {len(find_bittle_ports())} port(s) in {time.monotonic() - start:.2f}s.")
+    if not robots:
+        print("WARNING: No Bittles found.")
+    for info in robots:
+        print(f"  {info.name:<20} {info.port:<32} {info.model} {info.version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+# dxfPath.py
+# Turns the LINE entities of a DXF drawing (e.g. fence_final.dxf) into a
+# motionPlan that Bittle can draw.
+#
+# The lines are merged into as few strokes as possible and the strokes are
+# ordered to keep pen-up travel short, so a large drawing needs far fewer
+# marker lifts and turns than drawing the entities one by one in file order.
+#
+# Usage:
+#   python dxfPath.py fence_final.dxf                  # print the statistics
+#   python dxfPath.py fence_final.dxf --width 60 --steps
+#   python dxfPath.py fence_final.dxf --width 60 --fake  # draw it on a simulated robot
+
+import argparse
+import math
+import sys
+import time
+
+from calibration import MARKER_DOWN, MARKER_UP, MotionModel, load_model
+from motionPlan import SETTLE_TIME
+from turnControl import wrap_degrees
+
+# --- Drawing Configuration ---
+# Walking and turning times come from the robot's MotionModel (calibration.py).
+MIN_TURN = 2.0            # Heading changes smaller than this are not turned, in degrees
+MIN_MOVE = 0.5            # Moves shorter than this are dropped, in cm
+JOIN_TOLERANCE = 0.01     # Endpoints closer than this are the same point, in drawing units
+TWO_OPT_PASSES = 20       # Upper bound on 2-opt improvement passes
+
+# DXF $INSUNITS code -> centimetres per drawing unit
+INSUNITS_CM = {1: 2.54, 2: 30.48, 4: 0.1, 5: 1.0, 6: 100.0}
+
+
+def read_dxf_lines(path):
+    """
+    Streams the LINE entities of the ENTITIES section of a DXF file.
+
+    The file is read one group code/value pair at a time, so memory use does
+    not depend on the size of the drawing.
+
+    Yields:
+        ((x1, y1), (x2, y2)) for every LINE, in file order.
+    """
+    section = None
+    entity = None
+    fields = {}
+    with open(path, encoding="utf-8", errors="ignore") as dxf:
+        while True:
+            code = dxf.readline()
+            value = dxf.readline()
+            if not value:
+                break
+            code = code.strip()
+            value = value.strip()
+            if code != '0':
+                if entity == 'LINE' and code in ('10', '20', '11', '21'):
+                    fields[code] = float(value)
+                elif code == '2' and entity == 'SECTION':
+                    section = value
+                continue
+            if entity == 'LINE' and section == 'ENTITIES' and len(fields) == 4:
+                yield (fields['10'], fields['20']), (fields['11'], fields['21'])
+            entity = value
+            fields = {}
+            if value == 'ENDSEC':
+                section = None
+
+
+def read_dxf_units(path):
+    """Returns centimetres per drawing unit from the header's $INSUNITS, or None."""
+    with open(path, encoding="utf-8", errors="ignore") as dxf:
+        previous = None
+        for line in dxf:
+            line = line.strip()
+            if previous == '$INSUNITS':
+                # line is the group code (70); the value follows it
+                return INSUNITS_CM.get(int(dxf.readline().strip()))
+            if line == 'ENDSEC':
+                return None
+            previous = line
+    return None
+
+
+def _distance(a, b):
+    return math.hypot(b[0] - a[0], b[1] - a[1])
+
+
+def _heading(a, b):
+    return math.degrees(math.atan2(b[1] - a[1], b[0] - a[0]))
+
+
+def merge_collinear(lines, tolerance=JOIN_TOLERANCE):
+    """
+    Merges segments that lie on the same infinite line and overlap or touch.
+
+    Returns:
+        A list of ((x1, y1), (x2, y2)) segments with no zero-length ones.
+    """
+    groups = {}
+    for start, end in lines:
+        length = _distance(start, end)
+        if length <= tolerance:
+            continue
+        angle = math.atan2(end[1] - start[1], end[0] - start[0]) % math.pi
+        dx, dy = math.cos(angle), math.sin(angle)
+        offset = -dy * start[0] + dx * start[1]
+        key = (round(angle, 6), round(offset / tolerance))
+        t1 = dx * start[0] + dy * start[1]
+        t2 = dx * end[0] + dy * end[1]
+        groups.setdefault(key, (dx, dy, offset, []))[3].append((min(t1, t2), max(t1, t2)))
+
+    merged = []
+    for dx, dy, offset, spans in groups.values():
+        spans.sort()
+        low, high = spans[0]
+        for span_low, span_high in spans[1:] + [(math.inf, math.inf)]:
+            if span_low <= high + tolerance:
+                high = max(high, span_high)
+                continue
+            merged.append(((dx * low - dy * offset, dy * low + dx * offset),
+                           (dx * high - dy * offset, dy * high + dx * offset)))
+            low, high = span_low, span_high
+    return merged
+
+
+def chain_segments(segments, tolerance=JOIN_TOLERANCE):
+    """
+    Joins segments that share endpoints into polylines.
+
+    Chains start at odd-degree points where possible (so each junction is
+    passed through rather than left as a loose end), and at every junction
+    continue along the unused segment that turns the least.
+
+    Returns:
+        A list of polylines, each a list of (x, y) points.
+    """
+    def key(point):
+        return round(point[0] / tolerance), round(point[1] / tolerance)
+
+    edges = {}       # point key -> [segment index, ...]
+    for index, (start, end) in enumerate(segments):
+        edges.setdefault(key(start), []).append(index)
+        edges.setdefault(key(end), []).append(index)
+    used = [False] * len(segments)
+
+    def unused_at(point_key):
+        return [index for index in edges[point_key] if not used[index]]
+
+    def other_end(index, point_key):
+        start, end = segments[index]
+        return end if key(start) == point_key else start
+
+    polylines = []
+    order = sorted(range(len(segments)), key=lambda index: len(edges[key(segments[index][0])]) % 2 == 0)
+    for first in order:
+        if used[first]:
+            continue
+        start, end = segments[first]
+        if len(unused_at(key(start))) % 2 == 0 and len(unused_at(key(end))) % 2 == 1:
+            start, end = end, start
+        used[first] = True
+        points = [start, end]
+        while True:
+            here = key(points[-1])
+            heading = _heading(points[-2], points[-1])
+            candidates = unused_at(here)
+            if not candidates:
+                break
+            best = min(candidates, key=lambda index: abs(wrap_degrees(_heading(points[-1], other_end(index, here)) - heading)))
+            used[best] = True
+            points.append(other_end(best, here))
+        polylines.append(points)
+    return polylines
+
+
+def order_strokes(polylines, start=(0.0, 0.0), passes=TWO_OPT_PASSES):
+    """
+    Orders and orients polylines to keep the pen-up travel between them short.
+
+    A nearest-neighbour tour (entering closed loops at their nearest point) is
+    improved with 2-opt: reversing a run of strokes, and the direction of each
+    stroke in it, whenever that shortens the travel.
+
+    Returns:
+        The polylines in drawing order, each oriented the way it is drawn.
+    """
+    remaining = list(polylines)
+    strokes = []
+    position = start
+    while remaining:
+        best = None
+        for index, points in enumerate(remaining):
+            if _distance(points[0], points[-1]) < JOIN_TOLERANCE:
+                # A closed loop can be entered at any of its corners.
+                entry = min(range(len(points) - 1), key=lambda corner: _distance(position, points[corner]))
+                candidate = (_distance(position, points[entry]), index, points[entry:-1] + points[:entry + 1])
+            else:
+                forward = _distance(position, points[0])
+                backward = _distance(position, points[-1])
+                candidate = (forward, index, points) if forward <= backward else (backward, index, points[::-1])
+            if best is None or candidate[0] < best[0]:
+                best = candidate
+        _, index, points = best
+        strokes.append(points)
+        position = points[-1]
+        remaining.pop(index)
+
+    count = len(strokes)
+    for _ in range(passes):
+        improved = False
+        for i in range(count):
+            before = strokes[i - 1][-1] if i else start
+            for j in range(i + 1, count):
+                after = strokes[j + 1][0] if j + 1 < count else None
+                old = _distance(before, strokes[i][0]) + (_distance(strokes[j][-1], after) if after else 0.0)
+                new = _distance(before, strokes[j][-1]) + (_distance(strokes[i][0], after) if after else 0.0)
+                if new < old - 1e-9:
+                    strokes[i:j + 1] = [points[::-1] for points in reversed(strokes[i:j + 1])]
+                    improved = True
+        if not improved:
+            break
+    return strokes
+
+
+def strokes_to_plan(strokes, scale, start=(0.0, 0.0), heading=0.0, model=None, allow_backward=True):
+    """
+    Emits the motionPlan Segments that draw the strokes.
+
+    The robot starts at start facing heading (degrees, counter-clockwise from
+    the drawing's +x axis). Every straight piece is one walk with the marker
+    down; the marker is lifted for turns, because it sits off the robot's
+    turning axis and would smear the corner. When reaching the next point
+    needs a turn of more than 90 degrees, the robot walks backward instead.
+
+    Args:
+        strokes: Polylines in drawing order, in drawing units.
+        scale: Centimetres per drawing unit.
+        model: The robot's MotionModel (default: uncalibrated speeds).
+
+    Returns:
+        A list of Segments for motionPlan.run_plan.
+    """
+    model = model or MotionModel()
+    plan = []
+    position = start
+
+    def move_to(target, marker):
+        nonlocal position, heading
+        distance = _distance(position, target) * scale
+        if distance < MIN_MOVE:
+            return
+        turn = -wrap_degrees(_heading(position, target) - heading)  # positive turns right
+        backward = allow_backward and abs(turn) > 90.0
+        if backward:
+            turn = wrap_degrees(turn + 180.0)
+        if abs(turn) >= MIN_TURN:
+            plan.append(model.turn(turn))
+            heading = wrap_degrees(heading - turn)
+        plan.append(model.walk(distance, marker, backward))
+        position = target
+
+    for points in strokes:
+        move_to(points[0], MARKER_UP)
+        for point in points[1:]:
+            move_to(point, MARKER_DOWN)
+    return plan
+
+
+def naive_strokes(lines):
+    """Every entity as its own stroke, in file order - what the plan is compared against."""
+    return [[start, end] for start, end in lines if _distance(start, end) > JOIN_TOLERANCE]
+
+
+def plan_stats(plan, settle=SETTLE_TIME):
+    """Returns a dict of counts and the estimated run time of a plan."""
+    stats = {'steps': len(plan), 'strokes': 0, 'turns': 0, 'turned': 0.0, 'pen_up_cm': 0.0,
+             'drawn_cm': 0.0, 'seconds': 0.0}
+    for segment in plan:
+        stats['seconds'] += segment.duration + settle
+        if segment.angle is not None:
+            stats['turns'] += 1
+            stats['turned'] += abs(segment.angle)
+            continue
+        distance = segment.distance or 0.0
+        if segment.marker == MARKER_DOWN:
+            stats['strokes'] += 1
+            stats['drawn_cm'] += distance
+        else:
+            stats['pen_up_cm'] += distance
+    return stats
+
+
+def build_plan(path, scale=None, width=None, model=None):
+    """
+    Loads a DXF drawing and compiles it into an optimised plan.
+
+    Args:
+        scale: Centimetres per drawing unit (default: from $INSUNITS, else 1).
+        width: Fit the drawing to this width in cm instead (overrides scale).
+        model: The robot's MotionModel (default: uncalibrated speeds).
+
+    Returns:
+        (plan, naive plan, statistics dict) - the naive plan draws the entities
+        in file order and is only built for comparison.
+    """
+    began = time.perf_counter()
+    lines = list(read_dxf_lines(path))
+    if not lines:
+        raise ValueError(f"No LINE entities in {path}")
+    if width:
+        xs = [x for line in lines for x, _ in line]
+        scale = width / max(max(xs) - min(xs), JOIN_TOLERANCE)
+    elif scale is None:
+        scale = read_dxf_units(path) or 1.0
+
+    start = lines[0][0]
+    segments = merge_collinear(lines)
+    polylines = chain_segments(segments)
+    strokes = order_strokes(polylines, start)
+    plan = strokes_to_plan(strokes, scale, start, model=model)
+    naive_plan = strokes_to_plan(naive_strokes(lines), scale, start, model=model)
+    stats = {'lines': len(lines), 'segments': len(segments), 'polylines': len(polylines), 'scale': scale,
+             'compile_seconds': time.perf_counter() - began}
+    return plan, naive_plan, stats
+
+
+def print_stats(plan, naive_plan, stats):
+    print(f"\n--- DXF PATH REPORT ({stats['lines']} lines -> {stats['segments']} merged segments -> "
+          f"{stats['polylines']} polylines, {stats['scale']:.4g} cm/unit, "
+          f"compiled in {stats['compile_seconds']:.2f}s) ---")
+    print(f"  {'':<10} {'steps':>7} {'strokes':>8} {'turns':>7} {'turned':>10} {'pen-up':>10} {'drawn':>10} {'est. time':>10}")
+    for name, candidate in (("naive", naive_plan), ("optimised", plan)):
+        s = plan_stats(candidate)
+        print(f"  {name:<10} {s['steps']:>7} {s['strokes']:>8} {s['turns']:>7} {s['turned']:>9.0f}° "
+              f"{s['pen_up_cm']:>8.0f}cm {s['drawn_cm']:>8.0f}cm {s['seconds'] / 60:>8.1f}min")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a DXF drawing into a Bittle motion plan.")
+    parser.add_argument("dxf", help="DXF file with LINE entities")
+    parser.add_argument("--scale", type=float, help="centimetres per drawing unit (default: from the file)")
+    parser.add_argument("--width", type=float, help="fit the drawing to this width in cm")
+    parser.add_argument("--robot", help="use this robot's stored calibration (see calibration.py)")
+    parser.add_argument("--steps", action="store_true", help="print every step of the plan")
+    parser.add_argument("--fake", action="store_true", help="draw the plan on a simulated robot")
+    parser.add_argument("--log", metavar="FILE", help="record the simulated run to a telemetry log (see telemetryLog.py)")
+    args = parser.parse_args()
+
+    try:
+        plan, naive_plan, stats = build_plan(args.dxf, args.scale, args.width, load_model(args.robot) if args.robot else None)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    print_stats(plan, naive_plan, stats)
+    if args.steps:
+        for index, segment in enumerate(plan):
+            print(f"STEP {index + 1}: {segment.name}")
+
+    if args.fake:
+        from fakeBittle import FakeBittle
+        from imuReader import ImuReader
+        from motionPlan import run_plan
+        from telemetryLog import RecordingSerial, TelemetryRecorder
+        bittle = FakeBittle(timeout=0.1)
+        reader = ImuReader(bittle).start()
+        recorder = TelemetryRecorder(args.log).attach(reader) if args.log else None
+        try:
+            if recorder:
+                run_plan(RecordingSerial(bittle, recorder), plan, reader=reader, on_step=recorder.on_step)
+            else:
+                run_plan(bittle, plan, reader=reader)
+        finally:
+            reader.stop()
+            bittle.close()
+            if recorder:
+                recorder.close()
+                print(f"INFO: Telemetry recorded to {args.log}")
+
+
+if __name__ == "__main__":
+    main()
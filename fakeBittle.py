@@ -0,0 +1,519 @@
+# fakeBittle.py
+# A simulated Bittle that can stand in for the serial connection, so the
+# drawing, turning and teleop code can be exercised without hardware.
+#
+# FakeBittle behaves like a serial.Serial object (write, read, readline,
+# in_waiting, is_open, close). It understands the commands used in this
+# repo, models walking speed and yaw, echoes the command token the way
+# OpenCat does, and streams ICM: telemetry at a configurable rate (or the
+# binary IMU frames of binaryFrames.h after 'F1').
+#
+# Usage:
+#   python fakeBittle.py --robots 8 --scale 0.2      # parallel sequence benchmark
+#   python fakeBittle.py --pty                       # serve one robot on a pty
+
+import argparse
+import math
+import os
+import random
+import threading
+import time
+
+from binaryFrames import encode_imu_frame
+from yawFilter import wrap_degrees
+
+# --- Simulation Defaults ---
+TELEMETRY_RATE = 20.0      # ICM: lines per second
+FORWARD_SPEED = 8.0        # cm/s for kwkF
+BACKWARD_SPEED = 5.0       # cm/s for kbkF / kbk
+TURN_RATE = 45.0           # deg/s for kvtL / kvtR and 'k vtR <angle>'
+CRAWL_TURN_RATE = 20.0     # deg/s for kcrL / kcrR
+COMMAND_LATENCY = 0.005    # seconds between a command arriving and being executed
+YAW_NOISE = 0.05           # standard deviation of the yaw noise, degrees
+FIRMWARE_TURN_CHECK = 0.8  # turn.h checks progress this often, seconds
+FIRMWARE_TURN_DONE = 78.0  # turn.h's success threshold, degrees
+FIRMWARE_TURN_ATTEMPTS = 10
+PLAN_SLOTS = 32            # planUpload.h's MAX_PLAN_STEPS
+MODEL = "Bittle"
+FIRMWARE_VERSION = "B02_250101"  # What the '?' query reports
+
+# gait name -> (speed in cm/s, yaw rate in deg/s); positive yaw rate is right
+GAITS = {
+    'wkF': (FORWARD_SPEED, 0.0),
+    'wk': (FORWARD_SPEED, 0.0),
+    'bkF': (-BACKWARD_SPEED, 0.0),
+    'bk': (-BACKWARD_SPEED, 0.0),
+    'vtL': (0.0, -TURN_RATE),
+    'vtR': (0.0, TURN_RATE),
+    'crL': (FORWARD_SPEED / 2, -CRAWL_TURN_RATE),
+    'crR': (FORWARD_SPEED / 2, CRAWL_TURN_RATE),
+}
+
+
+class FakeBittle:
+    """
+    An in-process simulated Bittle with a pyserial-like interface.
+
+    The simulation is advanced lazily to the current time whenever the object
+    is used, so an idle robot costs nothing and many can run side by side.
+
+    Args:
+        port: Name reported as .port.
+        timeout: Read timeout in seconds, like serial.Serial.
+        telemetry_rate: ICM: lines per second (0 turns telemetry off).
+        speed_scale: Multiplies every gait speed and turn rate, to model a
+            faster or slower robot.
+        glitch_rate: Probability that a telemetry line carries a random yaw,
+            like the spikes in yawOutputs.txt.
+        boot_time: Seconds of boot output before "Ready!" (0 = already running).
+        walk_drift: Yaw drift in deg/s while walking forward (positive to
+            the right), like a robot with uneven legs.
+        seed: Seed for the noise, so runs can be repeated.
+    """
+
+    def __init__(self, port="fake", baudrate=115200, timeout=1.0, telemetry_rate=TELEMETRY_RATE,
+                 speed_scale=1.0, glitch_rate=0.0, boot_time=0.0, seed=None, name="Bittle", walk_drift=0.0):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.name = name
+        self.telemetry_rate = telemetry_rate
+        self.speed_scale = speed_scale
+        self.glitch_rate = glitch_rate
+        self.walk_drift = walk_drift
+        self.random = random.Random(seed)
+        self.is_open = True
+
+        # Robot state
+        self.x = 0.0
+        self.y = 0.0
+        self.yaw = self.random.uniform(0.0, 360.0)
+        self.gait = 'balance'
+        self.speed = 0.0
+        self.yaw_rate = 0.0
+        self.turn_left = None      # degrees left of a one-shot 'k vtR <angle>' turn
+        self.joints = {}
+        self.gyro_balance = True
+        self.voice = True
+        self.trail = []            # (x, y, marker down) every time the pen state or gait changes
+        self.commands_received = 0
+
+        # Firmware closed-loop turn (turn.h) state
+        self.fw_turn = None        # 'L' or 'R' while a turn is running
+        self.fw_start_yaw = 0.0
+        self.fw_attempts = 0
+        self.fw_next_check = 0.0
+
+        self.binary_frames = False # IMU output as binary frames (binaryFrames.h) instead of ICM: lines
+
+        # Uploaded plan (planUpload.h) state
+        self.plan_steps = []       # (skill, seconds, marker angle) waiting to run
+        self.plan_running = False
+        self.plan_number = 0
+        self.plan_step_end = 0.0
+
+        self._lock = threading.Condition()
+        self._output = bytearray()
+        self._pending = []         # (due time, command text)
+        self._input = b''
+        self._now = time.monotonic()
+        self._powered_at = self._now   # millis() counts from here
+        self._ready_at = self._now + boot_time
+        self._next_telemetry = self._ready_at
+        if boot_time > 0:
+            with self._lock:
+                self._emit("Initializing...")
+
+    # --- pyserial-like interface ---
+
+    @property
+    def in_waiting(self):
+        with self._lock:
+            self._advance(time.monotonic())
+            return len(self._output)
+
+    def write(self, data):
+        with self._lock:
+            now = time.monotonic()
+            self._advance(now)
+            self._input += bytes(data)
+            *lines, self._input = self._input.split(b'\n')
+            for line in lines:
+                text = line.decode(errors="ignore").strip()
+                if text:
+                    self._pending.append((now + COMMAND_LATENCY, text))
+            self._lock.notify_all()
+        return len(data)
+
+    def read(self, size=1):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self._advance(now)
+                if self._output or not self.is_open:
+                    data = bytes(self._output[:size])
+                    del self._output[:size]
+                    return data
+                if deadline is not None and now >= deadline:
+                    return b''
+                self._wait(now, deadline)
+
+    def readline(self):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self._advance(now)
+                end = self._output.find(b'\n')
+                if end >= 0 or not self.is_open:
+                    end = end + 1 if end >= 0 else len(self._output)
+                    data = bytes(self._output[:end])
+                    del self._output[:end]
+                    return data
+                if deadline is not None and now >= deadline:
+                    return b''
+                self._wait(now, deadline)
+
+    def reset_input_buffer(self):
+        with self._lock:
+            self._advance(time.monotonic())
+            self._output.clear()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        with self._lock:
+            self.is_open = False
+            self._lock.notify_all()
+
+    def pose(self):
+        """Returns the simulated (x cm, y cm, yaw degrees)."""
+        with self._lock:
+            self._advance(time.monotonic())
+            return self.x, self.y, self.yaw
+
+    # --- simulation ---
+
+    def _wait(self, now, deadline):
+        """Sleeps until the next thing the simulation will produce (or a write)."""
+        wake = [self._ready_at if now < self._ready_at else math.inf]
+        if self.telemetry_rate > 0:
+            wake.append(self._next_telemetry)
+        if self._pending:
+            wake.append(self._pending[0][0])
+        if self.fw_turn:
+            wake.append(self.fw_next_check)
+        if self.plan_running:
+            wake.append(self.plan_step_end)
+        if deadline is not None:
+            wake.append(deadline)
+        self._lock.wait(max(min(wake) - now, 0.0005))
+
+    def _advance(self, now):
+        """Moves the simulation forward to now, emitting telemetry and echoes on the way."""
+        while True:
+            # The next discrete event: a telemetry tick, a command, or a turn check.
+            events = []
+            if self.telemetry_rate > 0 and now >= self._ready_at:
+                events.append((self._next_telemetry, 'telemetry'))
+            if self._pending:
+                events.append((max(self._pending[0][0], self._ready_at), 'command'))
+            if self.fw_turn:
+                events.append((self.fw_next_check, 'fw_turn'))
+            if self.plan_running:
+                events.append((self.plan_step_end, 'plan'))
+            if self._ready_at > self._now:
+                events.append((self._ready_at, 'ready'))
+            if not events:
+                break
+            when, kind = min(events)
+            if when > now:
+                break
+            self._integrate(when)
+            if kind == 'telemetry':
+                self._emit_telemetry()
+                self._next_telemetry = max(self._next_telemetry + 1.0 / self.telemetry_rate, self._ready_at)
+            elif kind == 'command':
+                self._execute(self._pending.pop(0)[1])
+            elif kind == 'fw_turn':
+                self._check_firmware_turn()
+            elif kind == 'plan':
+                self._next_plan_step()
+            elif kind == 'ready':
+                self._emit("Ready!")
+        self._integrate(now)
+
+    def _integrate(self, when):
+        dt = when - self._now
+        if dt <= 0:
+            return
+        self._now = when
+        yaw_step = self.yaw_rate * self.speed_scale * dt
+        if self.turn_left is not None:
+            if abs(yaw_step) >= abs(self.turn_left):
+                yaw_step = self.turn_left
+                self._set_gait('balance')
+            else:
+                self.turn_left -= yaw_step
+        heading = math.radians(self.yaw)
+        distance = self.speed * self.speed_scale * dt
+        self.x += distance * math.cos(heading)
+        self.y += distance * math.sin(heading)
+        self.yaw = (self.yaw + yaw_step) % 360.0
+
+    def _emit(self, line):
+        self._output += line.encode() + b'\n'
+        self._lock.notify_all()
+
+    def _emit_telemetry(self):
+        yaw = self.yaw + self.random.gauss(0.0, YAW_NOISE)
+        if self.glitch_rate and self.random.random() < self.glitch_rate:
+            yaw = self.random.uniform(0.0, 360.0)
+        ax, ay, az = self.random.gauss(0.0, 0.02), self.random.gauss(0.0, 0.02), 9.8
+        if self.binary_frames:
+            millis = int((self._now - self._powered_at) * 1000)
+            self._output += encode_imu_frame(millis, ax, ay, az, yaw % 360, 0.0, 0.0)
+            self._lock.notify_all()
+        else:
+            self._emit(f"ICM:\t{ax:.2f} {ay:.2f} {az:.2f} {yaw % 360:.2f} 0.00 0.00")
+
+    def _marker_down(self):
+        return float(self.joints.get(3, 0)) > 0
+
+    def _set_gait(self, gait):
+        self.gait = gait
+        self.speed, self.yaw_rate = GAITS.get(gait, (0.0, 0.0))
+        if gait in ('wkF', 'wk'):
+            self.yaw_rate += self.walk_drift
+        self.turn_left = None
+        self.trail.append((self.x, self.y, self._marker_down()))
+
+    def _execute(self, text):
+        self.commands_received += 1
+        token = text[0]
+        argument = text[1:].strip()
+        if token == 'k':
+            skill = argument.split()
+            name = skill[0] if skill else ''
+            self._set_gait(name)
+            if len(skill) > 1 and name in ('vtL', 'vtR'):
+                # One-shot turn by an angle, e.g. 'k vtR 90'
+                self.turn_left = float(skill[1]) * (1 if name == 'vtR' else -1)
+        elif token in ('i', 'm'):
+            values = argument.split()
+            for joint, angle in zip(values[0::2], values[1::2]):
+                self.joints[int(joint)] = float(angle)
+            self.trail.append((self.x, self.y, self._marker_down()))
+        elif token == 'd':
+            self._set_gait('rest')
+            self.joints.clear()
+        elif token == 'g':
+            self.gyro_balance = not self.gyro_balance
+        elif token == 'X':
+            self.voice = not argument.endswith('d')  # 'XAd' turns the voice module off
+        elif token in ('E', 'e'):
+            self._start_firmware_turn('L' if token == 'E' else 'R')
+        elif token == 'U':
+            self._upload_plan(argument)
+        elif token == 'F':
+            self.binary_frames = argument == '1'
+            self._emit("Binary frames on" if self.binary_frames else "Binary frames off")
+        elif token == '?':
+            self._emit(MODEL)
+            self._emit(FIRMWARE_VERSION)
+        self._emit(token)
+
+    # --- turn.h emulation ('E' / 'e') ---
+
+    def _start_firmware_turn(self, side):
+        if self.fw_turn:
+            return
+        self.fw_turn = side
+        self.fw_attempts = 0
+        self.fw_start_yaw = self._signed_yaw()
+        self.fw_next_check = self._now + FIRMWARE_TURN_CHECK
+        self._emit(f"Starting {'Left' if side == 'L' else 'Right'} Turn 90 Degrees...")
+        self._emit(f"Start Yaw: {self.fw_start_yaw:.2f}")
+        self._firmware_turn_task(0.7)
+
+    def _firmware_turn_task(self, seconds):
+        self._set_gait('vt' + self.fw_turn)
+        self.turn_left = TURN_RATE * seconds * (1 if self.fw_turn == 'R' else -1)
+
+    def _signed_yaw(self):
+        # The firmware reports ypr[0] in [-180, 180).
+        return wrap_degrees(self.yaw)
+
+    def _check_firmware_turn(self):
+        current = self._signed_yaw()
+        if self.fw_turn == 'L':
+            diff = self.fw_start_yaw - current
+        else:
+            diff = current - self.fw_start_yaw
+        diff = wrap_degrees(diff)
+        self._emit(f"Current Yaw: {current:.2f}")
+        self._emit(f"Yaw Diff: {diff:.2f}")
+        self._emit(f"Attempt: {self.fw_attempts + 1}")
+        if abs(diff) >= FIRMWARE_TURN_DONE:
+            self._emit(f"{'Left' if self.fw_turn == 'L' else 'Right'} turn complete!")
+            self.fw_turn = None
+            self._set_gait('balance')
+        elif self.fw_attempts < FIRMWARE_TURN_ATTEMPTS:
+            self.fw_attempts += 1
+            self._firmware_turn_task(0.4)
+            self.fw_next_check = self._now + FIRMWARE_TURN_CHECK
+        else:
+            self._emit("Turn failed - max attempts reached")
+            self.fw_turn = None
+            self._set_gait('balance')
+
+
+    # --- planUpload.h emulation ('U') ---
+
+    def _upload_plan(self, argument):
+        append = argument.startswith('+')
+        if append:
+            argument = argument[1:]
+        else:
+            self.plan_steps = []
+            self.plan_number = 0
+        for step in argument.split(';'):
+            fields = step.split()
+            if len(fields) != 3:
+                continue
+            if len(self.plan_steps) == PLAN_SLOTS:
+                self._emit("Plan full")
+                break
+            self.plan_steps.append((fields[0], int(fields[1]) / 1000.0, int(fields[2])))
+        if not self.plan_steps and not append:
+            if self.plan_running:
+                self._finish_plan()
+            return
+        if not self.plan_running and self.plan_steps:
+            self.plan_running = True
+            self.plan_step_end = self._now
+
+    def _next_plan_step(self):
+        if not self.plan_steps:
+            self._finish_plan()
+            return
+        skill, seconds, marker = self.plan_steps.pop(0)
+        self.plan_number += 1
+        self.joints[3] = float(marker)
+        self._set_gait(skill)
+        self.plan_step_end = self._now + seconds
+        self._emit(f"Plan step: {self.plan_number} {PLAN_SLOTS - len(self.plan_steps)}")
+
+    def _finish_plan(self):
+        self.plan_running = False
+        self.plan_steps = []
+        self._set_gait('balance')
+        self._emit("Plan done")
+
+
+def serve_pty(fake):
+    """
+    Exposes a FakeBittle on a pseudo-terminal so unmodified scripts can open it
+    as their SERIAL_PORT. Returns the device path; the pump runs on daemon
+    threads until the process exits.
+    """
+    import tty
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+
+    def pump_in():
+        while fake.is_open:
+            data = os.read(master, 1024)
+            if data:
+                fake.write(data)
+
+    def pump_out():
+        while fake.is_open:
+            data = fake.read(1024)
+            if data:
+                os.write(master, data)
+
+    threading.Thread(target=pump_in, daemon=True).start()
+    threading.Thread(target=pump_out, daemon=True).start()
+    return os.ttyname(slave)
+
+
+def _run_robot(index, plan, results, closed_loop):
+    """Runs one plan against one FakeBittle and records its timings."""
+    from ackTracker import AckTracker
+    from commandWriter import CommandWriter
+    from imuReader import ImuReader
+    from motionPlan import run_plan
+
+    fake = FakeBittle(port=f"fake{index}", timeout=0.1, seed=index)
+    reader = ImuReader(fake).start()
+    tracker = AckTracker(fake, reader)
+    writer = CommandWriter(tracker)
+    start = time.monotonic()
+    run_plan(writer, plan, reader=reader if closed_loop else None)
+    results[index] = (time.monotonic() - start, tracker, writer.sent)
+    tracker.wait_idle()
+    reader.stop()
+    fake.close()
+
+
+def benchmark(robots, scale, closed_loop):
+    """Runs shape.py's square on several simulated robots in parallel."""
+    import contextlib
+    import io
+    from ackTracker import LatencyHistogram
+    from shape import SQUARE_PLAN
+
+    plan = [segment._replace(duration=segment.duration * scale) for segment in SQUARE_PLAN]
+    results = {}
+    threads = [threading.Thread(target=_run_robot, args=(index, plan, results, closed_loop))
+               for index in range(robots)]
+    start = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.monotonic() - start
+
+    durations = [duration for duration, _, _ in results.values()]
+    commands = sum(sent for _, _, sent in results.values())
+    overall = LatencyHistogram()
+    for _, tracker, _ in results.values():
+        overall.merge(tracker.overall)
+    print(f"\n--- FAKE BITTLE BENCHMARK ({robots} robot(s), durations x{scale}) ---")
+    print(f"  wall time            {wall:.2f}s")
+    print(f"  sequence duration    min {min(durations):.2f}s  max {max(durations):.2f}s")
+    print(f"  commands sent        {commands}")
+    print(f"  max queue depth      {max(tracker.max_depth for _, tracker, _ in results.values())}")
+    if overall.count:
+        p50, p95, p99 = (1000 * overall.percentile(f) for f in (0.5, 0.95, 0.99))
+        print(f"  command round trip   p50 {p50:.1f} ms  p95 {p95:.1f} ms  p99 {p99:.1f} ms  max {1000 * overall.max:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated Bittle for hardware-free testing.")
+    parser.add_argument("--robots", type=int, default=1, help="number of simulated robots to run in parallel")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every plan duration by this")
+    parser.add_argument("--timed-turns", action="store_true", help="use the timed turns instead of closed-loop ones")
+    parser.add_argument("--pty", action="store_true", help="serve one simulated robot on a pty instead")
+    args = parser.parse_args()
+
+    if args.pty:
+        fake = FakeBittle(timeout=0.1)
+        print(f"INFO: Simulated Bittle listening on {serve_pty(fake)} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            fake.close()
+        return
+
+    benchmark(args.robots, args.scale, not args.timed_turns)
+
+
+if __name__ == "__main__":
+    main()
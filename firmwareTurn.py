@@ -0,0 +1,182 @@
+# firmwareTurn.py
+# Host side of the closed-loop 90° turns in turn.h. 'E' starts a left turn
+# and 'e' a right turn; the firmware keeps nudging with vtL/vtR and reports
+# its progress until the yaw has changed by 78° ("Left turn complete!") or it
+# has tried ten times ("Turn failed - max attempts reached").
+#
+# FirmwareTurner sends the token and follows those progress lines as they are
+# read by an ImuReader, and resolves a future the moment the turn finishes,
+# so a sequence continues straight away instead of sleeping 5-6 s after
+# 'k vtR 90', and a failed turn raises instead of being slept through.
+#
+# Usage:
+#   python firmwareTurn.py R L                 # on the robot found by discovery.py
+#   python firmwareTurn.py --fake R R R R      # a full spin on a simulated robot
+
+import argparse
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import namedtuple
+
+# --- Command Definitions ---
+TURN_LEFT_90 = b'E\n'
+TURN_RIGHT_90 = b'e\n'
+REST = b'd\n'
+
+# --- Firmware Turn Configuration ---
+FIRMWARE_TURN_TIMEOUT = 12.0   # turn.h gives up after 11 checks 0.8 s apart; allow a little more
+
+# The outcome of one firmware turn. yaw_diff is the last "Yaw Diff:" the
+# firmware reported (positive in the direction of the turn), attempts the
+# last "Attempt:", elapsed the seconds from sending the token to the result.
+TurnResult = namedtuple('TurnResult', ['side', 'ok', 'start_yaw', 'yaw_diff', 'attempts', 'elapsed'])
+
+
+class TurnFailed(Exception):
+    """A firmware turn ended without reaching the threshold (or never reported back)."""
+
+    def __init__(self, message, result):
+        super().__init__(message)
+        self.result = result
+
+
+class FirmwareTurner:
+    """
+    Starts turn.h turns and tracks them from the firmware's messages.
+
+    Args:
+        ser: The serial connection (or a CommandWriter / AckTracker around it).
+        reader: A running ImuReader on the same connection; the turner
+            listens to its non-IMU lines.
+        on_progress: Optional on_progress(yaw_diff, attempt) called at every
+            firmware progress check.
+    """
+
+    def __init__(self, ser, reader, on_progress=None):
+        self.ser = ser
+        self.on_progress = on_progress
+        self.future = None
+        self._lock = threading.Lock()
+        reader.add_listener(self.on_line)
+
+    def start(self, side):
+        """
+        Starts a 90° turn, side 'L' or 'R', and returns a concurrent.futures
+        Future that resolves to a TurnResult, or raises TurnFailed.
+        """
+        if side not in ('L', 'R'):
+            raise ValueError(f"side must be 'L' or 'R', not {side!r}")
+        with self._lock:
+            if self.future is not None and not self.future.done():
+                # turn.h ignores a new turn while one is running.
+                raise RuntimeError("A firmware turn is already running.")
+            self.future = concurrent.futures.Future()
+            self.future.set_running_or_notify_cancel()
+            self.side = side
+            self.sent_at = time.monotonic()
+            self.start_yaw = None
+            self.yaw_diff = 0.0
+            self.attempts = 0
+            future = self.future
+        self.ser.write(TURN_LEFT_90 if side == 'L' else TURN_RIGHT_90)
+        return future
+
+    def on_line(self, line, t):
+        """ImuReader listener: follows the progress lines of the running turn."""
+        with self._lock:
+            future = self.future
+            if future is None or future.done():
+                return
+            name, _, value = line.partition(":")
+            if name in ("Start Yaw", "Yaw Diff", "Attempt"):
+                try:
+                    number = float(value)
+                except ValueError:
+                    return
+                if name == "Start Yaw":
+                    self.start_yaw = number
+                    return
+                if name == "Yaw Diff":
+                    self.yaw_diff = number
+                    return
+                self.attempts = int(number)
+                if self.on_progress:
+                    self.on_progress(self.yaw_diff, self.attempts)
+                return
+            if line.endswith("turn complete!"):
+                future.set_result(self._result(True, t))
+            elif line.startswith("Turn failed"):
+                result = self._result(False, t)
+                future.set_exception(TurnFailed(
+                    f"Firmware turn failed after {result.attempts} attempts ({result.yaw_diff:.1f}° of 90°).", result))
+
+    def _result(self, ok, t):
+        return TurnResult(self.side, ok, self.start_yaw, self.yaw_diff, self.attempts, t - self.sent_at)
+
+    def abandon(self):
+        """Gives up on the running turn (e.g. after a timeout) so a new one can start."""
+        with self._lock:
+            future = self.future
+            if future is None or future.done():
+                return
+            result = self._result(False, time.monotonic())
+            future.set_exception(TurnFailed("The firmware did not report the end of the turn.", result))
+
+    def turn(self, side, timeout=FIRMWARE_TURN_TIMEOUT):
+        """Turns 90° to side and blocks until the firmware reports the result. Returns a TurnResult."""
+        future = self.start(side)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            self.abandon()
+            return future.result()
+
+    async def turn_async(self, side, timeout=FIRMWARE_TURN_TIMEOUT):
+        """await-able version of turn(), for asyncio sequences."""
+        future = asyncio.wrap_future(self.start(side))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self.abandon()
+            return await future
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run turn.h's closed-loop 90° turns from the host.")
+    parser.add_argument("turns", nargs="+", choices=["L", "R"], help="turns to make, in order")
+    parser.add_argument("--port", help="serial port of the robot (default: found by discovery.py)")
+    parser.add_argument("--fake", action="store_true", help="turn a simulated robot")
+    args = parser.parse_args()
+
+    from connection import prepare_connection
+    from discovery import open_robot
+    from imuReader import ImuReader
+
+    opened = open_robot(args)
+    if opened is None:
+        return
+    _, ser = opened
+
+    prepare_connection(ser)
+    reader = ImuReader(ser).start()
+    turner = FirmwareTurner(ser, reader, lambda diff, attempt: print(f"  attempt {attempt}: {diff:.1f}°"))
+    try:
+        for side in args.turns:
+            print(f"ACTION: Firmware turn {'LEFT' if side == 'L' else 'RIGHT'} 90°...")
+            try:
+                result = turner.turn(side)
+                print(f"INFO: Turned {result.yaw_diff:.1f}° in {result.elapsed:.2f}s ({result.attempts} checks).")
+            except TurnFailed as e:
+                print(f"ERROR: {e}")
+                break
+    finally:
+        reader.stop()
+        ser.write(REST)
+        time.sleep(0.5)
+        ser.close()
+
+
+if __name__ == "__main__":
+    main()
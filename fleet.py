@@ -0,0 +1,195 @@
+# fleet.py
+# Runs the same drawing plan on several Bittles at once from a single process.
+# Every robot gets its own thread (and its own IMU reader), so each follows
+# its own clock; the main thread only prints a status board once a second.
+#
+# Usage:
+#   python fleet.py                                  # every Bittle that answers a handshake
+#   python fleet.py --ports /dev/tty.BittleC4_SSP /dev/tty.BittleA9_SSP --shape square
+#   python fleet.py --fake 8                         # eight simulated robots
+
+import argparse
+import sys
+import threading
+import time
+
+import serial
+
+from connection import prepare_connection
+from discovery import discover_bittles
+from imuReader import ImuReader
+from motionPlan import run_plan
+from shape import SQUARE_PLAN, TRIANGLE_PLAN
+
+# --- Fleet Configuration ---
+BAUD_RATE = 115200
+STATUS_INTERVAL = 1.0     # Seconds between status board updates
+
+# --- Command Definitions ---
+TURN_OFF_BALANCE = b'gb\n'
+REST = b'd\n'
+
+PLANS = {'triangle': TRIANGLE_PLAN, 'square': SQUARE_PLAN}
+
+
+class RobotOutput:
+    """
+    Stands in for sys.stdout while the fleet runs, and prefixes every line
+    printed by a robot's thread with that robot's name, so the progress output
+    of all the robots stays readable.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.partial = {}
+
+    def write(self, text):
+        name = threading.current_thread().name
+        with self.lock:
+            text = self.partial.pop(name, '') + text
+            *lines, rest = text.split('\n')
+            for line in lines:
+                self.stream.write(f"[{name}] {line}\n" if name.startswith("robot:") else line + '\n')
+            if rest:
+                self.partial[name] = rest
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class StatusBoard:
+    """Thread-safe status of every robot in the fleet."""
+
+    def __init__(self, names, steps):
+        self.lock = threading.Lock()
+        self.steps = steps
+        self.rows = {name: {'state': 'connecting', 'step': 0, 'segment': '', 'start': None, 'end': None}
+                     for name in names}
+
+    def update(self, name, **fields):
+        with self.lock:
+            self.rows[name].update(fields)
+
+    def on_step(self, name):
+        """Returns an on_step callback for run_plan that records the robot's progress."""
+        def on_step(index, segment):
+            self.update(name, step=index, segment=segment.name if segment else '')
+        return on_step
+
+    def finished(self):
+        with self.lock:
+            return all(row['state'] in ('done', 'failed') for row in self.rows.values())
+
+    def print_board(self, stream):
+        now = time.monotonic()
+        with self.lock:
+            lines = ["", "--- FLEET STATUS ---"]
+            for name, row in self.rows.items():
+                elapsed = ((row['end'] or now) - row['start']) if row['start'] else 0.0
+                lines.append(f"  {name:<28} {row['state']:<10} step {row['step']:>2}/{self.steps}  "
+                             f"{elapsed:6.1f}s  {row['segment']}")
+        stream.write('\n'.join(lines) + '\n')
+        stream.flush()
+
+
+def open_port(port):
+    """Opens one real robot the same way connect_to_bittle does in shape.py."""
+    return prepare_robot(serial.Serial(port, BAUD_RATE, timeout=2))
+
+
+def prepare_robot(ser):
+    """Readies an open connection for drawing (turns off auto-balancing)."""
+    ser.timeout = 2
+    prepare_connection(ser, [TURN_OFF_BALANCE])
+    return ser
+
+
+def run_robot(name, connect, plan, board, closed_loop):
+    """Connects to one robot and runs the plan on it. Runs on the robot's own thread."""
+    ser = None
+    reader = None
+    try:
+        ser = connect()
+        reader = ImuReader(ser).start() if closed_loop else None
+        board.update(name, state='running', start=time.monotonic())
+        run_plan(ser, plan, reader=reader, on_step=board.on_step(name))
+        board.update(name, state='done', end=time.monotonic())
+    except Exception as e:
+        print(f"ERROR: {e}")
+        board.update(name, state='failed', end=time.monotonic(), segment=str(e))
+    finally:
+        if reader:
+            reader.stop()
+        if ser and ser.is_open:
+            ser.write(REST)
+            time.sleep(0.5)
+            ser.close()
+
+
+def run_fleet(robots, plan, closed_loop=True):
+    """
+    Runs plan on every robot concurrently and prints a status board until all
+    of them have finished.
+
+    Args:
+        robots: A list of (name, connect) pairs, where connect() opens and
+            returns that robot's serial connection.
+        plan: A list of motionPlan Segments.
+        closed_loop: Run the turns closed-loop on each robot's IMU yaw.
+
+    Returns:
+        The final StatusBoard.
+    """
+    board = StatusBoard([name for name, _ in robots], len(plan))
+    stdout = sys.stdout
+    sys.stdout = RobotOutput(stdout)
+    try:
+        threads = [threading.Thread(target=run_robot, name=f"robot:{name}",
+                                    args=(name, connect, plan, board, closed_loop), daemon=True)
+                   for name, connect in robots]
+        for thread in threads:
+            thread.start()
+        while not board.finished():
+            time.sleep(STATUS_INTERVAL)
+            board.print_board(stdout)
+    finally:
+        sys.stdout = stdout
+    return board
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a drawing plan on several Bittles at once.")
+    parser.add_argument("--ports", nargs="+", help="serial ports to use (default: every Bittle that answers a handshake)")
+    parser.add_argument("--shape", choices=sorted(PLANS), default="triangle", help="plan to draw")
+    parser.add_argument("--fake", type=int, metavar="N", help="use N simulated robots instead of real ones")
+    parser.add_argument("--timed-turns", action="store_true", help="do not close the turns on the IMU yaw")
+    args = parser.parse_args()
+
+    if args.fake:
+        from fakeBittle import FakeBittle
+        robots = [(f"fake{index}", lambda index=index: FakeBittle(port=f"fake{index}", timeout=0.1, seed=index))
+                  for index in range(args.fake)]
+    elif args.ports:
+        robots = [(port, lambda port=port: open_port(port)) for port in args.ports]
+    else:
+        # The handshake leaves the connections open and ready, so there is no
+        # fixed settle wait per robot.
+        found = discover_bittles(keep_open=True)
+        if not found:
+            print("ERROR: No Bittles answered. Pass their ports with --ports.")
+            sys.exit(1)
+        robots = [(info.name, lambda ser=ser: prepare_robot(ser)) for info, ser in found]
+
+    print(f"INFO: Running the {args.shape} on {len(robots)} robot(s)...")
+    board = run_fleet(robots, PLANS[args.shape], closed_loop=not args.timed_turns)
+    failed = [name for name, row in board.rows.items() if row['state'] == 'failed']
+    if failed:
+        print(f"WARNING: {len(failed)} robot(s) failed: {', '.join(failed)}")
+    else:
+        print("INFO: All robots finished.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# headingHold.py
+# Keeps the robot pointing the same way while it walks forward. The yaw at
+# the start of a straight segment is the target; when the heading drifts off
+# it by more than a small deadband, the walk is briefly swapped for the
+# matching crawl turn (kcrL / kcrR), which still moves forward, until the
+# error is back near zero. Nudges are rate-limited so the walk gait always
+# dominates, and the segment is lengthened a little to make up the ground the
+# slower crawl loses.
+
+import time
+
+from turnControl import wrap_degrees
+
+# --- Command Definitions ---
+NUDGE_LEFT = b'kcrL\n'
+NUDGE_RIGHT = b'kcrR\n'
+HOLD_GAITS = (b'kwkF\n', b'kwk\n')   # Only forward walking is held; the crawl turns move forward
+
+# --- Heading Hold Configuration ---
+HOLD_DEADBAND = 2.0        # Heading errors below this are left alone (degrees)
+NUDGE_MAX_TIME = 0.6       # A single nudge never runs longer than this (seconds)
+MIN_NUDGE_GAP = 0.4        # Walk at least this long between two nudges
+NUDGE_SPEED_RATIO = 0.5    # The crawl covers about this fraction of the walk's ground
+MAX_EXTENSION = 0.1        # Nudges may lengthen a segment by at most this fraction
+
+
+class HeadingHold:
+    """
+    Chooses, tick by tick, between a segment's walk gait and a corrective
+    crawl turn, from the newest yaw of reader.
+
+    Args:
+        reader: A running ImuReader.
+        deadband: Allowed heading error in degrees before a nudge is sent.
+    """
+
+    def __init__(self, reader, deadband=HOLD_DEADBAND):
+        self.reader = reader
+        self.deadband = deadband
+        self.target = None
+        self.nudge = None          # Nudge command while one is running
+        self.nudge_started = 0.0
+        self.next_nudge = 0.0
+        self.nudges = 0
+        self.nudge_time = 0.0
+        self.max_error = 0.0
+
+    def start(self, now=None):
+        """Takes the current yaw as the heading to hold. Returns False if there is no yaw yet."""
+        frame = self.reader.latest()
+        self.target = frame.yaw if frame is not None else None
+        self.next_nudge = (time.monotonic() if now is None else now) + MIN_NUDGE_GAP
+        return self.target is not None
+
+    def error(self):
+        """Degrees the robot has drifted off the target (positive is right), or None."""
+        frame = self.reader.latest()
+        if self.target is None or frame is None or not frame.ok:
+            return None
+        return wrap_degrees(frame.yaw - self.target)
+
+    def command(self, gait, now=None):
+        """Returns the command to send this tick: gait, or a nudge back towards the target."""
+        now = time.monotonic() if now is None else now
+        error = self.error()
+        if error is None or gait not in HOLD_GAITS:
+            return gait
+        self.max_error = max(self.max_error, abs(error))
+
+        if self.nudge is not None:
+            # Stop as soon as the error is (nearly) gone or has changed sign.
+            overshot = (error < 0) if self.nudge == NUDGE_LEFT else (error > 0)
+            if abs(error) > self.deadband / 2 and not overshot and now - self.nudge_started < NUDGE_MAX_TIME:
+                return self.nudge
+            self.nudge_time += now - self.nudge_started
+            self.nudge = None
+            self.next_nudge = now + MIN_NUDGE_GAP
+            return gait
+
+        if abs(error) > self.deadband and now >= self.next_nudge:
+            # Drifted right (positive error): crawl left, and the other way round.
+            self.nudge = NUDGE_LEFT if error > 0 else NUDGE_RIGHT
+            self.nudge_started = now
+            self.nudges += 1
+            return self.nudge
+        return gait
+
+    def extension(self, duration, now=None):
+        """
+        Seconds to add to a segment of duration to make up the ground lost
+        while nudging, counting a nudge that is still running up to now.
+        """
+        nudge_time = self.nudge_time
+        if self.nudge is not None:
+            nudge_time += max((time.monotonic() if now is None else now) - self.nudge_started, 0.0)
+        return min(nudge_time * (1.0 - NUDGE_SPEED_RATIO), MAX_EXTENSION * duration)
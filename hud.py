@@ -0,0 +1,69 @@
+# hud.py
+# A cached control window for the teleop scripts. The fixed help text is
+# drawn once; the frame is only rebuilt (and re-shown) when a status line
+# actually changes, and never more often than MAX_REDRAW_RATE, so an idle
+# window costs next to nothing between key polls.
+
+import time
+
+import cv2
+import numpy as np
+
+# --- HUD Configuration ---
+MAX_REDRAW_RATE = 30.0    # Upper bound on re-renders per second
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+WHITE = (255, 255, 255)
+
+
+class Hud:
+    """
+    A control window made of static text plus named status lines.
+
+    Args:
+        title: The window title passed to cv2.imshow.
+        size: (height, width) of the window in pixels.
+        max_rate: Most re-renders per second.
+    """
+
+    def __init__(self, title="Bittle Control", size=(200, 400), max_rate=MAX_REDRAW_RATE):
+        self.title = title
+        self.background = np.zeros((size[0], size[1], 3), dtype=np.uint8)
+        self.status = {}          # name -> (text, org, scale, color, thickness)
+        self.min_interval = 1.0 / max_rate
+        self.dirty = True
+        self.last_render = 0.0
+        self.renders = 0
+
+    def add_text(self, text, org, scale=0.6, color=WHITE, thickness=1):
+        """Draws text into the static background (once, not per frame)."""
+        cv2.putText(self.background, text, org, FONT, scale, color, thickness)
+        self.dirty = True
+
+    def set_status(self, name, text, org, scale=0.6, color=WHITE, thickness=1):
+        """Sets a status line; the window is only redrawn if it changed. None removes it."""
+        line = None if text is None else (text, org, scale, color, thickness)
+        if self.status.get(name) != line:
+            if line is None:
+                del self.status[name]
+            else:
+                self.status[name] = line
+            self.dirty = True
+
+    def refresh(self, now=None):
+        """
+        Re-renders and shows the window if something changed and the redraw
+        rate allows it. Returns True if a new frame was shown.
+        """
+        now = time.monotonic() if now is None else now
+        if not self.dirty or now - self.last_render < self.min_interval:
+            return False
+        frame = self.background
+        if self.status:
+            frame = frame.copy()
+            for text, org, scale, color, thickness in self.status.values():
+                cv2.putText(frame, text, org, FONT, scale, color, thickness)
+        cv2.imshow(self.title, frame)
+        self.dirty = False
+        self.last_render = now
+        self.renders += 1
+        return True
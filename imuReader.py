@@ -0,0 +1,195 @@
+# imuReader.py
+# Reads the Bittle's serial output on a background thread and keeps the most
+# recent IMU frames in a fixed-size ring buffer, so control code can look up
+# the newest yaw without blocking on serial I/O. The IMU samples may arrive
+# as text lines or as binary frames (binaryFrames.py); both are understood.
+
+import threading
+import time
+from collections import namedtuple
+
+from binaryFrames import split_stream
+from yawFilter import YawFilter
+
+# --- Reader Configuration ---
+RING_SIZE = 512        # Number of IMU frames kept in memory
+READ_CHUNK = 256       # Largest single read from the serial port, in bytes
+
+# One parsed IMU sample. t is the time.monotonic() time the line arrived.
+# ok is False when the yaw filter rejected the raw reading; yaw then holds the
+# last accepted value instead.
+ImuFrame = namedtuple('ImuFrame', ['t', 'yaw', 'pitch', 'roll', 'ax', 'ay', 'az', 'ok'],
+                      defaults=[True])
+
+
+def parse_imu_line(line):
+    """
+    Parses one "ICM:" or "MCU:" telemetry line.
+
+    The six values after the prefix are the accelerometer axes followed by
+    yaw/pitch/roll (yaw is the 4th value, YPR[0]).
+
+    Returns (yaw, pitch, roll, ax, ay, az) with yaw normalised to [0, 360),
+    or None if the line is not a complete IMU line.
+    """
+    if not (line.startswith("ICM:") or line.startswith("MCU:")):
+        return None
+    parts = line[4:].split()
+    if len(parts) < 6:
+        return None
+    try:
+        ax, ay, az, yaw, pitch, roll = (float(value) for value in parts[:6])
+    except ValueError:
+        return None
+    return yaw % 360, pitch, roll, ax, ay, az
+
+
+class ImuRing:
+    """
+    A fixed-size ring buffer of ImuFrames with a single writer.
+
+    The writer stores the frame first and bumps the counter afterwards, so
+    readers never need a lock: they see either the old or the new count, and
+    every slot below the count they read is already filled in.
+    """
+
+    def __init__(self, size=RING_SIZE):
+        self.size = size
+        self.frames = [None] * size
+        self.count = 0  # Total number of frames ever appended
+
+    def append(self, frame):
+        self.frames[self.count % self.size] = frame
+        self.count += 1
+
+    def latest(self):
+        """Returns the newest frame, or None if nothing has arrived yet."""
+        count = self.count
+        if count == 0:
+            return None
+        return self.frames[(count - 1) % self.size]
+
+    def since(self, seq):
+        """
+        Returns (frames, new_seq): every frame appended after sequence number
+        seq, oldest first. Pass new_seq back in on the next call. If the reader
+        fell more than a full ring behind, only the last RING_SIZE frames are
+        returned.
+        """
+        count = self.count
+        start = max(seq, count - self.size)
+        return [self.frames[i % self.size] for i in range(start, count)], count
+
+
+class ImuReader(threading.Thread):
+    """
+    Background thread that owns all reads from the serial connection.
+
+    IMU lines and binary IMU frames are parsed into the ring buffer (and
+    passed to any frame listeners as listener(frame)); every other line
+    (command echoes, firmware messages) is passed to the registered
+    listeners as listener(line, t). Once a reader is running, nothing else
+    should read from the same connection.
+
+    Yaw readings go through a YawFilter before they are stored, so glitches
+    never reach the ring. Pass yaw_filter=False to store the raw values.
+    """
+
+    def __init__(self, ser, size=RING_SIZE, yaw_filter=None):
+        super().__init__(name="ImuReader", daemon=True)
+        self.ser = ser
+        self.ring = ImuRing(size)
+        self.yaw_filter = YawFilter() if yaw_filter is None else yaw_filter
+        self.listeners = []
+        self.frame_listeners = []
+        self.lines_read = 0
+        self.binary_frames = 0     # IMU samples that arrived as binary frames
+        self.frame_errors = 0      # Binary frames dropped for a bad CRC or length
+        self._running = threading.Event()
+
+    def add_listener(self, listener):
+        """Registers listener(line, t) to be called for every non-IMU line."""
+        self.listeners.append(listener)
+
+    def add_frame_listener(self, listener):
+        """Registers listener(frame) to be called for every ImuFrame, after it is in the ring."""
+        self.frame_listeners.append(listener)
+
+    def start(self):
+        self._running.set()
+        super().start()
+        return self
+
+    def stop(self, timeout=2.0):
+        """Asks the thread to finish and waits for it (at most one serial timeout)."""
+        self._running.clear()
+        if self.is_alive():
+            self.join(timeout)
+
+    def latest(self):
+        """Returns the newest ImuFrame in O(1), or None."""
+        return self.ring.latest()
+
+    def run(self):
+        pending = b''
+        while self._running.is_set():
+            try:
+                # Block for the first byte (bounded by the port's timeout),
+                # then take whatever else has already arrived in one go.
+                data = self.ser.read(min(max(1, self.ser.in_waiting), READ_CHUNK))
+            except Exception as e:
+                if self._running.is_set():
+                    print(f"ERROR: IMU reader stopped: {e}")
+                break
+            if not data:
+                continue
+            now = time.monotonic()
+            items, pending, errors = split_stream(pending + data)
+            self.frame_errors += errors
+            for item in items:
+                if isinstance(item, bytes):
+                    line = item.decode(errors="ignore").strip()
+                    if not line:
+                        continue
+                    self.lines_read += 1
+                    values = parse_imu_line(line)
+                else:
+                    self.binary_frames += 1
+                    values = (item.yaw % 360, item.pitch, item.roll, item.ax, item.ay, item.az)
+                if values is not None:
+                    frame = self._make_frame(now, values)
+                    self.ring.append(frame)
+                    for listener in self.frame_listeners:
+                        listener(frame)
+                else:
+                    for listener in self.listeners:
+                        listener(line, now)
+
+    def _make_frame(self, t, values):
+        yaw, pitch, roll, ax, ay, az = values
+        ok = True
+        if self.yaw_filter:
+            yaw, ok = self.yaw_filter.update(yaw, t)
+        return ImuFrame(t, yaw, pitch, roll, ax, ay, az, ok)
+
+
+def get_yaw_from_bittle(source):
+    """
+    Returns the newest yaw reading in [0, 360), or None if none is available.
+
+    source is normally an ImuReader, in which case this is an O(1) lookup that
+    never touches the port, and the yaw has been through the reader's filter.
+    A plain serial connection is still accepted: its input buffer is drained
+    and the freshest (unfiltered) yaw in it is returned.
+    """
+    if isinstance(source, ImuReader):
+        frame = source.latest()
+        return frame.yaw if frame is not None else None
+
+    yaw = None
+    while source.in_waiting:
+        line = source.readline().decode(errors="ignore").strip()
+        values = parse_imu_line(line)
+        if values is not None:
+            yaw = values[0]
+    return yaw
@@ -0,0 +1,192 @@
+# inputBackends.py
+# Where the teleop driver gets its keys from. The OpenCV window is only one
+# option: the terminal backend reads single key presses from stdin, and the
+# socket backends take keys from another process over UDP or a Unix socket,
+# so the driver also runs headless and can be driven remotely.
+#
+# Every backend has the same three methods:
+#   poll()        - the next key code, or NO_KEY; never blocks for long
+#   draw(driver)  - refresh whatever the backend shows (may do nothing)
+#   close()       - give the terminal/window/socket back
+#
+# Remote driving:
+#   python inputBackends.py w              # send 'w' to a driver on the default UDP port
+#   python inputBackends.py --to unix:/tmp/bittle.sock s
+
+import argparse
+import os
+import select
+import socket
+import sys
+import time
+
+from teleop import LINK_STALE_AFTER, NO_KEY
+
+DEFAULT_ADDRESS = "udp:127.0.0.1:9999"
+
+
+class WindowInput:
+    """Keys from an OpenCV window, which also shows the cached control HUD."""
+
+    def __init__(self):
+        # Imported here so the headless backends never pay for cv2.
+        import cv2
+        from hud import Hud
+
+        self.cv2 = cv2
+        self.hud = Hud("Bittle Control", size=(230, 400))
+        self.hud.add_text("Bittle Driver Control", (10, 30), 0.8, (255, 255, 255), 2)
+        self.hud.add_text("w/s: forward/back", (10, 70))
+        self.hud.add_text("a/d: spin L/R", (10, 100))
+        self.hud.add_text("space: stop | q: quit", (10, 130))
+        self.hud.add_text("Head: i(Up), k(Down), h(Center)", (10, 160))
+
+    def poll(self):
+        return self.cv2.waitKey(1) & 0xFF
+
+    def draw(self, driver):
+        # Only the mode line changes; the HUD redraws when its text does.
+        if driver.mode:
+            elapsed = int(time.monotonic() - driver.mode_started)
+            text = f"Mode: {driver.mode.replace('_', ' ')} ({elapsed}s)"
+        else:
+            text = "Mode: stopped"
+        self.hud.set_status("mode", text, (10, 190), 0.5, (0, 255, 0), 1)
+        if driver.reader is not None:
+            # Whole seconds only, so a live link does not redraw every frame.
+            age = driver.link_age()
+            if age is None:
+                link, color = "Link: waiting for IMU data", (0, 165, 255)
+            elif age < LINK_STALE_AFTER:
+                link, color = "Link: OK", (0, 255, 0)
+            else:
+                link, color = f"Link: no data for {int(age)}s", (0, 0, 255)
+            self.hud.set_status("link", link, (10, 215), 0.5, color, 1)
+        self.hud.refresh()
+
+    def close(self):
+        self.cv2.destroyAllWindows()
+
+
+class TerminalInput:
+    """
+    Single key presses from the terminal the script runs in, without Enter.
+
+    The terminal is put in cbreak mode (no line buffering, no echo, Ctrl+C
+    still works) and restored by close().
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdin
+        self.saved = None
+        if os.name == 'nt':
+            import msvcrt
+            self.msvcrt = msvcrt
+            return
+        import termios
+        import tty
+        self.msvcrt = None
+        self.termios = termios
+        if self.stream.isatty():
+            self.saved = termios.tcgetattr(self.stream)
+            tty.setcbreak(self.stream)
+
+    def poll(self):
+        if self.msvcrt:
+            return ord(self.msvcrt.getwch()) & 0xFF if self.msvcrt.kbhit() else NO_KEY
+        ready, _, _ = select.select([self.stream], [], [], 0)
+        if not ready:
+            return NO_KEY
+        key = os.read(self.stream.fileno(), 1)
+        return key[0] if key else NO_KEY
+
+    def draw(self, driver):
+        pass
+
+    def close(self):
+        if self.saved is not None:
+            self.termios.tcsetattr(self.stream, self.termios.TCSADRAIN, self.saved)
+            self.saved = None
+
+
+def _socket_for(address):
+    """Parses "udp:host:port" or "unix:/path" into (family, socket address)."""
+    kind, _, rest = address.partition(":")
+    if kind == "udp":
+        host, _, port = rest.rpartition(":")
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    if kind == "unix":
+        return socket.AF_UNIX, rest
+    raise ValueError(f"Unknown input address {address!r} (use udp:host:port or unix:/path)")
+
+
+class SocketInput:
+    """
+    Keys sent as datagrams by another process. Every byte of a datagram is one
+    key, so "w" starts walking and " q" stops and quits.
+
+    Args:
+        address: "udp:host:port" or "unix:/path/to/socket". Listen on
+            localhost unless the robot really should take orders from the
+            network; there is no authentication.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS):
+        family, self.address = _socket_for(address)
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        if family == socket.AF_UNIX and os.path.exists(self.address):
+            os.unlink(self.address)
+        self.sock.bind(self.address)
+        self.sock.setblocking(False)
+        self.pending = b''
+        print(f"INFO: Listening for keys on {address}")
+
+    def poll(self):
+        if not self.pending:
+            try:
+                self.pending = self.sock.recv(64)
+            except (BlockingIOError, InterruptedError):
+                return NO_KEY
+            if not self.pending:
+                # An empty datagram carries no key.
+                return NO_KEY
+        key, self.pending = self.pending[0], self.pending[1:]
+        return key
+
+    def draw(self, driver):
+        pass
+
+    def close(self):
+        self.sock.close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+def make_input(kind, address=DEFAULT_ADDRESS):
+    """Creates the backend called kind: "window", "terminal" or "socket"."""
+    if kind == "window":
+        return WindowInput()
+    if kind == "terminal":
+        return TerminalInput()
+    if kind == "socket":
+        return SocketInput(address)
+    raise ValueError(f"Unknown input backend {kind!r}")
+
+
+def send_keys(keys, address=DEFAULT_ADDRESS):
+    """Sends keys to a driver listening with SocketInput."""
+    family, target = _socket_for(address)
+    with socket.socket(family, socket.SOCK_DGRAM) as sock:
+        sock.sendto(keys.encode(), target)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send teleop keys to a driver running with --input socket.")
+    parser.add_argument("keys", help="keys to send, e.g. w, s, ' ' (stop) or q")
+    parser.add_argument("--to", default=DEFAULT_ADDRESS, help="udp:host:port or unix:/path")
+    args = parser.parse_args()
+    send_keys(args.keys, args.to)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# motionPlan.py
+# A small engine that runs a drawing sequence described as a list of segments,
+# instead of hand-unrolling every step as its own timed while-loop.
+
+import time
+from collections import namedtuple
+
+from commandWriter import CommandWriter
+from firmwareTurn import TurnFailed
+from headingHold import HOLD_GAITS, HeadingHold
+from profiling import phase
+from turnControl import turn_by
+
+# --- Command Definitions ---
+BALANCE = b'kbalance\n'   # Command to stop current movement and stand still
+
+# --- Scheduler Configuration ---
+# How often a repeated segment offers its gait and marker commands to the
+# CommandWriter. Commands the robot is already executing are only actually
+# re-sent at the writer's keep-alive interval.
+RESEND_INTERVAL = 0.1
+# How long the robot is left to settle after BALANCE. The marker move for the
+# next segment is sent at the start of this window, so the servo travels while
+# the body settles instead of after it.
+SETTLE_TIME = 0.6
+
+# A single step of a plan.
+#   name     - label used in the progress output and the timing report
+#   command  - gait/skill command to run (None for a marker-only step)
+#   marker   - marker command to hold during the step (None to leave it alone)
+#   duration - how long the step runs, in seconds
+#   repeat   - re-send command and marker every RESEND_INTERVAL while running;
+#              one-shot skills such as 'k vtR 90' are sent once and waited out
+#   settle   - settle time after the step, or None for the plan default
+#   angle    - for turns, the rotation in degrees (positive is right). When the
+#              plan runs with an ImuReader the turn is closed-loop on the yaw and
+#              ends as soon as the angle is reached; command and duration are
+#              then only the fallback if no yaw is available.
+#   distance - for walks planned by distance, the centimetres to cover (None
+#              otherwise); only used for statistics, the walk runs for duration.
+Segment = namedtuple('Segment', ['name', 'command', 'marker', 'duration', 'repeat', 'settle', 'angle', 'distance'],
+                     defaults=[True, None, None, None])
+
+
+def marker_step(name, marker, duration, settle=None):
+    """Holds the marker in position without moving the robot."""
+    return Segment(name, None, marker, duration, True, settle)
+
+
+def walk_step(name, command, marker, duration, settle=None, distance=None):
+    """Walks with the given gait while holding the marker in position."""
+    return Segment(name, command, marker, duration, True, settle, None, distance)
+
+
+def turn_step(name, command, marker, duration, settle=None, angle=None):
+    """Sends a one-shot turn skill once and waits for it to finish (or turns by angle, see Segment)."""
+    return Segment(name, command, marker, duration, False, settle, angle)
+
+
+def segment_kind(segment):
+    """Returns "walk", "turn" or "hold" (marker only) for a Segment."""
+    if segment.command is None:
+        return "hold"
+    if segment.angle is not None or not segment.repeat:
+        return "turn"
+    return "walk"
+
+
+def sleep_until(deadline):
+    """Sleeps until the given time.monotonic() deadline (returns at once if it has passed)."""
+    remaining = deadline - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
+
+
+def _drive_segment(ser, segment, end_time, reader=None, heading_hold=False, turner=None):
+    """Emits the commands for one segment until end_time (or until a closed-loop turn finishes)."""
+    if turner is not None and segment.angle in (90, -90):
+        if segment.marker:
+            ser.write(segment.marker)
+        try:
+            result = turner.turn('R' if segment.angle > 0 else 'L')
+            print(f"INFO: Firmware turn done: {result.yaw_diff:.1f}° in {result.elapsed:.2f}s.")
+        except TurnFailed as e:
+            print(f"WARNING: {e}")
+        # The firmware switched gaits on its own, so the writer's state is stale.
+        ser.forget()
+        return
+
+    if reader is not None and segment.angle is not None:
+        if segment.marker:
+            ser.write(segment.marker)
+        if turn_by(ser, reader, segment.angle) is not None:
+            return
+
+    if not segment.repeat:
+        if segment.command:
+            ser.write(segment.command)
+        if segment.marker:
+            ser.write(segment.marker)
+        sleep_until(end_time)
+        return
+
+    hold = None
+    if heading_hold and reader is not None and segment.command in HOLD_GAITS:
+        hold = HeadingHold(reader)
+        if not hold.start():
+            hold = None
+
+    def stop_time():
+        # Nudging lengthens the segment a little to make up the lost ground.
+        return end_time + hold.extension(segment.duration) if hold else end_time
+
+    # Sends are scheduled on absolute deadlines so write and sleep jitter
+    # does not accumulate over the length of the segment.
+    next_send = time.monotonic()
+    while next_send < stop_time():
+        if segment.command:
+            ser.write(hold.command(segment.command, next_send) if hold else segment.command)
+        if segment.marker:
+            ser.write(segment.marker)
+        next_send += RESEND_INTERVAL
+        sleep_until(min(next_send, stop_time()))
+    if hold and hold.nudges:
+        print(f"INFO: Heading hold: {hold.nudges} nudge(s), max error {hold.max_error:.1f}°, "
+              f"+{hold.extension(segment.duration):.2f}s.")
+
+
+def print_report(report):
+    """Prints planned vs. actual time for every segment of a finished plan."""
+    print("\n--- PLAN TIMING REPORT ---")
+    total_planned = 0.0
+    total_actual = 0.0
+    for name, planned, actual in report:
+        total_planned += planned
+        total_actual += actual
+        print(f"  {name:<48} planned {planned:6.2f}s  actual {actual:6.2f}s  ({actual - planned:+.2f}s)")
+    print(f"  {'TOTAL':<48} planned {total_planned:6.2f}s  actual {total_actual:6.2f}s  ({total_actual - total_planned:+.2f}s)")
+
+
+def run_plan(ser, plan, settle=SETTLE_TIME, reader=None, on_step=None, heading_hold=False, turner=None):
+    """
+    Runs a list of Segments on a monotonic-clock schedule.
+
+    After each segment the robot is sent BALANCE and given the settle time to
+    stop. The next segment's marker position is sent at the start of that settle
+    window so the two overlap.
+
+    Commands go through a CommandWriter, so the gait and marker of a running
+    segment are not re-sent on every tick.
+
+    Args:
+        ser: The active serial connection to the Bittle (or a CommandWriter).
+        plan: A list of Segments.
+        settle: Default settle time after each segment, in seconds.
+        reader: Optional running ImuReader. With it, turn segments that have
+            an angle are closed-loop on the streamed yaw.
+        on_step: Optional on_step(index, segment) called as each segment
+            starts, and once more with (len(plan), None) when the plan is done.
+        heading_hold: With a reader, hold the heading of forward walks with
+            small crawl-turn nudges (see headingHold.py).
+        turner: Optional firmwareTurn.FirmwareTurner. With it, 90° turns
+            run on the firmware (turn.h) and the plan moves on as soon as
+            the firmware reports the turn done.
+
+    Returns:
+        A list of (name, planned seconds, actual seconds) tuples, one per segment.
+    """
+    report = []
+    if not isinstance(ser, CommandWriter):
+        ser = CommandWriter(ser)
+
+    # Put Bittle in a known state and move the marker for the first segment.
+    with phase("pre-balance", "balance"):
+        ser.write(BALANCE)
+        if plan and plan[0].marker:
+            ser.write(plan[0].marker)
+        sleep_until(time.monotonic() + settle)
+
+    for index, segment in enumerate(plan):
+        print(f"STEP {index + 1}: {segment.name}")
+        if on_step:
+            on_step(index, segment)
+        segment_settle = settle if segment.settle is None else segment.settle
+        start_time = time.monotonic()
+        end_time = start_time + segment.duration
+        with phase(segment.name, segment_kind(segment), step=index + 1):
+            _drive_segment(ser, segment, end_time, reader, heading_hold, turner)
+
+        with phase("balance + next marker", "balance", step=index + 1):
+            ser.write(BALANCE)
+            if index + 1 < len(plan) and plan[index + 1].marker:
+                ser.write(plan[index + 1].marker)
+            sleep_until(time.monotonic() + segment_settle)
+
+        report.append((segment.name, segment.duration + segment_settle, time.monotonic() - start_time))
+
+    if on_step:
+        on_step(len(plan), None)
+    print_report(report)
+    print(f"  Serial traffic: {ser.summary()}")
+    return report
@@ -0,0 +1,101 @@
+#ifndef PLAN_UPLOAD_H
+#define PLAN_UPLOAD_H
+// Runs a whole motion plan that the host uploads in one line, so every step
+// is timed here with millis() instead of by the host over the serial link.
+//
+//   U wkF 2600 45;balance 600 -45;vtR 2000 -45   start a new plan
+//   U+ wkF 2600 45;balance 600 -45               append steps to the running plan
+//   U                                            abort: balance and drop the rest
+//
+// Each step is "<skill> <milliseconds> <marker angle>": servo 3 (the marker)
+// is moved first, then the skill runs for the given time. Progress is
+// reported as
+//   Plan step: <number> <free slots>   when step <number> (from 1) starts
+//   Plan done                          after the last step has run
+//   Plan full                          an upload did not fit; its remaining steps were dropped
+// Copy this file next to turn.h in src/ (see OpenCatEsp32.ino).
+
+#define PLAN_TOKEN 'U'      // Change if it collides with a token of your OpenCat version
+#define MAX_PLAN_STEPS 32   // Steps buffered at once; the host uploads more as they free up
+#define PLAN_SKILL_LEN 10
+
+struct PlanStep {
+  char skill[PLAN_SKILL_LEN];
+  unsigned int duration;
+  int marker;
+};
+
+// State variables for the non-blocking plan runner (a ring buffer of steps)
+PlanStep planSteps[MAX_PLAN_STEPS];
+int planHead = 0;          // Next step to run
+int planCount = 0;         // Steps waiting to run
+int planStepNumber = 0;
+bool planRunning = false;
+unsigned long planStepEnd = 0;
+
+void finishPlan() {
+  planRunning = false;
+  planCount = 0;
+  tQueue->addTask('k', "balance", 0);
+  PTL("Plan done");
+}
+
+void uploadPlan(char *args) {
+  while (*args == ' ') args++;
+  bool append = (*args == '+');
+  if (append) {
+    args++;
+  } else {
+    planHead = 0;
+    planCount = 0;
+    planStepNumber = 0;
+  }
+
+  char *step = strtok(args, ";");
+  while (step) {
+    if (planCount == MAX_PLAN_STEPS) {
+      PTL("Plan full");
+      break;
+    }
+    PlanStep &slot = planSteps[(planHead + planCount) % MAX_PLAN_STEPS];
+    int duration, marker;
+    if (sscanf(step, " %9s %d %d", slot.skill, &duration, &marker) == 3) {
+      slot.duration = duration;
+      slot.marker = marker;
+      planCount++;
+    }
+    step = strtok(NULL, ";");
+  }
+
+  if (planCount == 0 && !append) {
+    if (planRunning) finishPlan();  // An empty upload aborts the plan
+    return;
+  }
+  if (!planRunning && planCount > 0) {
+    planRunning = true;
+    planStepEnd = millis();
+  }
+}
+
+void checkPlanProgress() {
+  if (!planRunning || (long)(millis() - planStepEnd) < 0) return;
+
+  if (planCount == 0) {
+    finishPlan();
+    return;
+  }
+
+  PlanStep &step = planSteps[planHead];
+  planHead = (planHead + 1) % MAX_PLAN_STEPS;
+  planCount--;
+  planStepNumber++;
+
+  char markerArgs[12];
+  sprintf(markerArgs, "3 %d", step.marker);
+  tQueue->addTask('i', markerArgs, 0);
+  tQueue->addTask('k', step.skill, 0);
+  planStepEnd = millis() + step.duration;
+
+  PT("Plan step: "); PT(planStepNumber); PT(' '); PTL(MAX_PLAN_STEPS - planCount);
+}
+#endif
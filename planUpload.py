@@ -0,0 +1,250 @@
+# planUpload.py
+# Sends a whole motion plan to the firmware (planUpload.h) in a few lines
+# instead of driving every step from the host. The robot times the steps
+# itself with millis(), so Python sleep jitter and the per-command link
+# round trips drop out of long drawings; the host only listens to the
+# "Plan step:" events and tops the firmware's step buffer up as it drains.
+#
+# Usage:
+#   python planUpload.py --shape square            # on the robot found by discovery.py
+#   python planUpload.py --fake --shape triangle   # on a simulated robot
+#   python planUpload.py --fake --dxf fence_final.dxf --width 60
+
+import argparse
+import concurrent.futures
+import threading
+import time
+from collections import namedtuple
+
+from calibration import MotionModel
+from motionPlan import SETTLE_TIME, segment_kind
+
+# --- Upload Configuration ---
+PLAN_TOKEN = 'U'           # Must match PLAN_TOKEN in planUpload.h
+PLAN_SLOTS = 32            # Must match MAX_PLAN_STEPS in planUpload.h
+MAX_LINE = 240             # Longest upload line, well inside OpenCat's command buffer
+REFILL_SLOTS = 8           # Top the firmware up once this many slots are free
+DONE_MARGIN = 10.0         # Extra seconds to wait for "Plan done" beyond the planned time
+MARKER_UP_ANGLE = -45
+
+# One step as the firmware runs it: the marker goes to marker (degrees),
+# then the skill runs for ms milliseconds.
+PlanStep = namedtuple('PlanStep', ['skill', 'ms', 'marker', 'name'])
+
+
+def marker_angle(command, current):
+    """Returns the angle of an 'i3 <angle>' marker command, or current if command is None."""
+    if command is None:
+        return current
+    values = command.decode(errors="ignore")[1:].split()
+    return int(float(values[1])) if len(values) > 1 and values[0] == '3' else current
+
+
+def compile_plan(plan, settle=SETTLE_TIME, model=None):
+    """
+    Turns a list of motionPlan Segments into PlanSteps, with the same
+    BALANCE-and-settle between segments that run_plan uses.
+
+    Turns that have an angle (or a 'k vtR <angle>' one-shot skill) become
+    the in-place turn gait for the time the MotionModel gives for that angle;
+    the firmware only times gaits.
+    """
+    model = model or MotionModel()
+    steps = []
+    marker = marker_angle(plan[0].marker, MARKER_UP_ANGLE) if plan else MARKER_UP_ANGLE
+    steps.append(PlanStep("balance", round(settle * 1000), marker, "Pre-balance"))
+    for index, segment in enumerate(plan):
+        marker = marker_angle(segment.marker, marker)
+        words = segment.command.decode(errors="ignore")[1:].split() if segment.command else []
+        kind = segment_kind(segment)
+        if kind == "turn" and words and words[0] in ('vtR', 'vtL'):
+            angle = segment.angle if segment.angle is not None else (
+                float(words[1]) * (1 if words[0] == 'vtR' else -1) if len(words) > 1 else None)
+            if angle is not None:
+                words = ['vtR' if angle >= 0 else 'vtL']
+                seconds = model.duration('turn_right' if angle >= 0 else 'turn_left', angle)
+            else:
+                seconds = segment.duration
+        else:
+            seconds = segment.duration
+        steps.append(PlanStep(words[0] if words else "balance", round(seconds * 1000), marker, segment.name))
+
+        segment_settle = settle if segment.settle is None else segment.settle
+        if index + 1 < len(plan):
+            marker = marker_angle(plan[index + 1].marker, marker)
+        steps.append(PlanStep("balance", round(segment_settle * 1000), marker, "Settle"))
+    return steps
+
+
+def encode_steps(steps, append):
+    """Encodes steps as one upload line, e.g. b'U+ wkF 2600 45;balance 600 -45\\n'."""
+    body = ";".join(f"{step.skill} {step.ms} {step.marker}" for step in steps)
+    return f"{PLAN_TOKEN}{'+' if append else ''} {body}\n".encode()
+
+
+def take_line(steps, slots, append):
+    """Takes as many of steps as fit in slots and one MAX_LINE line. Returns (line, steps taken)."""
+    count = 0
+    while count < min(slots, len(steps)) and len(encode_steps(steps[:count + 1], append)) <= MAX_LINE:
+        count += 1
+    return encode_steps(steps[:count], append), count
+
+
+class PlanUploader:
+    """
+    Uploads compiled plans and follows their progress from the firmware's
+    "Plan step:" / "Plan done" lines, read by an ImuReader.
+
+    Args:
+        ser: The serial connection.
+        reader: A running ImuReader on the same connection.
+        on_step: Optional on_step(index, step) called as each step starts
+            on the robot (index counts from 0), like run_plan's on_step.
+    """
+
+    def __init__(self, ser, reader, on_step=None):
+        self.ser = ser
+        self.on_step = on_step
+        self.future = None
+        self.steps = []
+        self.pending = []
+        self.started = []          # Host arrival time of every "Plan step:" event
+        self.sent = 0              # Steps written so far
+        self.full = False
+        self._lock = threading.Lock()
+        reader.add_listener(self.on_line)
+
+    def start(self, steps):
+        """
+        Uploads steps (as many as the firmware buffers; the rest follow as
+        it drains) and returns a Future that resolves to the list of step
+        start times once the firmware reports "Plan done".
+        """
+        with self._lock:
+            if self.future is not None and not self.future.done():
+                raise RuntimeError("A plan is already running.")
+            self.future = concurrent.futures.Future()
+            self.future.set_running_or_notify_cancel()
+            self.steps = list(steps)
+            self.pending = list(steps)
+            self.started = []
+            self.sent = 0
+            self.full = False
+            self._send(PLAN_SLOTS, append=False)
+            return self.future
+
+    def _send(self, slots, append=True):
+        # Sends lines until slots are used up or nothing is left to send.
+        while self.pending and slots > 0:
+            line, count = take_line(self.pending, slots, append)
+            self.ser.write(line)
+            del self.pending[:count]
+            self.sent += count
+            slots -= count
+            append = True
+
+    def on_line(self, line, t):
+        """ImuReader listener: records step starts, refills the buffer, resolves the future."""
+        with self._lock:
+            future = self.future
+            if future is None or future.done():
+                return
+            if line.startswith("Plan step:"):
+                try:
+                    number = int(line.split(":", 1)[1].split()[0])
+                except (IndexError, ValueError):
+                    return
+                self.started.append(t)
+                index = len(self.started) - 1
+                # The free count on the line does not know about uploads still
+                # in flight, so count the slots from what was sent instead.
+                free = PLAN_SLOTS - (self.sent - number)
+                if free >= REFILL_SLOTS:
+                    self._send(free)
+            elif line == "Plan full":
+                self.full = True
+                return
+            elif line == "Plan done":
+                self.started.append(t)
+                future.set_result(self.started)
+                return
+            else:
+                return
+        if self.on_step and index < len(self.steps):
+            self.on_step(index, self.steps[index])
+
+    def abort(self):
+        """Stops the plan on the robot (it balances) and fails the future."""
+        self.ser.write(f"{PLAN_TOKEN}\n".encode())
+        with self._lock:
+            if self.future is not None and not self.future.done():
+                self.future.set_exception(RuntimeError("Plan aborted."))
+
+    def run(self, steps, timeout=None):
+        """
+        Uploads steps and blocks until the robot has run them all.
+
+        Returns:
+            A list of (name, planned seconds, actual seconds) per step, as
+            measured from the firmware's step events.
+        """
+        planned = sum(step.ms for step in steps) / 1000.0
+        future = self.start(steps)
+        try:
+            started = future.result(timeout if timeout is not None else planned + DONE_MARGIN)
+        except concurrent.futures.TimeoutError:
+            self.abort()
+            raise
+        if self.full:
+            print("WARNING: The firmware's plan buffer overflowed; some steps were dropped.")
+        return [(step.name, step.ms / 1000.0, end - begin)
+                for step, begin, end in zip(steps, started, started[1:])]
+
+
+def main():
+    from motionPlan import print_report
+    from shape import square_plan, triangle_plan
+
+    plans = {'triangle': triangle_plan, 'square': square_plan}
+    parser = argparse.ArgumentParser(description="Run a drawing plan on the firmware's plan runner.")
+    parser.add_argument("--shape", choices=sorted(plans), default="triangle", help="plan to draw")
+    parser.add_argument("--dxf", help="draw this DXF file instead (see dxfPath.py)")
+    parser.add_argument("--width", type=float, help="with --dxf, fit the drawing to this width in cm")
+    parser.add_argument("--robot", help="use this robot's stored calibration for the turn times")
+    parser.add_argument("--port", help="serial port of the robot (default: found by discovery.py)")
+    parser.add_argument("--fake", action="store_true", help="draw on a simulated robot")
+    args = parser.parse_args()
+
+    from calibration import REST, TURN_OFF_BALANCE, load_model
+    from connection import prepare_connection
+    from discovery import open_robot
+    from imuReader import ImuReader
+
+    model = load_model(args.robot) if args.robot else None
+    if args.dxf:
+        from dxfPath import build_plan
+        plan, _, _ = build_plan(args.dxf, width=args.width, model=model)
+    else:
+        plan = plans[args.shape](model)
+    steps = compile_plan(plan, model=model)
+
+    opened = open_robot(args)
+    if opened is None:
+        return
+    _, ser = opened
+
+    prepare_connection(ser, [TURN_OFF_BALANCE])
+    reader = ImuReader(ser).start()
+    uploader = PlanUploader(ser, reader, lambda index, step: print(f"STEP {index + 1}: {step.name}"))
+    print(f"INFO: Uploading {len(steps)} steps ({sum(step.ms for step in steps) / 1000:.1f}s)...")
+    try:
+        print_report(uploader.run(steps))
+    finally:
+        reader.stop()
+        ser.write(REST)
+        time.sleep(0.5)
+        ser.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+# poseEstimator.py
+# Keeps a running estimate of where the robot is (x, y, heading) by dead
+# reckoning: the distance comes from the gait being commanded and the
+# calibrated speed of that gait (calibration.py), the heading from the
+# streamed IMU yaw. Every IMU frame and every command is an O(1) update, and
+# the pose can be read at any time.
+#
+# With a pose, draw_polygon does not have to trust that each walk lands on
+# the next corner: it computes the next turn and walk from where the robot
+# actually is, so speed errors do not add up around the shape. The timed
+# drawing scripts (shape.py, rectangleWithEuler.py) do not use it; their
+# short backward walks line the marker up over a corner, which a pose of the
+# robot's body does not replace.
+#
+# Coordinates are in cm from the starting point, x along the starting
+# heading and y to its right; heading is in degrees, positive to the right,
+# as everywhere else in this repo.
+#
+# Usage:
+#   python poseEstimator.py --port /dev/tty.BittleC4_SSP   # draw a 30 cm square
+#   python poseEstimator.py --fake --size 40 --sides 3 --speed-error 1.1
+
+import argparse
+import math
+import threading
+import time
+from collections import namedtuple
+
+from calibration import MARKER_DOWN, MARKER_UP, MotionModel
+from motionPlan import run_plan
+from turnControl import wrap_degrees
+
+# --- Estimator Configuration ---
+MIN_TURN = 3.0            # Corrections smaller than this are not worth a turn (degrees)
+MIN_WALK = 1.0            # ...or a walk (cm)
+
+# 'k' skill -> (motion in the MotionModel, direction). Every other skill
+# (balance, sit, ...) stands still.
+SKILL_MOTIONS = {
+    'wkF': ('forward', 1), 'wk': ('forward', 1),
+    'bkF': ('backward', -1), 'bk': ('backward', -1),
+    'vtR': ('turn_right', 1), 'vtL': ('turn_left', -1),
+}
+
+Pose = namedtuple('Pose', ['x', 'y', 'heading'])
+
+
+class PoseEstimator:
+    """
+    Wraps a serial connection and tracks the robot's pose from the commands
+    written through it and the IMU frames of reader.
+
+    Like AckTracker, every other attribute is forwarded to the wrapped
+    connection. Without a reader (or before the first frame) the heading is
+    integrated from the calibrated turn rate of the turn gaits instead.
+
+    Args:
+        ser: The serial connection (or FakeBittle).
+        reader: A running ImuReader on the same connection, or None.
+        model: The robot's MotionModel; defaults to the uncalibrated one.
+    """
+
+    def __init__(self, ser, reader=None, model=None):
+        self.ser = ser
+        self.model = model or MotionModel()
+        self.x = 0.0
+        self.y = 0.0
+        self.heading = 0.0
+        self.speed = 0.0           # cm/s along the heading, negative backwards
+        self.turn_rate = 0.0       # deg/s, used only while there is no yaw
+        self.turn_until = math.inf # End of a one-shot 'k vtR <angle>' turn
+        self.last_t = time.monotonic()
+        self.last_yaw = None
+        self._lock = threading.Lock()
+        if reader is not None:
+            reader.add_frame_listener(self.on_frame)
+
+    def __getattr__(self, name):
+        return getattr(self.ser, name)
+
+    def write(self, data):
+        written = self.ser.write(data)
+        for command in data.split(b'\n'):
+            self.on_command(command)
+        return written
+
+    def on_command(self, command, t=None):
+        """Updates the commanded motion. Only gait changes and rest matter."""
+        text = command.decode(errors="ignore").strip()
+        if not text or text[0] not in ('k', 'd'):
+            return
+        words = text[1:].split()
+        skill = words[0] if text[0] == 'k' and words else ''
+        t = time.monotonic() if t is None else t
+        with self._lock:
+            self._advance(t)
+            motion, direction = SKILL_MOTIONS.get(skill, (None, 0))
+            rate = self.model.rates[motion][0] if motion else 0.0
+            self.speed = direction * rate if motion in ('forward', 'backward') else 0.0
+            self.turn_rate = direction * rate if motion in ('turn_right', 'turn_left') else 0.0
+            self.turn_until = math.inf
+            if self.turn_rate and len(words) > 1:
+                # One-shot turn by an angle ('k vtR 90'): the firmware stops on its own.
+                self.turn_until = t + self.model.duration(motion, float(words[1]))
+
+    def on_frame(self, frame):
+        """ImuReader frame listener: moves the pose to the frame's time and takes its yaw."""
+        if not frame.ok:
+            return
+        with self._lock:
+            self._advance(frame.t)
+            if self.last_yaw is not None:
+                self.heading += wrap_degrees(frame.yaw - self.last_yaw)
+            self.last_yaw = frame.yaw
+
+    def _advance(self, t):
+        # Walks along the current heading for the time since the last update.
+        dt = t - self.last_t
+        if dt <= 0:
+            return
+        if self.last_yaw is None and self.turn_rate:
+            turning = max(0.0, min(t, self.turn_until) - self.last_t)
+            self.heading += self.turn_rate * turning
+        if self.speed:
+            heading = math.radians(self.heading)
+            self.x += self.speed * dt * math.cos(heading)
+            self.y += self.speed * dt * math.sin(heading)
+        self.last_t = t
+
+    def pose(self, t=None):
+        """Returns the estimated Pose now (or at time t), without changing the estimate."""
+        t = time.monotonic() if t is None else t
+        with self._lock:
+            dt = max(t - self.last_t, 0.0)
+            heading = math.radians(self.heading)
+            return Pose(self.x + self.speed * dt * math.cos(heading),
+                        self.y + self.speed * dt * math.sin(heading), self.heading)
+
+    def correction(self, target):
+        """
+        Returns (degrees to turn, cm to walk) to reach target (x, y) from the
+        current pose, turning the short way round.
+        """
+        pose = self.pose()
+        dx, dy = target[0] - pose.x, target[1] - pose.y
+        bearing = math.degrees(math.atan2(dy, dx))
+        return wrap_degrees(bearing - pose.heading), math.hypot(dx, dy)
+
+
+def segments_to(estimator, target, marker=MARKER_DOWN):
+    """
+    Plans the turn and walk from the current pose estimate to target, using
+    the estimator's MotionModel.
+    """
+    degrees, distance = estimator.correction(target)
+    segments = []
+    if abs(degrees) >= MIN_TURN:
+        segments.append(estimator.model.turn(degrees, MARKER_UP))
+    if distance >= MIN_WALK:
+        segments.append(estimator.model.walk(distance, marker))
+    return segments
+
+
+def drive_to(estimator, target, marker=MARKER_DOWN, reader=None):
+    """Turns towards target and walks to it, planned from where the robot is now."""
+    segments = segments_to(estimator, target, marker)
+    if segments:
+        run_plan(estimator, segments, reader=reader)
+    return estimator.pose()
+
+
+def draw_polygon(estimator, corners, reader=None):
+    """
+    Draws the closed polygon through corners (cm, relative to the start).
+    Each side is planned from the pose at the end of the previous one, so
+    errors correct themselves instead of adding up.
+    """
+    poses = []
+    for corner in list(corners[1:]) + [corners[0]]:
+        poses.append(drive_to(estimator, corner, MARKER_DOWN, reader))
+    return poses
+
+
+def regular_polygon(size, sides):
+    """Corners of a regular polygon with the given side length, starting at the origin, turning right."""
+    corners = [(0.0, 0.0)]
+    heading = 0.0
+    for _ in range(sides - 1):
+        x, y = corners[-1]
+        corners.append((x + size * math.cos(heading), y + size * math.sin(heading)))
+        heading += 2 * math.pi / sides
+    return corners
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Draw a polygon with on-the-fly pose correction.")
+    parser.add_argument("--port", help="serial port of the robot (default: found by discovery.py)")
+    parser.add_argument("--fake", action="store_true", help="draw on a simulated robot")
+    parser.add_argument("--size", type=float, default=30.0, help="side length in cm")
+    parser.add_argument("--sides", type=int, default=4, help="number of sides")
+    parser.add_argument("--speed-error", type=float, default=1.0,
+                        help="with --fake, the robot walks this much faster than its calibration says")
+    args = parser.parse_args()
+
+    from calibration import TURN_OFF_BALANCE, REST, load_model
+    from connection import prepare_connection
+    from discovery import open_robot
+    from imuReader import ImuReader
+
+    opened = open_robot(args, speed_scale=args.speed_error)
+    if opened is None:
+        return
+    name, ser = opened
+
+    prepare_connection(ser, [TURN_OFF_BALANCE])
+    reader = ImuReader(ser).start()
+    # The simulator runs on the uncalibrated model, so --speed-error shows up as an error.
+    estimator = PoseEstimator(ser, reader, None if args.fake else load_model(name))
+    start = ser.pose() if args.fake else None
+    try:
+        corners = regular_polygon(args.size, args.sides)
+        poses = draw_polygon(estimator, corners, reader)
+        print(f"\n--- POSE REPORT ({args.sides} sides of {args.size:.0f} cm) ---")
+        for number, (corner, pose) in enumerate(zip(corners[1:] + corners[:1], poses)):
+            print(f"  corner {number + 1}: target ({corner[0]:6.1f}, {corner[1]:6.1f})  "
+                  f"estimate ({pose.x:6.1f}, {pose.y:6.1f}, {pose.heading:6.1f}°)")
+        if start:
+            # Where the simulator really ended up, in the estimator's frame.
+            x, y, _ = ser.pose()
+            heading = math.radians(start[2])
+            dx, dy = x - start[0], y - start[1]
+            true_x = dx * math.cos(heading) + dy * math.sin(heading)
+            true_y = -dx * math.sin(heading) + dy * math.cos(heading)
+            print(f"  simulator: ended at ({true_x:6.1f}, {true_y:6.1f}), "
+                  f"{math.hypot(true_x, true_y):.1f} cm from the start")
+    finally:
+        reader.stop()
+        ser.write(REST)
+        time.sleep(0.5)
+        ser.close()
+
+
+if __name__ == "__main__":
+    main()
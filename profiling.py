@@ -0,0 +1,129 @@
+# profiling.py
+# Records where the wall-clock time of a run goes: every phase (connect,
+# start delay, balance/settle, walking, turning, marker holds, rest) is timed
+# on the monotonic clock and can be exported as a Chrome trace, which opens in
+# chrome://tracing or https://ui.perfetto.dev as a timeline.
+#
+# Tracing is off unless the BITTLE_TRACE environment variable names an output
+# file; a disabled phase() costs one attribute check. With it set, the trace
+# is written and a per-category breakdown printed when the script exits:
+#   BITTLE_TRACE=square.json python shape.py
+
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+# --- Profiling Configuration ---
+TRACE_ENV = "BITTLE_TRACE"
+
+# One finished phase. start and end are time.monotonic() seconds.
+Phase = namedtuple('Phase', ['name', 'category', 'start', 'end', 'thread', 'args'])
+
+
+class Profiler:
+    """
+    Collects timed phases from any thread.
+
+    Phases may nest (a closed-loop turn inside a turn segment); the breakdown
+    counts every second once, against the innermost phase running at the time.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.origin = time.monotonic()
+        self.phases = []
+        self.threads = {}         # thread ident -> name
+
+    @contextlib.contextmanager
+    def _timed(self, name, category, args):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            thread = threading.current_thread()
+            self.threads[thread.ident] = thread.name
+            self.phases.append(Phase(name, category, start, time.monotonic(), thread.ident, args))
+
+    def phase(self, name, category="phase", **args):
+        """Context manager that times the code inside it as one phase."""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._timed(name, category, args)
+
+    def trace_events(self):
+        """Returns the phases as Chrome trace events (timestamps in microseconds)."""
+        pid = os.getpid()
+        micros = lambda t: round((t - self.origin) * 1e6)
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": ident, "args": {"name": name}}
+                  for ident, name in self.threads.items()]
+        for phase in self.phases:
+            events.append({"name": phase.name, "cat": phase.category, "ph": "X", "pid": pid, "tid": phase.thread,
+                           "ts": micros(phase.start), "dur": micros(phase.end) - micros(phase.start),
+                           "args": phase.args})
+        return events
+
+    def export(self, path):
+        """Writes the Chrome trace (JSON object format) to path."""
+        with open(path, "w") as trace:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, trace)
+
+    def breakdown(self):
+        """
+        Returns {category: seconds}, counting nested time only in the innermost
+        phase, so the values add up to the traced wall time.
+        """
+        totals = {}
+        by_thread = {}
+        for phase in self.phases:
+            by_thread.setdefault(phase.thread, []).append(phase)
+        for phases in by_thread.values():
+            phases.sort(key=lambda phase: (phase.start, -phase.end))
+            stack = []
+            for phase in phases:
+                while stack and stack[-1].end <= phase.start:
+                    stack.pop()
+                duration = phase.end - phase.start
+                totals[phase.category] = totals.get(phase.category, 0.0) + duration
+                if stack:
+                    parent = stack[-1].category
+                    totals[parent] -= duration
+                stack.append(phase)
+        return totals
+
+    def print_breakdown(self):
+        totals = self.breakdown()
+        total = sum(totals.values())
+        print("\n--- TIME BREAKDOWN ---")
+        for category, seconds in sorted(totals.items(), key=lambda item: -item[1]):
+            share = 100.0 * seconds / total if total else 0.0
+            print(f"  {category:<10} {seconds:7.2f}s  {share:5.1f}%")
+        print(f"  {'TOTAL':<10} {total:7.2f}s")
+
+
+_profiler = Profiler(enabled=bool(os.environ.get(TRACE_ENV)))
+
+
+def get_profiler():
+    """Returns the process-wide Profiler that phase() records into."""
+    return _profiler
+
+
+def phase(name, category="phase", **args):
+    """Times a phase on the process-wide profiler (a no-op unless BITTLE_TRACE is set)."""
+    return _profiler.phase(name, category, **args)
+
+
+def _write_trace():
+    path = os.environ.get(TRACE_ENV)
+    if not (_profiler.enabled and path and _profiler.phases):
+        return
+    _profiler.print_breakdown()
+    _profiler.export(path)
+    print(f"INFO: Timeline written to {path} (open it in https://ui.perfetto.dev or chrome://tracing)")
+
+
+atexit.register(_write_trace)
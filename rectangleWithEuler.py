@@ -2,9 +2,18 @@
 # A script to make Bittle perform a pre-defined, timed sequence of movements
 # as one continuous action.
 
+import argparse
 import serial
 import time
 
+from ackTracker import AckTracker
+from calibration import MotionModel, load_model
+from connection import prepare_connection
+from imuReader import ImuReader
+from motionPlan import marker_step, run_plan
+from profiling import phase
+from telemetryLog import RecordingSerial, TelemetryRecorder
+
 # --- Bittle Configuration ---
 # IMPORTANT: Make sure this is your Bittle's correct serial port!
 SERIAL_PORT = '/dev/tty.BittleA9_SSP' # Example port, change if needed
@@ -37,196 +46,106 @@ def connect_to_bittle():
     try:
         ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=2)
         print(f"INFO: Successfully connected to Bittle on {SERIAL_PORT}")
-        # Wait a moment for the connection to stabilize
-        time.sleep(2)
         # --- ADDED: Turn off auto-balancing to prevent jittering during the sequence ---
-        print("INFO: Turning off auto-balancing.")
-        ser.write(TURN_OFF_BALANCE)
-        time.sleep(0.5)
-        ser.write(TURN_OFF_VOICE)
-        print("INFO: Turning off voice command.")
-        time.sleep(0.5)
+        # Both init commands go out in one write as soon as the firmware is
+        # ready, instead of after fixed waits.
+        print("INFO: Turning off auto-balancing and voice command.")
+        prepare_connection(ser, [TURN_OFF_BALANCE, TURN_OFF_VOICE])
         return ser
     except serial.SerialException:
         print(f"ERROR: Could not connect to Bittle on {SERIAL_PORT}.")
         print("       Please check the port name and ensure the robot is on.")
         return None
-        
-def get_yaw_from_bittle(ser):
-    """
-    Reads yaw from the serial connection.
-    Returns yaw as a float, or None if unreadable.
-    """
-    while ser.in_waiting:
-        line = ser.readline().decode(errors="ignore").strip()
-        if line.startswith("ICM:") or line.startswith("MCU:"):
-            try:
-                # Strip prefix and split by whitespace
-                parts = line.split(":")[1].strip().split()
-                if len(parts) >= 6:
-                    yaw = float(parts[3])  # Yaw is the 4th value (YPR[0])
-                    return yaw % 360  # Normalize to [0, 360)
-            except (ValueError, IndexError):
-                continue
-    return None
-
-def turn_left_90_degrees(ser):
-    """
-    Turn right until yaw has changed by ~90 degrees.
-    """
-    print("ACTION: Turning right 90° based on yaw reading...")
 
-    ser.write(TURN_LEFT_90)
 
-def run_timed_square_sequence(ser):
+def run_timed_square_sequence(ser, reader=None, on_step=None, model=None):
     """
     Runs the pre-defined, timed sequence of movements.
-    This version now alternates commands rapidly inside a loop to ensure
-    both movement and marker position are executed simultaneously,
-    mimicking how the manual driver works.
-    
+    Walking steps keep re-sending both the gait and the marker position so
+    that movement and marker are executed simultaneously, mimicking how the
+    manual driver works.
+
     Args:
         ser: The active serial connection to the Bittle.
+        reader: Optional running ImuReader; with it the turns are closed-loop
+            on the streamed yaw and the forward walks hold their heading.
+        on_step: Optional run_plan on_step callback, e.g. a TelemetryRecorder's.
+        model: The robot's calibrated MotionModel, which turns the side
+            lengths (cm) and corners (degrees) into times; default:
+            uncalibrated speeds.
     """
+    model = model or MotionModel()
     print("\n--- INFO: Starting the continuous automated sequence in 3 seconds... ---")
-    time.sleep(3)
-
-    # Put Bittle in a known state (balanced) before starting.
-    print("ACTION: Balancing robot to start.")
-    ser.write(BALANCE)
-    time.sleep(2.0) # Give it time to get stable
+    with phase("start delay", "delay"):
+        time.sleep(3)
 
     print("--- SEQUENCE STARTING ---")
+    plan = [
+        marker_step("Holding Marker DOWN for 2.0 seconds.", MARKER_DOWN, 2.0),
+        model.walk(20.8, MARKER_DOWN, settle=0.2),
+        model.walk(6.5, MARKER_UP, backward=True),
+        model.turn(-90, settle=1.5),
+        model.walk(20.8, MARKER_DOWN),
+        model.walk(7.0, MARKER_UP, backward=True),
+        model.turn(-90, settle=1.5),
+        model.walk(21.6, MARKER_DOWN),
+        model.walk(7.0, MARKER_UP, backward=True),
+        model.turn(-90, settle=1.5),
+        model.walk(40.0, MARKER_DOWN),
+    ]
+    run_plan(ser, plan, reader=reader, on_step=on_step, heading_hold=True)
 
-    # --- Step 1: Marker DOWN only ---
-    print("STEP 1: Holding Marker DOWN for 2.60 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 2.0:
-        ser.write(MARKER_DOWN)
-        time.sleep(0.1)  # Continuously send the command
-    ser.write(BALANCE) 
-    time.sleep(1.5)    
-
-    print("STEP 2: Holding Marker DOWN for 2.60 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 2.60:
-        ser.write(WALK_FORWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_DOWN)
-        
-        time.sleep(0.1)  # Continuously send the command
-    ser.write(BALANCE) 
-    time.sleep(0.2)    
-    
-
-    # --- Step 2: Backward, marker up ---
-    start_time = time.time()
-    while time.time() - start_time < 1.30:
-        ser.write(WALK_BACKWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_UP)
-        time.sleep(0.05)
-    ser.write(BALANCE) 
-    time.sleep(1.5)    
-
-    # --- Step 3: Turn right, marker up ---
-    print("STEP 3: Marker is UP, turning RIGHT for 2.12 seconds.")
-    ser.write(MARKER_UP)
-    turn_left_90_degrees(ser)
-    ser.write(BALANCE) 
-    time.sleep(1.5)    
-
-    # --- Step 4: Forward, marker down ---
-    print("STEP 4: Marker DOWN, moving FORWARD for 3.40 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 2.60:
-        ser.write(WALK_FORWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_DOWN)
-        time.sleep(0.05)
-    ser.write(BALANCE) 
-    time.sleep(1.5)    
-
-    # --- Step 5: Backward, marker up ---
-    print("STEP 5: Marker UP, moving BACKWARD for 1.30 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 1.40:
-        ser.write(WALK_BACKWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_UP)
-        time.sleep(0.05)
-    ser.write(BALANCE) 
-    time.sleep(1.5)    
-    
-    # --- Step 6: Turn right, marker up ---
-    start_time = time.time()
-    ser.write(MARKER_UP)
-    turn_left_90_degrees(ser)
-    
-    ser.write(BALANCE) 
-    time.sleep(1.5)    
-
-    # --- Step 7: Forward, marker down ---
-    start_time = time.time()
-    while time.time() - start_time < 2.70:
-        ser.write(WALK_FORWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_DOWN)
-        time.sleep(0.05)
-    ser.write(BALANCE) 
-    time.sleep(1.5)    
-
-    # --- Step 8: Backward, marker up ---
-    start_time = time.time()
-    while time.time() - start_time < 1.40:
-        ser.write(WALK_BACKWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_UP)
-        time.sleep(0.05)
-    ser.write(BALANCE) 
-    time.sleep(1.5)   
-
-    # --- Step 9: Turn right, marker up ---
-    ser.write(MARKER_UP)
-    turn_left_90_degrees(ser)
-
-    ser.write(BALANCE) 
-    time.sleep(1.5)    
-
-    start_time = time.time()
-    while time.time() - start_time < 5.00:
-        ser.write(WALK_FORWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_DOWN)
-        time.sleep(0.05)
-    ser.write(BALANCE) 
-    time.sleep(1.5)    
-    
     print("\n--- INFO: Automated drawing sequence complete! ---")
-    time.sleep(1) # Final pause before resting
 
 
 def main():
     """
     Main function to connect to Bittle and run the automated sequence.
     """
-    bittle_serial = connect_to_bittle()
+    parser = argparse.ArgumentParser(description="Draw the square with Euler-angle feedback.")
+    parser.add_argument("--log", metavar="FILE", help="record the run to a telemetry log (see telemetryLog.py)")
+    parser.add_argument("--robot", help="time the square with this robot's stored calibration "
+                                        "(default: the robot on SERIAL_PORT)")
+    args = parser.parse_args()
+
+    from discovery import robot_name
+    model = load_model(args.robot or robot_name(SERIAL_PORT, "Bittle"))
+
+    with phase("connect", "connect"):
+        bittle_serial = connect_to_bittle()
     
     # Only proceed if the connection was successful
     if not bittle_serial:
         return
 
+    # Keep the IMU stream drained on a background thread; the turns then read
+    # the newest yaw from it without touching the port.
+    reader = ImuReader(bittle_serial).start()
+    # Times every command until the robot echoes it.
+    tracker = AckTracker(bittle_serial, reader)
+    # Optionally records every IMU frame, command and plan step for runAnalysis.py.
+    recorder = TelemetryRecorder(args.log).attach(reader) if args.log else None
+
     try:
         # Run the main sequence
-        run_timed_square_sequence(bittle_serial)
+        if recorder:
+            run_timed_square_sequence(RecordingSerial(tracker, recorder), reader, recorder.on_step, model)
+        else:
+            run_timed_square_sequence(tracker, reader, model=model)
     finally:
         # This code will run no matter what, ensuring the robot is safely shut down.
         print("INFO: Putting Bittle to rest...")
+        tracker.print_report()
+        reader.stop()
         if bittle_serial and bittle_serial.is_open:
-            bittle_serial.write(REST)
-            time.sleep(0.5)
-            bittle_serial.close()
+            with phase("rest", "rest"):
+                bittle_serial.write(REST)
+                time.sleep(0.5)
+                bittle_serial.close()
             print("INFO: Serial port closed. Goodbye!")
+        if recorder:
+            recorder.close()
+            print(f"INFO: Telemetry recorded to {args.log}")
 
 # This makes the script runnable from the command line
 if __name__ == "__main__":
@@ -0,0 +1,213 @@
+# runAnalysis.py
+# Judges how well a drawing run went from its telemetry log (telemetryLog.py)
+# instead of eyeballing yawOutputs.txt: per turn the angle achieved against
+# the one asked for, the heading drift while walking straight, how long the
+# robot takes to settle after BALANCE, and how long every segment really ran.
+#
+# Everything is computed on whole NumPy arrays (one searchsorted/interp per
+# question, no per-sample Python loop), so hours of 100 Hz logs take seconds.
+#
+# Usage:
+#   python runAnalysis.py square.tlog
+#   python runAnalysis.py runs/*.tlog --turns      # also list every turn
+
+import argparse
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from telemetryLog import KIND_COMMAND, KIND_IMU, KIND_STATE, load_array
+
+# --- Analysis Configuration ---
+SETTLE_RATE = 5.0         # The robot has settled once |yaw rate| stays below this (deg/s)
+RATE_WINDOW = 0.2         # Yaw rate is measured over this many seconds, so IMU noise does not count as motion
+STEP_KINDS = (b"walk", b"turn", b"hold")
+BALANCE = b"kbalance"
+
+# One run, ready for analysis. yaw is unwrapped (continuous, in degrees);
+# step_* arrays have one entry per plan step; balance_t holds the times
+# BALANCE was sent.
+RunData = namedtuple('RunData', ['t', 'yaw', 'step_t', 'step_end', 'step_kind', 'step_angle',
+                                 'step_duration', 'balance_t'])
+
+
+def unwrap_yaw(yaw):
+    """
+    Unwraps yaw readings in [0, 360) into a continuous heading, so a turn
+    across north reads 350 -> 370 instead of 350 -> 10. The first value is
+    kept as it is.
+    """
+    yaw = np.asarray(yaw, dtype=np.float64)
+    if yaw.size == 0:
+        return yaw
+    steps = (np.diff(yaw) + 180.0) % 360.0 - 180.0
+    return np.concatenate(([yaw[0]], yaw[0] + np.cumsum(steps)))
+
+
+def load_run(path):
+    """Loads a telemetry log into a RunData. Frames the yaw filter rejected are left out."""
+    records = load_array(path)
+    kind = records['kind']
+    text = records['text']
+
+    imu = kind == KIND_IMU
+    t = records['t'][imu].astype(np.float64)
+    yaw = unwrap_yaw(records['yaw'][imu])
+
+    states = records[kind == KIND_STATE]
+    steps = states[np.isin(states['text'], STEP_KINDS)]
+    done = states['t'][states['text'] == b"done"]
+    step_t = steps['t'].astype(np.float64)
+    # A step ends where the next one starts; the last at "done" (or the end of the log).
+    last = done[-1] if done.size else (t[-1] if t.size else (step_t[-1] if step_t.size else 0.0))
+    step_end = np.append(step_t[1:], last)
+
+    balance_t = records['t'][(kind == KIND_COMMAND) & (text == BALANCE)].astype(np.float64)
+    # Step states carry (index, angle, planned duration) in the first three values.
+    return RunData(t, yaw, step_t, step_end, steps['text'], steps['pitch'].astype(np.float64),
+                   steps['roll'].astype(np.float64), balance_t)
+
+
+def heading_at(run, times):
+    """Returns the unwrapped heading at each of times (interpolated between frames)."""
+    return np.interp(times, run.t, run.yaw)
+
+
+def motion_end(run):
+    """
+    Returns, per step, when its movement ended: the first BALANCE sent after
+    the step started (or the step end if there was none).
+    """
+    sent = np.append(run.balance_t, np.inf)[np.searchsorted(run.balance_t, run.step_t, side='left')]
+    return np.where(sent <= run.step_end, sent, run.step_end)
+
+
+def analyse_turns(run):
+    """
+    Returns (target, achieved, error) arrays in degrees, one entry per turn
+    step. achieved is measured from the step start to the step end, so it
+    includes whatever the robot turned while settling. Timed turns without
+    an angle have a NaN target and error.
+    """
+    turns = run.step_kind == b"turn"
+    achieved = heading_at(run, run.step_end[turns]) - heading_at(run, run.step_t[turns])
+    target = run.step_angle[turns]
+    return target, achieved, achieved - target
+
+
+def analyse_drift(run):
+    """
+    Returns (drift in degrees, drift rate in deg/s) per walk step: the heading
+    change between the start of the step and the BALANCE that ended it.
+    """
+    walks = run.step_kind == b"walk"
+    start = run.step_t[walks]
+    end = motion_end(run)[walks]
+    drift = heading_at(run, end) - heading_at(run, start)
+    seconds = np.maximum(end - start, 1e-9)
+    return drift, drift / seconds
+
+
+def settle_times(run, rate=SETTLE_RATE):
+    """
+    Returns, per step, how long after its BALANCE the yaw rate last exceeded
+    rate before the next step began (0 if it was already still).
+    """
+    if run.t.size < 2:
+        return np.zeros(run.step_t.size)
+    yaw_rate = np.abs(run.yaw - np.interp(run.t - RATE_WINDOW, run.t, run.yaw)) / RATE_WINDOW
+    moving = yaw_rate > rate
+    # Index of the last moving frame at or before each frame.
+    last_moving = np.maximum.accumulate(np.where(moving, np.arange(moving.size), -1))
+
+    balance = motion_end(run)
+    first = np.searchsorted(run.t, balance, side='left')
+    last = np.searchsorted(run.t, run.step_end, side='left') - 1
+    valid = last >= first
+    moved = last_moving[np.clip(last, 0, None)]
+    still_from = run.t[np.clip(moved + 1, 0, run.t.size - 1)]
+    settle = np.where(valid & (moved >= first), still_from - balance, 0.0)
+    return np.maximum(settle, 0.0)
+
+
+def segment_timing(run):
+    """Returns (planned, moving, total) seconds per step: the planned duration, time until BALANCE, and time until the next step."""
+    return run.step_duration, motion_end(run) - run.step_t, run.step_end - run.step_t
+
+
+def analyse_run(path):
+    """Analyses one log and returns a dict of the per-step arrays and the run summary."""
+    run = load_run(path)
+    target, achieved, error = analyse_turns(run)
+    drift, drift_rate = analyse_drift(run)
+    planned, moving, total = segment_timing(run)
+    settle = settle_times(run)
+    judged = error[~np.isnan(error)]
+    return {
+        'path': path,
+        'frames': run.t.size,
+        'seconds': float(run.t[-1] - run.t[0]) if run.t.size else 0.0,
+        'steps': run.step_t.size,
+        'turn_target': target, 'turn_achieved': achieved, 'turn_error': error,
+        'turn_mean_abs_error': float(np.mean(np.abs(judged))) if judged.size else float('nan'),
+        'turn_max_abs_error': float(np.max(np.abs(judged))) if judged.size else float('nan'),
+        'drift': drift, 'drift_rate': drift_rate,
+        'settle': settle,
+        'planned': planned, 'moving': moving, 'total': total,
+    }
+
+
+def _stat(values, fn):
+    return f"{fn(values):7.2f}" if values.size else "    n/a"
+
+
+def print_summary(result, turns=False):
+    print(f"\n--- RUN {result['path']} ({result['steps']} steps, {result['frames']} IMU frames, "
+          f"{result['seconds']:.1f}s) ---")
+    error = result['turn_error']
+    print(f"  turns            {error.size:>4}   mean |error| {result['turn_mean_abs_error']:6.2f}°   "
+          f"max |error| {result['turn_max_abs_error']:6.2f}°")
+    drift, drift_rate = result['drift'], result['drift_rate']
+    print(f"  straight drift   {drift.size:>4}   mean {_stat(drift, np.mean)}°   max |drift| "
+          f"{_stat(np.abs(drift), np.max)}°   mean rate {_stat(drift_rate, np.mean)}°/s")
+    settle = result['settle']
+    print(f"  settle (< {SETTLE_RATE:.0f}°/s)  median {_stat(settle, np.median)}s   max {_stat(settle, np.max)}s")
+    overrun = result['moving'] - result['planned']
+    print(f"  segment timing   moving vs planned: median {_stat(overrun, np.median)}s   "
+          f"max {_stat(overrun, np.max)}s   total {result['total'].sum():.1f}s")
+    if turns:
+        for number, (target, achieved, turn_error) in enumerate(zip(result['turn_target'], result['turn_achieved'], error)):
+            print(f"    turn {number + 1:>3}: target {target:7.1f}°  achieved {achieved:7.1f}°  error {turn_error:+6.1f}°")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Turn error, drift, settle and timing report for telemetry logs.")
+    parser.add_argument("logs", nargs="+", help="logs written by telemetryLog.TelemetryRecorder")
+    parser.add_argument("--turns", action="store_true", help="list every turn")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = []
+    for path in args.logs:
+        try:
+            results.append(analyse_run(path))
+        except (OSError, ValueError) as e:
+            print(f"ERROR: {path}: {e}")
+    for result in results:
+        print_summary(result, args.turns)
+    if not results:
+        sys.exit(1)
+    if len(results) > 1:
+        errors = np.concatenate([result['turn_error'] for result in results])
+        errors = errors[~np.isnan(errors)]
+        print(f"\n--- ALL RUNS ({len(results)}) ---")
+        print(f"  turns {errors.size}, mean |error| {_stat(np.abs(errors), np.mean)}°, "
+              f"p95 |error| {_stat(np.abs(errors), lambda e: np.percentile(e, 95))}°")
+    frames = sum(result['frames'] for result in results)
+    print(f"\nINFO: Analysed {frames} frames in {time.perf_counter() - started:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,16 @@
+import argparse
 import serial
 import time
 
+from ackTracker import AckTracker
+from calibration import MotionModel, load_model
+from connection import prepare_connection
+from firmwareTurn import FirmwareTurner
+from imuReader import ImuReader
+from motionPlan import marker_step, walk_step, turn_step, run_plan
+from profiling import phase
+from telemetryLog import RecordingSerial, TelemetryRecorder
+
 # --- Bittle Configuration ---
 # IMPORTANT: Make sure this is your Bittle's correct serial port!
 SERIAL_PORT = '/dev/tty.BittleC4_SSP' # Example port, change if needed
@@ -35,12 +45,10 @@ def connect_to_bittle():
     try:
         ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=2)
         print(f"INFO: Successfully connected to Bittle on {SERIAL_PORT}")
-        # Wait a moment for the connection to stabilize
-        time.sleep(2)
         # --- ADDED: Turn off auto-balancing to prevent jittering during the sequence ---
+        # Sent as soon as the firmware is ready, instead of after fixed waits.
         print("INFO: Turning off auto-balancing.")
-        ser.write(TURN_OFF_BALANCE)
-        time.sleep(0.5)
+        prepare_connection(ser, [TURN_OFF_BALANCE])
         return ser
     except serial.SerialException:
         print(f"ERROR: Could not connect to Bittle on {SERIAL_PORT}.")
@@ -71,263 +79,140 @@ def backward_pattern(bittle):
         time.sleep(1.0)
     print("\n--- BACKWARD PATTERN COMPLETE ---")
 
-def run_timed_triangle_sequence(ser):
+
+def triangle_plan(model=None):
     """
-    Executes a triangle-drawing movement using fixed steps (no loop),
-    matching the structure of run_timed_square_sequence.
+    The triangle in centimetres and degrees, timed for the robot described by
+    model (its calibrated MotionModel; default: uncalibrated speeds).
+    The short backward walks bring the marker back over the corner.
     """
-    print("\n--- INFO: Starting triangle drawing sequence in 3 seconds... ---")
-    time.sleep(3)
-
-    # Initial balance
-    print("ACTION: Balancing robot to start.")
-    ser.write(BALANCE)
-    time.sleep(2.0)
-
-    # Lower the marker
-    print("STEP 1: Lowering marker for 2.0 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 2.0:
-        ser.write(MARKER_DOWN)
-        time.sleep(0.1)
-    ser.write(BALANCE)
-    time.sleep(1.5)
-
-    # --- SIDE 1 ---
-    print("STEP 2: Marker DOWN, moving FORWARD for 2.6 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 2.6:
-        ser.write(WALK_FORWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_DOWN)
-        time.sleep(0.1)
-    ser.write(BALANCE)
-    time.sleep(1.5)
-
-    start_time = time.time()
-    while time.time() - start_time < 0.8:
-        ser.write(WALK_BACKWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_UP)
-        time.sleep(0.05)
-    ser.write(BALANCE)
-    time.sleep(1.5)
+    model = model or MotionModel()
+    return [
+        marker_step("Lowering marker.", MARKER_DOWN, 2.0),
+        # --- SIDE 1 ---
+        model.walk(20.8, MARKER_DOWN),
+        model.walk(4.0, MARKER_UP, backward=True),
+        model.turn(120),
+        # --- SIDE 2 ---
+        model.walk(20.8, MARKER_DOWN),
+        model.walk(3.5, MARKER_UP, backward=True),
+        model.turn(120),
+        # --- SIDE 3 ---
+        model.walk(20.8, MARKER_DOWN),
+        marker_step("Marker UP to finish.", MARKER_UP, 2.0, settle=0),
+    ]
 
-    print("STEP 3: Marker UP, turning RIGHT 120°.")
-    ser.write(b'k vtR 120\n')  # <-- Turn 120 degrees
-    time.sleep(0.05)
-    ser.write(MARKER_UP)
-    time.sleep(6.0)
-    ser.write(BALANCE)
-    time.sleep(1.5)
 
-    # --- SIDE 2 ---
-    print("STEP 4: Marker DOWN, moving FORWARD for 2.6 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 2.6:
-        ser.write(WALK_FORWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_DOWN)
-        time.sleep(0.1)
-    ser.write(BALANCE)
-    time.sleep(1.5)
+def square_plan(model=None):
+    """The square in centimetres and degrees, timed for model like triangle_plan."""
+    model = model or MotionModel()
+    return [
+        marker_step("Holding Marker DOWN for 2.0 seconds.", MARKER_DOWN, 2.0),
+        # --- SIDE 1 ---
+        model.walk(20.8, MARKER_DOWN),
+        model.walk(3.0, MARKER_UP, backward=True),
+        model.turn(90),
+        # --- SIDE 2 ---
+        model.walk(20.8, MARKER_DOWN),
+        model.walk(4.0, MARKER_UP, backward=True),
+        model.turn(90),
+        # --- SIDE 3 ---
+        model.walk(20.8, MARKER_DOWN),
+        model.walk(3.0, MARKER_UP, backward=True),
+        model.turn(90),
+        # --- SIDE 4 ---
+        model.walk(22.4, MARKER_DOWN),
+    ]
 
 
-    start_time = time.time()
-    while time.time() - start_time < 0.7:
-        ser.write(WALK_BACKWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_UP)
-        time.sleep(0.05)
-    ser.write(BALANCE)
-    time.sleep(1.5)
+# The plans for an uncalibrated robot.
+TRIANGLE_PLAN = triangle_plan()
+SQUARE_PLAN = square_plan()
 
-    print("STEP 5: Marker UP, turning RIGHT 120°.")
-    ser.write(b'k vtR 100\n')
-    time.sleep(0.05)
-    ser.write(MARKER_UP)
-    time.sleep(6.0)
-    ser.write(BALANCE)
-    time.sleep(1.5)
 
-    # --- SIDE 3 ---
-    print("STEP 6: Marker DOWN, moving FORWARD for 2.6 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 2.6:
-        ser.write(WALK_FORWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_DOWN)
-        time.sleep(0.1)
-    ser.write(BALANCE)
-    time.sleep(1.5)
+def run_timed_triangle_sequence(ser, reader=None, on_step=None, turner=None, model=None):
+    """
+    Executes the triangle-drawing movement of triangle_plan(model).
+    With a running ImuReader the corners are closed-loop on the streamed yaw
+    and the forward walks hold their heading. on_step and turner are passed
+    to run_plan (the 120° corners never go to the firmware turner).
+    """
+    print("\n--- INFO: Starting triangle drawing sequence in 3 seconds... ---")
+    with phase("start delay", "delay"):
+        time.sleep(3)
 
-    print("STEP 7: Marker UP to finish.")
-    start_time = time.time()
-    while time.time() - start_time < 2.0:
-        ser.write(MARKER_UP)
-        time.sleep(0.1)
+    run_plan(ser, triangle_plan(model), reader=reader, on_step=on_step, heading_hold=True, turner=turner)
 
     print("\n--- INFO: Triangle drawing complete! ---")
-    time.sleep(1.0)
 
 
-def run_timed_square_sequence(ser):
-    
+def run_timed_square_sequence(ser, reader=None, on_step=None, turner=None, model=None):
+    """
+    Executes the square-drawing movement of square_plan(model).
+    With a running ImuReader the corners are closed-loop on the streamed yaw
+    and the forward walks hold their heading. on_step and turner are passed
+    to run_plan; with a FirmwareTurner the corners run on turn.h.
+    """
     print("\n--- INFO: Starting the continuous automated sequence in 3 seconds... ---")
-    time.sleep(3)
-
-    # Put Bittle in a known state (balanced) before starting.
-    print("ACTION: Balancing robot to start.")
-    ser.write(BALANCE)
-    time.sleep(2.0) # Give it time to get stable
+    with phase("start delay", "delay"):
+        time.sleep(3)
 
     print("--- SEQUENCE STARTING ---")
-
-    # --- Step 1: Marker DOWN only ---
-    print("STEP 1: Holding Marker DOWN for 2.60 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 2.0:
-        ser.write(MARKER_DOWN)
-        time.sleep(0.1)  # Continuously send the command
-    ser.write(BALANCE)
-    time.sleep(1.5)
-
-    # --- Step 2: Forward, marker down ---
-    print("STEP 2: Marker is DOWN, moving FORWARD for 2.60")
-    start_time = time.time()
-    while time.time() - start_time < 2.60:
-        ser.write(WALK_FORWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_DOWN)
-
-        time.sleep(0.1)  # Continuously send the command
-    ser.write(BALANCE)
-    time.sleep(1.5)
-
-
-    # --- Step 3: Backward, marker up ---
-    print("STEP 3: Marker is UP, moving BACKWARD for 0.6 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 0.6:
-        ser.write(WALK_BACKWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_UP)
-        time.sleep(0.05)
-    ser.write(BALANCE)
-    time.sleep(1.5)
-
-    # --- Step 4: Turn right, marker up ---
-    print("STEP 4: Marker is UP, turning RIGHT.")
-    start_time = time.time()
-    
-    ser.write(TURN_RIGHT_90)
-    time.sleep(0.05)
-    ser.write(MARKER_UP)
-    time.sleep(5)
-    ser.write(BALANCE)
-    time.sleep(1.5)
-
-    # --- Step 4: Forward, marker down ---
-    print("STEP 4: Marker DOWN, moving FORWARD for 3.40 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 2.60:
-        ser.write(WALK_FORWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_DOWN)
-        time.sleep(0.05)
-    ser.write(BALANCE)
-    time.sleep(1.5)
-
-    # --- Step 5: Backward, marker up ---
-    print("STEP 5: Marker UP, moving BACKWARD for 0.8 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 0.8:
-        ser.write(WALK_BACKWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_UP)
-        time.sleep(0.05)
-    ser.write(BALANCE)
-    time.sleep(1.5)
-
-    # --- Step 6: Turn right, marker up ---
-    print("STEP 6: Marker UP, turning RIGHT.")
-    ser.write(TURN_RIGHT_90)
-    time.sleep(0.05)
-    ser.write(MARKER_UP)
-    time.sleep(5)
-    ser.write(BALANCE)
-    time.sleep(1.5)
-
-
-    # --- Step 7: Forward, marker down ---
-    print("STEP 7: Marker DOWN, moving FORWARD for 2.60 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 2.60:
-        ser.write(WALK_FORWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_DOWN)
-        time.sleep(0.05)
-    ser.write(BALANCE)
-    time.sleep(1.5)
-
-    # --- Step 8: Backward, marker up ---
-    print("STEP 8: Marker UP, moving BACKWARD for 0.6 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 0.6:
-        ser.write(WALK_BACKWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_UP)
-        time.sleep(0.05)
-    ser.write(BALANCE)
-    time.sleep(1.5)
-
-    # --- Step 9: Turn right, marker up ---
-    print("STEP 9: Marker UP, turning RIGHT.")
-    ser.write(TURN_RIGHT_90)
-    time.sleep(0.05)
-    ser.write(MARKER_UP)
-    time.sleep(5)
-    ser.write(BALANCE)
-    time.sleep(1.5)
-
-
-    print("STEP 7: Marker DOWN, moving FORWARD for 2.8 seconds.")
-    start_time = time.time()
-    while time.time() - start_time < 2.80:
-        ser.write(WALK_FORWARD)
-        time.sleep(0.05)
-        ser.write(MARKER_DOWN)
-        time.sleep(0.05)
-    ser.write(BALANCE)
-    time.sleep(1.5)
+    run_plan(ser, square_plan(model), reader=reader, on_step=on_step, heading_hold=True, turner=turner)
 
     print("\n--- INFO: Automated drawing sequence complete! ---")
-    time.sleep(1) # Final pause before resting
 
 
 def main():
     """
     Main function to connect to Bittle and run the automated sequence.
     """
-    bittle_serial = connect_to_bittle()
+    parser = argparse.ArgumentParser(description="Draw a shape with the Bittle's marker.")
+    parser.add_argument("--shape", choices=["triangle", "square"], default="triangle", help="shape to draw")
+    parser.add_argument("--log", metavar="FILE", help="record the run to a telemetry log (see telemetryLog.py)")
+    parser.add_argument("--firmware-turns", action="store_true",
+                        help="run the 90° corners on the firmware's closed-loop turns (turn.h, see firmwareTurn.py)")
+    parser.add_argument("--robot", help="time the plan with this robot's stored calibration "
+                                        "(default: the robot on SERIAL_PORT)")
+    args = parser.parse_args()
+
+    from discovery import robot_name
+    model = load_model(args.robot or robot_name(SERIAL_PORT, "Bittle"))
+
+    with phase("connect", "connect"):
+        bittle_serial = connect_to_bittle()
 
     # Only proceed if the connection was successful
     if not bittle_serial:
         return
 
+    reader = ImuReader(bittle_serial).start()
+    # Times every command until the robot echoes it.
+    tracker = AckTracker(bittle_serial, reader)
+    # Optionally records every IMU frame, command and plan step for runAnalysis.py.
+    recorder = TelemetryRecorder(args.log).attach(reader) if args.log else None
+
     try:
         # Run the main sequence
-        #run_timed_square_sequence(bittle_serial)
-        run_timed_triangle_sequence(bittle_serial)
+        sequence = run_timed_square_sequence if args.shape == "square" else run_timed_triangle_sequence
+        link = RecordingSerial(tracker, recorder) if recorder else tracker
+        turner = FirmwareTurner(link, reader) if args.firmware_turns else None
+        sequence(link, reader, recorder.on_step if recorder else None, turner, model)
         
     finally:
         # This code will run no matter what, ensuring the robot is safely shut down.
         print("INFO: Putting Bittle to rest...")
+        tracker.print_report()
+        reader.stop()
         if bittle_serial and bittle_serial.is_open:
-            bittle_serial.write(REST)
-            time.sleep(0.5)
-            bittle_serial.close()
+            with phase("rest", "rest"):
+                bittle_serial.write(REST)
+                time.sleep(0.5)
+                bittle_serial.close()
             print("INFO: Serial port closed. Goodbye!")
+        if recorder:
+            recorder.close()
+            print(f"INFO: Telemetry recorded to {args.log}")
 
 # This makes the script runnable from the command line
 if __name__ == "__main__":
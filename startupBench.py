@@ -0,0 +1,169 @@
+# startupBench.py
+# Measures how long each script takes to start, in a fresh interpreter every
+# time, and checks that the serial-only path never pulls in the GUI
+# libraries. The path is the script's own code: import it, run its real
+# connect and sequence code, and stop at the first motion command it sends
+# once connected.
+#
+# serial.Serial is patched to return the simulated FakeBittle, so only our own
+# start-up cost is measured, not Bluetooth or the board's boot. Deliberate
+# waits (time.sleep on the thread that sends that command, such as the 3 s
+# start delay of the drawing scripts) are reported separately and not counted.
+#
+# Usage:
+#   python startupBench.py
+#   python startupBench.py --repeats 10 --check   # exit 1 if a script needs > 1 s
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# --- Benchmark Configuration ---
+SCRIPTS = ["shape", "rectangleWithEuler", "backRight", "turnoffbalance", "backwardsStraight", "fleet", "dxfPath"]
+REPEATS = 5
+BUDGET = 1.0              # Seconds the serial-only path is allowed to take
+HEAVY_MODULES = ("cv2", "numpy")
+RUN_TIMEOUT = 60.0        # Seconds before a script that never sends a command is given up on
+CONNECT_FUNCTIONS = ("connect_to_bittle", "prepare_robot")   # The first motion command after these return ends a run
+MOTION_TOKENS = (b'k', b'i', b'm')                            # Skills, gaits and joint moves; not init commands
+
+# Arguments main() is run with, so it takes the serial-only path (no window input).
+SCRIPT_ARGS = {
+    "backRight": ["--input", "socket", "--listen", "udp:127.0.0.1:0"],
+    "turnoffbalance": ["--input", "socket", "--listen", "udp:127.0.0.1:0"],
+    "fleet": ["--ports", "bench"],
+    "dxfPath": ["fence_final.dxf", "--fake"],
+}
+# Scripts whose main() always opens the GUI run their own connect and
+# sequence helpers instead.
+SCRIPT_RUNS = {
+    "backwardsStraight": ("backwardsStraight.SERIAL_PORT = 'bench'\n"
+                          "bittle = backwardsStraight.connect_to_bittle()\n"
+                          "backwardsStraight.backward_pattern(bittle, 0)"),
+}
+
+# Runs inside the fresh interpreter: import the script, patch the serial port
+# to a FakeBittle, run the script and report what it cost and what got
+# imported as soon as it sends its first motion command after connecting.
+SERIAL_ONLY_PATH = """
+import json, os, sys, threading, time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+import serial
+import fakeBittle
+
+slept = {{}}
+real_sleep = time.sleep
+def sleep(seconds):
+    thread = threading.get_ident()
+    slept[thread] = slept.get(thread, 0.0) + seconds
+    real_sleep(seconds)
+time.sleep = sleep
+
+connected = [not any(hasattr({module}, name) for name in {connect_functions!r})]
+def connected_after(function):
+    def wrapper(*args, **kwargs):
+        result = function(*args, **kwargs)
+        connected[0] = True
+        return result
+    return wrapper
+for name in {connect_functions!r}:
+    if hasattr({module}, name):
+        setattr({module}, name, connected_after(getattr({module}, name)))
+
+def report(**values):
+    values["heavy"] = [name for name in {heavy!r} if name in sys.modules]
+    os.write(1, (json.dumps(values) + "\\n").encode())
+    os._exit(0)
+
+class BenchBittle(fakeBittle.FakeBittle):
+    def write(self, data):
+        written = super().write(data)
+        if connected[0] and data[:1] in {motion_tokens!r}:
+            done = time.perf_counter()
+            waited = slept.get(threading.get_ident(), 0.0)
+            report(**{{"import": imported - started, "path": done - started - waited, "slept": waited}})
+        return written
+
+fakeBittle.FakeBittle = BenchBittle
+serial.Serial = lambda port=None, baudrate=115200, timeout=None, **kwargs: BenchBittle(
+    port=port or "bench", baudrate=baudrate, timeout=timeout or 0.1)
+{run}
+report(error="no motion command was sent after connecting")
+"""
+
+
+def script_run(module):
+    """The code that runs module's serial-only path: its main(), or its own helpers (SCRIPT_RUNS)."""
+    if module in SCRIPT_RUNS:
+        return SCRIPT_RUNS[module]
+    return f"sys.argv = {[module] + SCRIPT_ARGS.get(module, [])!r}\n{module}.main()"
+
+
+def measure(module, repeats=REPEATS):
+    """
+    Runs the serial-only path for module in a fresh interpreter repeats times.
+
+    Returns:
+        A dict with the median process wall time, in-process import time,
+        path time to the first command (without deliberate waits) and the
+        waits themselves (seconds), and the heavy modules that were imported.
+    """
+    code = SERIAL_ONLY_PATH.format(module=module, heavy=HEAVY_MODULES, connect_functions=CONNECT_FUNCTIONS,
+                                   motion_tokens=MOTION_TOKENS, run=script_run(module))
+    here = os.path.dirname(os.path.abspath(__file__))
+    walls, imports, paths, waits, heavy = [], [], [], [], set()
+    for _ in range(repeats):
+        start = time.perf_counter()
+        try:
+            result = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True,
+                                    timeout=RUN_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            return {"error": f"no command within {RUN_TIMEOUT:.0f}s"}
+        walls.append(time.perf_counter() - start)
+        if result.returncode != 0 or not result.stdout.strip():
+            return {"error": (result.stderr.strip().splitlines() or ["no output"])[-1]}
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        if "error" in report:
+            return {"error": report["error"]}
+        imports.append(report["import"])
+        paths.append(report["path"])
+        waits.append(report["slept"])
+        heavy.update(report["heavy"])
+    median = lambda values: sorted(values)[len(values) // 2]
+    return {"wall": median(walls), "import": median(imports), "path": median(paths), "slept": median(waits),
+            "heavy": sorted(heavy)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure script start-up time on the serial-only path.")
+    parser.add_argument("scripts", nargs="*", default=SCRIPTS, help="modules to measure")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="fresh interpreters per script")
+    parser.add_argument("--check", action="store_true",
+                        help=f"exit with status 1 if any script takes more than {BUDGET:.1f}s or imports {'/'.join(HEAVY_MODULES)}")
+    args = parser.parse_args()
+
+    print(f"\n--- STARTUP BENCHMARK (median of {args.repeats}, fresh interpreter each) ---")
+    print(f"  {'script':<20} {'process':>9} {'import':>9} {'1st cmd':>9} {'waits':>9}  heavy imports")
+    failed = False
+    for module in args.scripts:
+        result = measure(module, args.repeats)
+        if "error" in result:
+            print(f"  {module:<20} ERROR: {result['error']}")
+            failed = True
+            continue
+        heavy = ", ".join(result["heavy"]) or "none"
+        print(f"  {module:<20} {result['wall']:8.3f}s {result['import']:8.3f}s {result['path']:8.3f}s "
+              f"{result['slept']:8.3f}s  {heavy}")
+        if result["path"] > BUDGET or result["heavy"]:
+            failed = True
+    if args.check and failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+# telemetryLog.py
+# Records a run at the full IMU rate into a compact binary log instead of
+# printing it: every parsed IMU frame, every command sent and every state
+# change (plan step, teleop mode) becomes one fixed-width 48-byte record.
+#
+# The log is append-only, so a crash loses at most the last unflushed
+# records, and fixed-width, so it can be memory-mapped as a numpy structured
+# array (load_array) for vectorised analysis. A small index sidecar
+# (<log>.idx) holds the time of every INDEX_EVERY-th record so a time range
+# can be found without scanning the whole file.
+#
+# Usage:
+#   python telemetryLog.py run.tlog                    # summary of a log
+#   python telemetryLog.py run.tlog --csv run.csv      # export to CSV
+#   python telemetryLog.py run.tlog --csv turn.csv --start 12.5 --end 20
+
+import argparse
+import bisect
+import csv
+import os
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+# --- Log Format ---
+# t (time.monotonic() seconds), kind, text (command, state or firmware line,
+# NUL padded), then six values: yaw, pitch, roll, ax, ay, az for IMU frames,
+# and the details of state changes (see TelemetryRecorder.on_step).
+RECORD = struct.Struct('<dB15s6f')
+HEADER = struct.Struct('<8sHH')           # magic, version, record size; padded to one record
+MAGIC = b'BTLOG\x00\x00\x00'
+VERSION = 1
+INDEX_ENTRY = struct.Struct('<Qd')        # record number, t
+INDEX_SUFFIX = ".idx"
+INDEX_EVERY = 1024                        # One index entry per this many records
+
+# --- Record Kinds ---
+KIND_IMU = 1          # IMU frame accepted by the yaw filter
+KIND_IMU_REJECTED = 2 # IMU frame whose yaw the filter rejected (yaw is the last good value)
+KIND_COMMAND = 3      # Command written to the robot
+KIND_STATE = 4        # State change: text names it, the values field holds its details
+KIND_LINE = 5         # Any other line from the firmware (echoes, messages)
+KIND_NAMES = {KIND_IMU: "imu", KIND_IMU_REJECTED: "imu_rejected", KIND_COMMAND: "command",
+              KIND_STATE: "state", KIND_LINE: "line"}
+
+# --- Recorder Configuration ---
+FLUSH_BYTES = 64 * 1024   # Write the buffer out once it holds this much
+FLUSH_INTERVAL = 1.0      # ...or once this many seconds have passed
+EXPORT_CHUNK = 4096       # Records read at a time by the exporter
+
+Record = namedtuple('Record', ['t', 'kind', 'text', 'yaw', 'pitch', 'roll', 'ax', 'ay', 'az'])
+
+# numpy dtype matching RECORD, for np.memmap / np.fromfile.
+RECORD_DTYPE = [('t', '<f8'), ('kind', 'u1'), ('text', 'S15'), ('yaw', '<f4'), ('pitch', '<f4'),
+                ('roll', '<f4'), ('ax', '<f4'), ('ay', '<f4'), ('az', '<f4')]
+
+
+class TelemetryRecorder:
+    """
+    Appends records to a binary log from any thread.
+
+    Records are packed into an in-memory buffer and written in large blocks,
+    so recording costs a struct.pack per record rather than a print.
+
+    Args:
+        path: The log file. An existing log is appended to.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "ab")
+        self.index = open(path + INDEX_SUFFIX, "ab")
+        if new:
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size).ljust(RECORD.size, b'\x00'))
+            self.count = 0
+        else:
+            self.count = record_count(path)
+            # Drop a record torn by a crash so the appended ones stay aligned.
+            self.file.truncate(RECORD.size * (self.count + 1))
+        self.buffer = bytearray()
+        self.last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, kind, text=b'', values=(0.0,) * 6, t=None):
+        """Appends one record. text is bytes or str and is cut to 15 bytes."""
+        t = time.monotonic() if t is None else t
+        if isinstance(text, str):
+            text = text.encode(errors="ignore")
+        with self._lock:
+            if self.count % INDEX_EVERY == 0:
+                self.index.write(INDEX_ENTRY.pack(self.count, t))
+            self.buffer += RECORD.pack(t, kind, text, *values)
+            self.count += 1
+            if len(self.buffer) >= FLUSH_BYTES or t - self.last_flush >= FLUSH_INTERVAL:
+                self._flush(t)
+
+    def on_frame(self, frame):
+        """ImuReader frame listener: records one ImuFrame."""
+        self.record(KIND_IMU if frame.ok else KIND_IMU_REJECTED, b'',
+                    (frame.yaw, frame.pitch, frame.roll, frame.ax, frame.ay, frame.az), frame.t)
+
+    def on_line(self, line, t):
+        """ImuReader line listener: records a non-IMU firmware line."""
+        self.record(KIND_LINE, line, t=t)
+
+    def command(self, command):
+        self.record(KIND_COMMAND, command.strip())
+
+    def state(self, name, *values):
+        """Records a state change with up to six values, e.g. state("mode") or state("step", 3)."""
+        self.record(KIND_STATE, name, (tuple(values) + (0.0,) * 6)[:6])
+
+    def on_step(self, index, segment):
+        """
+        motionPlan.run_plan on_step callback. Records the step as state "walk",
+        "turn" or "hold" with values (index, turn angle or NaN, planned
+        duration), and the end of the plan as "done".
+        """
+        from motionPlan import segment_kind
+
+        if segment is None:
+            self.state("done", index)
+            return
+        angle = float('nan') if segment.angle is None else segment.angle
+        self.state(segment_kind(segment), index, angle, segment.duration)
+
+    def attach(self, reader):
+        """Records every frame and line an ImuReader reads."""
+        reader.add_frame_listener(self.on_frame)
+        reader.add_listener(self.on_line)
+        return self
+
+    def _flush(self, now):
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.index.flush()
+        self.buffer.clear()
+        self.last_flush = now
+
+    def flush(self):
+        with self._lock:
+            self._flush(time.monotonic())
+
+    def close(self):
+        with self._lock:
+            if self.file.closed:
+                return
+            self._flush(time.monotonic())
+            self.file.close()
+            self.index.close()
+
+
+class RecordingSerial:
+    """
+    Wraps a serial connection and records every command written through it.
+    Everything else is forwarded to the connection, as with CommandWriter.
+    """
+
+    def __init__(self, ser, recorder):
+        self.ser = ser
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self.ser, name)
+
+    def write(self, data):
+        written = self.ser.write(data)
+        for command in data.split(b'\n'):
+            if command.strip():
+                self.recorder.command(command)
+        return written
+
+
+def record_count(path):
+    """Returns the number of complete records in a log (a torn last record is ignored)."""
+    with open(path, "rb") as log:
+        magic, version, size = HEADER.unpack(log.read(HEADER.size))
+    if magic != MAGIC or size != RECORD.size:
+        raise ValueError(f"{path} is not a telemetry log (or was written by another version)")
+    return (os.path.getsize(path) - RECORD.size) // RECORD.size
+
+
+def _unpack(raw):
+    t, kind, text, *values = raw
+    return Record(t, kind, text.rstrip(b'\x00').decode(errors="ignore"), *values)
+
+
+def iter_records(path, start=0, stop=None):
+    """Yields the Records numbered start up to (not including) stop, oldest first."""
+    stop = record_count(path) if stop is None else min(stop, record_count(path))
+    with open(path, "rb") as log:
+        log.seek(RECORD.size * (start + 1))
+        position = start
+        while position < stop:
+            chunk = log.read(RECORD.size * min(EXPORT_CHUNK, stop - position))
+            if not chunk:
+                break
+            for raw in RECORD.iter_unpack(chunk[:len(chunk) - len(chunk) % RECORD.size]):
+                yield _unpack(raw)
+            position += len(chunk) // RECORD.size
+
+
+def find_record(path, t):
+    """
+    Returns the number of the first record at or after time t, using the
+    index to skip straight to the right block.
+    """
+    starts = []
+    times = []
+    try:
+        with open(path + INDEX_SUFFIX, "rb") as index:
+            for number, entry_time in INDEX_ENTRY.iter_unpack(index.read()):
+                starts.append(number)
+                times.append(entry_time)
+    except OSError:
+        pass
+    block = bisect.bisect_right(times, t) - 1
+    first = starts[block] if block >= 0 else 0
+    for offset, record in enumerate(iter_records(path, first)):
+        if record.t >= t:
+            return first + offset
+    return record_count(path)
+
+
+def load_array(path):
+    """
+    Memory-maps the log as a numpy structured array with the fields of
+    RECORD_DTYPE. Nothing is read until the array is used.
+    """
+    import numpy as np
+
+    return np.memmap(path, dtype=np.dtype(RECORD_DTYPE), mode="r", offset=RECORD.size,
+                     shape=(record_count(path),))
+
+
+def export_csv(path, out, start_time=None, end_time=None):
+    """
+    Writes the records (optionally only those between start_time and
+    end_time, in seconds from the first record) to a CSV file.
+
+    Returns:
+        The number of rows written.
+    """
+    first = next(iter_records(path, 0, 1), None)
+    if first is None:
+        return 0
+    start = find_record(path, first.t + start_time) if start_time is not None else 0
+    stop = find_record(path, first.t + end_time) if end_time is not None else None
+    rows = 0
+    with open(out, "w", newline="") as target:
+        writer = csv.writer(target)
+        writer.writerow(["time", "kind", "text", "yaw", "pitch", "roll", "ax", "ay", "az"])
+        for record in iter_records(path, start, stop):
+            writer.writerow([f"{record.t - first.t:.4f}", KIND_NAMES.get(record.kind, record.kind), record.text]
+                            + [f"{value:.3f}" for value in record[3:]])
+            rows += 1
+    return rows
+
+
+def print_summary(path):
+    counts = {}
+    first = last = None
+    for record in iter_records(path):
+        counts[record.kind] = counts.get(record.kind, 0) + 1
+        first = record.t if first is None else first
+        last = record.t
+    print(f"\n--- TELEMETRY LOG {path} ---")
+    if first is None:
+        print("  (empty)")
+        return
+    duration = last - first
+    print(f"  records   {sum(counts.values())} ({os.path.getsize(path) / 1024:.0f} KiB) over {duration:.1f}s")
+    for kind, count in sorted(counts.items()):
+        print(f"  {KIND_NAMES.get(kind, kind):<13} {count:>8}")
+    imu = counts.get(KIND_IMU, 0) + counts.get(KIND_IMU_REJECTED, 0)
+    if duration > 0:
+        print(f"  IMU rate  {imu / duration:.1f} Hz")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise or export a binary telemetry log.")
+    parser.add_argument("log", help="log written by TelemetryRecorder")
+    parser.add_argument("--csv", metavar="FILE", help="export the records to a CSV file")
+    parser.add_argument("--start", type=float, help="export from this many seconds into the log")
+    parser.add_argument("--end", type=float, help="export up to this many seconds into the log")
+    args = parser.parse_args()
+
+    try:
+        if args.csv:
+            rows = export_csv(args.log, args.csv, args.start, args.end)
+            print(f"INFO: Wrote {rows} rows to {args.csv}")
+        else:
+            print_summary(args.log)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
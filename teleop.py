@@ -0,0 +1,215 @@
+# teleop.py
+# The keyboard driver shared by backRight.py and turnoffbalance.py, built
+# around a single scheduler instead of nested blocking loops.
+#
+# Reading keys, re-sending the current movement command and stepping through
+# the backward pattern are independent timed events. Nothing ever sleeps for
+# longer than KEY_POLL_INTERVAL, so a key press reaches the robot within one
+# poll in every mode, including in the middle of the backward pattern.
+
+import heapq
+import itertools
+import time
+
+# --- COMMANDS ---
+WALK_GAIT = b'kwk\n'
+WALK_BACKWARD = b'kbk\n'
+SPIN_LEFT = b'kcrL\n'
+BALANCE = b'kbalance\n'
+WALK_FORWARD = b'kwkF\n'
+SPIN_RIGHT = b'kcrR\n'
+REST = b'd\n'
+HEAD_UP = b'm0 -45\n'
+HEAD_DOWN = b'm0 45\n'
+HEAD_CENTER = b'm0 0\n'
+
+# --- Driver Timing (seconds) ---
+KEY_POLL_INTERVAL = 0.01     # Longest wait between two looks at the keyboard
+MODE_RESEND_INTERVAL = 0.1   # A held movement re-offers its command this often (the CommandWriter dedups it)
+GAIT_RESET_DELAY = 0.1       # Pause after switching back to the walk gait in the backward pattern
+LINK_STALE_AFTER = 0.5       # No IMU frame for this long means the link is down
+
+# Key -> movement mode
+KEY_MODES = {ord('w'): 'forward', ord('s'): 'backward', ord('a'): 'spin_left', ord('d'): 'spin_right'}
+# Movement mode -> (command held while in that mode, name for the log)
+MODE_COMMANDS = {
+    'forward': (WALK_FORWARD, "WALK_FORWARD"),
+    'spin_left': (SPIN_LEFT, "SPIN_LEFT"),
+    'spin_right': (SPIN_RIGHT, "SPIN_RIGHT"),
+}
+# Key -> (head command, name for the log); these never change the movement mode
+HEAD_KEYS = {ord('i'): (HEAD_UP, "HEAD_UP"), ord('k'): (HEAD_DOWN, "HEAD_DOWN"), ord('h'): (HEAD_CENTER, "HEAD_CENTER")}
+KEY_STOP = 32  # space
+KEY_QUIT = ord('q')
+NO_KEY = 0xFF
+
+
+class Scheduler:
+    """
+    A minimal single-threaded timer queue on time.monotonic().
+
+    Callbacks run from run_pending() on the caller's thread, in due order, so
+    they never race with each other or with the key handling.
+    """
+
+    def __init__(self):
+        self.queue = []
+        self.counter = itertools.count()
+        self.cancelled = set()
+
+    def call_at(self, when, callback):
+        """Schedules callback() at the given monotonic time. Returns a handle for cancel()."""
+        handle = next(self.counter)
+        heapq.heappush(self.queue, (when, handle, callback))
+        return handle
+
+    def call_later(self, delay, callback):
+        return self.call_at(time.monotonic() + delay, callback)
+
+    def cancel(self, handle):
+        if handle is not None:
+            self.cancelled.add(handle)
+
+    def next_due(self):
+        """Returns the time of the next pending callback, or None."""
+        while self.queue and self.queue[0][1] in self.cancelled:
+            self.cancelled.discard(heapq.heappop(self.queue)[1])
+        return self.queue[0][0] if self.queue else None
+
+    def run_pending(self, now=None):
+        """Runs every callback that is due."""
+        now = time.monotonic() if now is None else now
+        while True:
+            due = self.next_due()
+            if due is None or due > now:
+                return
+            _, handle, callback = heapq.heappop(self.queue)
+            callback()
+
+
+class TeleopDriver:
+    """
+    The state machine behind the teleop window.
+
+    handle_key() reacts to one key at once; everything that has to happen
+    later (keep-alives, pattern steps) is put on the scheduler.
+
+    Args:
+        bittle: The serial connection (normally wrapped in a CommandWriter).
+        pattern: The backward pattern, a list of (kind, command, duration,
+            message) steps as in the scripts' BACKWARD_PATTERN. After a
+            "backward" step the walk gait is restored, as before.
+        log: Function used to print the action log.
+        reader: Optional running ImuReader on the same connection; the age
+            of its newest frame is the link status the HUD shows.
+    """
+
+    def __init__(self, bittle, pattern, log=print, scheduler=None, reader=None):
+        self.bittle = bittle
+        self.pattern = pattern
+        self.log = log
+        self.scheduler = scheduler or Scheduler()
+        self.reader = reader
+        self.mode = None
+        self.mode_started = None
+        self.pending = None        # Handle of the next scheduled event for the current mode
+        self.pattern_step = 0
+        self.running = True
+
+    def link_age(self, now=None):
+        """Seconds since the newest IMU frame arrived, or None if there is no reader or no frame yet."""
+        frame = self.reader.latest() if self.reader is not None else None
+        if frame is None:
+            return None
+        return (time.monotonic() if now is None else now) - frame.t
+
+    def send(self, command, message):
+        """Writes a command and logs it, unless the CommandWriter suppressed it as a duplicate."""
+        if self.bittle.write(command):
+            self.log(message)
+
+    def handle_key(self, key):
+        """Reacts to one key press. Returns False once the driver should quit."""
+        if key == NO_KEY:
+            return self.running
+        new_mode = KEY_MODES.get(key)
+        if new_mode and new_mode != self.mode:
+            self.set_mode(new_mode)
+        elif key in HEAD_KEYS:
+            command, name = HEAD_KEYS[key]
+            self.send(command, f"Sent: {name}")
+        elif key == KEY_STOP:
+            self.set_mode(None)
+            self.send(BALANCE, "Sent: BALANCE (stop)")
+        elif key == KEY_QUIT:
+            self.set_mode(None)
+            self.log("Quit and rest")
+            self.running = False
+        return self.running
+
+    def set_mode(self, mode):
+        """Switches movement mode, stopping the old mode's timer and events."""
+        if self.mode is not None:
+            elapsed = time.monotonic() - self.mode_started
+            self.log(f"'{self.mode.replace('_', ' ')}' command lasted for {elapsed:.2f} seconds.")
+        self.scheduler.cancel(self.pending)
+        self.pending = None
+        self.mode = mode
+        if mode is None:
+            return
+        self.mode_started = time.monotonic()
+        self.log(f"Timer started for '{mode.replace('_', ' ')}'.")
+        if mode == 'backward':
+            self.pattern_step = 0
+            self._pattern_tick()
+        else:
+            self._hold_tick()
+
+    def _hold_tick(self):
+        # Offers the held mode's command now and again every MODE_RESEND_INTERVAL.
+        command, name = MODE_COMMANDS[self.mode]
+        if self.bittle.write(command):
+            self.log(f"Sent: {name}")
+        self.pending = self.scheduler.call_later(MODE_RESEND_INTERVAL, self._hold_tick)
+
+    def _pattern_tick(self):
+        # Runs one step of the backward pattern and schedules the next; the
+        # pattern starts over when it reaches the end, as long as the mode lasts.
+        kind, command, duration, message = self.pattern[self.pattern_step]
+        self.send(command, message)
+        self.pattern_step = (self.pattern_step + 1) % len(self.pattern)
+        if kind == "backward":
+            self.pending = self.scheduler.call_later(duration, self._restore_gait)
+        else:
+            self.pending = self.scheduler.call_later(duration, self._pattern_tick)
+
+    def _restore_gait(self):
+        self.send(WALK_GAIT, "Set Gait: WALK")
+        self.pending = self.scheduler.call_later(GAIT_RESET_DELAY, self._pattern_tick)
+
+
+def run_teleop(driver, poll_key, draw=None):
+    """
+    Runs the driver until it quits.
+
+    Args:
+        driver: A TeleopDriver.
+        poll_key: poll_key() returning the pressed key code or NO_KEY without
+            blocking for long (e.g. cv2.waitKey(1) & 0xFF).
+        draw: Optional draw() called once per loop to refresh the window.
+    """
+    scheduler = driver.scheduler
+    while driver.running:
+        if draw:
+            draw()
+        if not driver.handle_key(poll_key()):
+            break
+        scheduler.run_pending()
+        # Sleep until the next event, but never so long that a key waits.
+        wake = time.monotonic() + KEY_POLL_INTERVAL
+        due = scheduler.next_due()
+        if due is not None:
+            wake = min(wake, due)
+        remaining = wake - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
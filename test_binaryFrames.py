@@ -0,0 +1,99 @@
+# test_binaryFrames.py
+# Round-trip checks for the binary IMU frames: encode_imu_frame output must
+# come back out of split_stream intact, damaged frames must be dropped and
+# counted without losing the frames after them, and partial frames must wait
+# for the rest of their bytes.
+#
+# Usage:
+#   python -m pytest test_binaryFrames.py
+
+import struct
+
+from binaryFrames import (FRAME_HEADER, IMU_FRAME, MAX_PAYLOAD, SYNC, ImuSample, encode_frame,
+                          encode_imu_frame, split_stream)
+
+
+def sample(index):
+    """An ImuSample whose values survive the float32 round trip exactly."""
+    return ImuSample(1000 + 5 * index, 0.25, -0.5, 9.75, float(index % 360), 1.5, -0.75)
+
+
+def frames(count, first=0):
+    return b''.join(encode_imu_frame(*sample(index)) for index in range(first, first + count))
+
+
+def test_run_of_frames_round_trips():
+    items, rest, errors = split_stream(frames(50))
+    assert items == [sample(index) for index in range(50)]
+    assert rest == b''
+    assert errors == 0
+
+
+def test_single_frame_takes_the_general_path():
+    # A frame of another type is skipped; the IMU frame after it still decodes.
+    data = encode_frame(2, b'\x01\x02\x03') + encode_imu_frame(*sample(0))
+    items, rest, errors = split_stream(data)
+    assert items == [sample(0)]
+    assert (rest, errors) == (b'', 0)
+
+
+def test_bad_crc_is_dropped_and_the_stream_resyncs():
+    data = bytearray(frames(3))
+    data[IMU_FRAME.size + 10] ^= 0xFF          # Corrupt the payload of the second frame
+    items, rest, errors = split_stream(bytes(data))
+    assert items == [sample(0), sample(2)]
+    assert (rest, errors) == (b'', 1)
+
+
+def test_bad_crc_outside_a_run_resyncs():
+    bad = bytearray(encode_frame(2, b'abc'))
+    bad[-1] ^= 0xFF
+    items, rest, errors = split_stream(bytes(bad) + b'Ready!\n' + frames(1))
+    # The damaged bytes are left as noise in front of the next text line.
+    assert items[0].endswith(b'Ready!')
+    assert items[1:] == [sample(0)]
+    assert (rest, errors) == (b'', 1)
+
+
+def test_frame_cut_mid_header_waits_for_the_rest():
+    data = frames(2)
+    cut = IMU_FRAME.size + FRAME_HEADER.size - 1
+    items, rest, errors = split_stream(data[:cut])
+    assert items == [sample(0)]
+    assert rest == data[IMU_FRAME.size:cut]
+    assert errors == 0
+
+    items, rest, errors = split_stream(rest + data[cut:])
+    assert items == [sample(1)]
+    assert (rest, errors) == (b'', 0)
+
+
+def test_frame_cut_mid_payload_waits_for_the_rest():
+    data = frames(1)
+    for cut in range(1, len(data)):
+        items, rest, errors = split_stream(data[:cut])
+        assert (items, rest, errors) == ([], data[:cut], 0)
+        assert split_stream(rest + data[cut:]) == ([sample(0)], b'', 0)
+
+
+def test_text_mixed_with_frames_keeps_stream_order():
+    data = (b'Ready!\n' + frames(2) + b'k\nICM:\t0.01 0.02 9.80 10.00 0.00 0.00\n'
+            + frames(1, first=2) + b'Plan done\n' + frames(1, first=3)[:7])
+    items, rest, errors = split_stream(data)
+    assert items == [b'Ready!', sample(0), sample(1), b'k', b'ICM:\t0.01 0.02 9.80 10.00 0.00 0.00',
+                     sample(2), b'Plan done']
+    assert rest == frames(1, first=3)[:7]
+    assert errors == 0
+
+
+def test_text_without_newline_stays_pending():
+    items, rest, errors = split_stream(b'Left turn comp')
+    assert (items, rest, errors) == ([], b'Left turn comp', 0)
+
+
+def test_oversized_length_is_noise():
+    noise = SYNC + struct.pack('<BB', MAX_PAYLOAD + 1, 1) + b'\x00' * 4
+    items, rest, errors = split_stream(noise + frames(1))
+    assert items[-1] == sample(0)
+    assert errors == 1
+    assert rest == b''
@@ -0,0 +1,108 @@
+# test_dxfPath.py
+# Checks the DXF stroke optimiser on small hand-built drawings whose merged
+# segments, chained polylines and drawing order are known.
+#
+# Usage:
+#   python -m pytest test_dxfPath.py
+
+import math
+import random
+
+import pytest
+
+from dxfPath import chain_segments, merge_collinear, order_strokes
+
+
+def rounded(points, digits=6):
+    """Rounds a polyline (or segment) so trig round-off does not matter in comparisons."""
+    return [(round(x, digits) + 0.0, round(y, digits) + 0.0) for x, y in points]
+
+
+def segment_set(segments):
+    """Segments as a set of undirected, rounded endpoint pairs."""
+    return {tuple(sorted(rounded(segment))) for segment in segments}
+
+
+def travel(strokes, start=(0.0, 0.0)):
+    """Pen-up distance walked between strokes."""
+    total = 0.0
+    position = start
+    for points in strokes:
+        total += math.dist(position, points[0])
+        position = points[-1]
+    return total
+
+
+def test_merge_overlapping_and_touching_pieces():
+    lines = [((0, 0), (2, 0)), ((3, 0), (1, 0)), ((3, 0), (5, 0)), ((7, 0), (8, 0))]
+    assert segment_set(merge_collinear(lines)) == {((0, 0), (5, 0)), ((7, 0), (8, 0))}
+
+
+def test_merge_keeps_parallel_and_crossing_lines_apart():
+    lines = [((0, 0), (4, 0)), ((0, 1), (4, 1)), ((2, -1), (2, 2)), ((0, 0), (3, 3)), ((3, 3), (4, 4))]
+    assert segment_set(merge_collinear(lines)) == {
+        ((0, 0), (4, 0)), ((0, 1), (4, 1)), ((2, -1), (2, 2)), ((0, 0), (4, 4))}
+
+
+def test_merge_drops_zero_length_lines():
+    assert merge_collinear([((1, 1), (1, 1)), ((2, 2), (2.001, 2))]) == []
+
+
+def test_chain_joins_a_scrambled_square_into_one_loop():
+    square = [((1, 1), (0, 1)), ((0, 0), (1, 0)), ((0, 1), (0, 0)), ((1, 0), (1, 1))]
+    polylines = chain_segments(square)
+    assert len(polylines) == 1
+    loop = rounded(polylines[0])
+    assert len(loop) == 5 and loop[0] == loop[-1]
+    assert set(loop) == {(0, 0), (1, 0), (1, 1), (0, 1)}
+
+
+def test_chain_starts_at_a_loose_end_and_goes_straight_through_junctions():
+    # A plus sign: both bars are passed straight through the centre.
+    plus = [((0, 0), (1, 0)), ((1, 0), (2, 0)), ((1, -1), (1, 0)), ((1, 0), (1, 1))]
+    polylines = sorted(rounded(points) for points in chain_segments(plus))
+    assert len(polylines) == 2
+    for points in polylines:
+        assert len(points) == 3
+        assert points[1] == (1, 0)
+        assert points[0][0] == points[2][0] or points[0][1] == points[2][1]
+
+    # An open path is one polyline from one end to the other.
+    path = [((2, 0), (2, 1)), ((0, 0), (1, 0)), ((2, 0), (1, 0))]
+    assert [rounded(points) for points in chain_segments(path)] in (
+        [[(0, 0), (1, 0), (2, 0), (2, 1)]], [[(2, 1), (2, 0), (1, 0), (0, 0)]])
+
+
+def test_order_visits_strokes_nearest_first_and_flips_them():
+    strokes = [[(10, 0), (11, 0)], [(6, 0), (5, 0)], [(1, 0), (2, 0)]]
+    assert order_strokes(strokes) == [[(1, 0), (2, 0)], [(5, 0), (6, 0)], [(10, 0), (11, 0)]]
+
+
+def test_order_enters_a_closed_loop_at_its_nearest_corner():
+    loop = [(5, 5), (6, 5), (6, 6), (5, 6), (5, 5)]
+    (ordered,) = order_strokes([loop], start=(7, 7))
+    assert ordered[0] == ordered[-1] == (6, 6)
+    assert len(ordered) == 5 and set(ordered) == set(loop)
+
+
+def test_two_opt_fixes_a_greedy_detour():
+    # Nearest-neighbour goes to the stroke at x=1 first and has to come back
+    # past the start; 2-opt reverses the run and saves the trip back.
+    strokes = [[(1, 0), (1, 1)], [(-1.5, 0), (-1.5, 1)], [(-3, 0), (-3, 1)], [(4, 0), (4, 1)]]
+    greedy = order_strokes(strokes, passes=0)
+    optimised = order_strokes(strokes)
+    assert travel(optimised) < travel(greedy) - 1e-9
+    assert sorted(map(sorted, optimised)) == sorted(map(sorted, strokes))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_two_opt_never_lengthens_the_tour(seed):
+    rng = random.Random(seed)
+    strokes = []
+    for _ in range(12):
+        x, y = rng.uniform(0, 50), rng.uniform(0, 50)
+        strokes.append([(x, y), (x + rng.uniform(-5, 5), y + rng.uniform(-5, 5))])
+    greedy = order_strokes(strokes, passes=0)
+    optimised = order_strokes(strokes)
+    assert travel(optimised) <= travel(greedy) + 1e-9
+    assert sorted(map(sorted, optimised)) == sorted(map(sorted, strokes))
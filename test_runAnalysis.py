@@ -0,0 +1,59 @@
+# test_runAnalysis.py
+# Records shape.py's square plan on a simulated robot, the way
+# `shape.py --shape square --log FILE` does on a real one, and checks that
+# runAnalysis.py measures its turns, drift and timing from the log.
+#
+# Usage:
+#   python -m pytest test_runAnalysis.py
+
+import math
+
+import numpy as np
+
+from connection import prepare_connection
+from fakeBittle import FakeBittle
+from imuReader import ImuReader
+from motionPlan import run_plan, segment_kind
+from runAnalysis import analyse_run
+from shape import SQUARE_PLAN
+from telemetryLog import RecordingSerial, TelemetryRecorder
+
+TIME_SCALE = 0.3       # Shortens the walks and holds so the test runs in seconds
+TURN_TOLERANCE = 6.0   # Degrees; the closed-loop turns stop within a few degrees
+
+
+def record_square(path):
+    """Runs a shortened SQUARE_PLAN on a FakeBittle, recording it to path. Returns the plan."""
+    plan = [segment if segment_kind(segment) == "turn" else segment._replace(duration=segment.duration * TIME_SCALE)
+            for segment in SQUARE_PLAN]
+    bittle = FakeBittle(timeout=0.1, seed=1)
+    prepare_connection(bittle)
+    reader = ImuReader(bittle).start()
+    recorder = TelemetryRecorder(path).attach(reader)
+    try:
+        run_plan(RecordingSerial(bittle, recorder), plan, settle=0.3, reader=reader, on_step=recorder.on_step)
+    finally:
+        reader.stop()
+        bittle.close()
+        recorder.close()
+    return plan
+
+
+def test_recorded_square_is_analysed(tmp_path):
+    path = str(tmp_path / "square.tlog")
+    plan = record_square(path)
+    result = analyse_run(path)
+
+    kinds = [segment_kind(segment) for segment in plan]
+    assert result['steps'] == len(plan)
+    assert result['frames'] > 0
+
+    # Three right turns of 90°, each measured close to its target.
+    assert result['turn_target'].tolist() == [90.0] * kinds.count("turn")
+    assert np.all(np.abs(result['turn_error']) < TURN_TOLERANCE)
+    assert result['turn_max_abs_error'] < TURN_TOLERANCE
+
+    # The simulated walks do not drift, and every walk is timed.
+    assert result['drift'].size == kinds.count("walk")
+    assert np.all(np.abs(result['drift']) < 1.0)
+    assert not any(math.isnan(value) for value in result['planned'])
@@ -0,0 +1,77 @@
+# test_yawFilter.py
+# Checks the yaw outlier filter on the spikes recorded in yawOutputs.txt and
+# on synthetic turns: spikes must not end a turn early, the 0/360 wrap must
+# not look like a spike, and real rotation must pass through untouched.
+#
+# Usage:
+#   python -m pytest test_yawFilter.py
+
+from turnControl import TurnTracker, wrap_degrees
+from yawFilter import YawFilter
+from yawReplay import load_trials, replay
+
+RATE = 20.0            # Samples per second, as in yawOutputs.txt
+TURN_RATE = 45.0       # Degrees per second of the in-place turn gait
+
+
+def feed(yaws, rate=RATE):
+    """Runs yaws through a fresh YawFilter. Returns the list of (yaw, ok)."""
+    yaw_filter = YawFilter()
+    return [yaw_filter.update(yaw, index / rate) for index, yaw in enumerate(yaws)]
+
+
+def steady_turn(start, degrees, rate=RATE, turn_rate=TURN_RATE):
+    """The yaw samples of a clean turn by degrees from start, in [0, 360)."""
+    steps = int(abs(degrees) / turn_rate * rate)
+    step = degrees / steps
+    return [(start + step * index) % 360 for index in range(steps + 1)]
+
+
+def test_recorded_spikes_cause_no_false_completions():
+    trials = load_trials("yawOutputs.txt")
+    results = replay(trials, repeats=1)
+    # The raw log does end turns early on its spikes; the filter must not.
+    assert results["raw"]["false_completions"] > 0
+    assert results["filtered"]["false_completions"] == 0
+    assert results["filtered"]["missed"] == 0
+
+
+def test_recorded_spike_is_rejected():
+    # The 202.6 -> 107.9 -> 202.6 jump at the start of yawOutputs.txt.
+    results = feed([202.6] * 5 + [202.7] * 5 + [107.9, 107.9] + [202.7] * 5)
+    assert [ok for _, ok in results[10:12]] == [False, False]
+    assert all(yaw == 202.7 for yaw, _ in results[10:12])
+    assert all(ok for _, ok in results[12:])
+
+
+def test_turn_across_wraparound_passes_through():
+    for start, degrees in ((330.0, 60.0), (20.0, -60.0), (179.0, 90.0), (181.0, -90.0)):
+        yaws = steady_turn(start, degrees)
+        results = feed(yaws)
+        assert all(ok for _, ok in results), (start, degrees)
+        assert [yaw for yaw, _ in results] == yaws
+
+
+def test_spike_at_wraparound_is_rejected():
+    yaws = steady_turn(340.0, 40.0)
+    middle = len(yaws) // 2
+    yaws[middle] = (yaws[middle] + 180.0) % 360
+    results = feed(yaws)
+    assert not results[middle][1]
+    assert all(ok for index, (_, ok) in enumerate(results) if index != middle)
+
+
+def test_real_turn_completes_on_time():
+    for degrees in (90.0, -90.0, 120.0):
+        yaws = steady_turn(200.0, degrees)
+        tracker = TurnTracker(degrees)
+        done = next(index for index, (yaw, ok) in enumerate(feed(yaws)) if tracker.update(yaw, ok))
+        assert done >= len(yaws) - 3
+        assert abs(wrap_degrees(yaws[done] - yaws[0]) - degrees) <= tracker.tolerance
+
+
+def test_real_discontinuity_reanchors():
+    # A jump that persists (e.g. the IMU re-zeroing) is taken after a window of samples.
+    results = feed([10.0] * 10 + [250.0] * 10)
+    assert not results[10][1]
+    assert results[-1] == (250.0, True)
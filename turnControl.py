@@ -0,0 +1,123 @@
+# turnControl.py
+# Closed-loop turns on the host: keep the in-place turn gait running and watch
+# the streamed yaw until the robot has actually rotated by the requested angle.
+
+import time
+
+from commandWriter import CommandWriter
+from imuReader import get_yaw_from_bittle
+from profiling import phase
+from yawFilter import wrap_degrees
+
+# --- Command Definitions ---
+TURN_LEFT_IN_PLACE = b'kvtL\n'
+TURN_RIGHT_IN_PLACE = b'kvtR\n'
+BALANCE = b'kbalance\n'   # Command to stop current movement and stand still
+
+# --- Turn Configuration ---
+TURN_TOLERANCE = 4.0      # Stop when within this many degrees of the target
+TURN_TIMEOUT = 15.0       # Give up (and balance) after this many seconds
+POLL_INTERVAL = 0.02      # How often the yaw stream is checked, in seconds
+FIRST_SAMPLE_WAIT = 0.5   # How long to wait for a yaw reading before turning
+
+
+class TurnTracker:
+    """
+    Follows the progress of a turn from a stream of yaw samples.
+
+    Positive angles are right (clockwise) turns, in which the yaw increases;
+    this matches the sign used by checkTurnProgress in turn.h. Consecutive
+    samples are unwrapped, so turns across the 0/360 boundary and turns of
+    more than 180 degrees are tracked correctly. Samples flagged as unreliable
+    by the yaw filter are skipped.
+    """
+
+    def __init__(self, degrees, tolerance=TURN_TOLERANCE):
+        self.target = degrees
+        self.tolerance = tolerance
+        self.start_yaw = None
+        self.last_yaw = None
+        self.turned = 0.0
+
+    def update(self, yaw, ok=True):
+        """Feeds one yaw sample in. Returns True once the turn is complete."""
+        if not ok:
+            return self.done()
+        if self.last_yaw is None:
+            self.start_yaw = yaw
+        else:
+            self.turned += wrap_degrees(yaw - self.last_yaw)
+        self.last_yaw = yaw
+        return self.done()
+
+    def remaining(self):
+        return self.target - self.turned
+
+    def done(self):
+        """The turn is complete within tolerance of the target, or past it."""
+        if self.last_yaw is None:
+            return False
+        if self.target >= 0:
+            return self.turned >= self.target - self.tolerance
+        return self.turned <= self.target + self.tolerance
+
+
+def turn_by(ser, reader, degrees, tolerance=TURN_TOLERANCE, timeout=TURN_TIMEOUT):
+    """
+    Turns in place by the given angle using the IMU yaw streamed by reader.
+
+    The in-place turn gait is started and kept alive until the yaw has changed
+    by the requested amount (within tolerance), then the robot is balanced.
+    Every frame that arrived since the last check is fed to the tracker, so
+    nothing is missed between polls.
+
+    Args:
+        ser: The active serial connection to the Bittle (or a CommandWriter).
+        reader: A running ImuReader on the same connection.
+        degrees: Angle to turn; positive turns right, negative turns left.
+        tolerance: Allowed error at the end of the turn, in degrees.
+        timeout: Maximum time to spend turning, in seconds.
+
+    Returns:
+        The angle actually turned in degrees, or None if no yaw was available
+        (the robot is not moved in that case).
+    """
+    with phase("closed-loop turn", "turn", degrees=degrees):
+        return _turn_by(ser, reader, degrees, tolerance, timeout)
+
+
+def _turn_by(ser, reader, degrees, tolerance, timeout):
+    deadline = time.monotonic() + FIRST_SAMPLE_WAIT
+    while get_yaw_from_bittle(reader) is None and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+    seq = reader.ring.count
+    start_yaw = get_yaw_from_bittle(reader)
+    if start_yaw is None:
+        print("WARNING: No yaw reading available, cannot run a closed-loop turn.")
+        return None
+    if not isinstance(ser, CommandWriter):
+        ser = CommandWriter(ser)
+
+    tracker = TurnTracker(degrees, tolerance)
+    tracker.update(start_yaw)
+    command = TURN_RIGHT_IN_PLACE if degrees >= 0 else TURN_LEFT_IN_PLACE
+    direction = "RIGHT" if degrees >= 0 else "LEFT"
+    print(f"ACTION: Turning {direction} {abs(degrees):.0f}° from yaw {start_yaw:.1f}°...")
+
+    start_time = time.monotonic()
+    deadline = start_time + timeout
+    while not tracker.done() and time.monotonic() < deadline:
+        ser.write(command)
+        time.sleep(POLL_INTERVAL)
+        frames, seq = reader.ring.since(seq)
+        for frame in frames:
+            if tracker.update(frame.yaw, frame.ok):
+                break
+    ser.write(BALANCE)
+
+    elapsed = time.monotonic() - start_time
+    if tracker.done():
+        print(f"INFO: Turned {tracker.turned:.1f}° in {elapsed:.2f}s.")
+    else:
+        print(f"WARNING: Turn timed out after {elapsed:.2f}s, turned {tracker.turned:.1f}° of {degrees:.0f}°.")
+    return tracker.turned
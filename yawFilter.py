@@ -0,0 +1,114 @@
+# yawFilter.py
+# Streaming outlier rejection for the IMU yaw. The raw stream (see
+# yawOutputs.txt) has single-sample jumps such as 202.6 -> 13.3 -> 202.6 that
+# would otherwise end a closed-loop turn early.
+
+from collections import deque
+
+# --- Filter Configuration ---
+FILTER_WINDOW = 5          # Samples in the median window (odd, kept small)
+HAMPEL_THRESHOLD = 3.0     # Allowed distance from the window median, in scaled MADs
+HAMPEL_MIN_DEVIATION = 10.0  # Never treat samples this close to the median as outliers (degrees)
+MAX_YAW_RATE = 180.0       # Fastest believable rotation, degrees per second
+MAX_YAW_STEP = 10.0        # Jump always allowed between samples, whatever their spacing
+MAD_SCALE = 1.4826         # Makes the MAD a consistent estimate of the standard deviation
+
+
+def wrap_degrees(angle):
+    """Wraps an angle difference into [-180, 180)."""
+    return (angle + 180.0) % 360.0 - 180.0
+
+
+def _median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return 0.5 * (ordered[middle - 1] + ordered[middle])
+
+
+class YawFilter:
+    """
+    A constant-time Hampel filter on a circular quantity, with rate gating.
+
+    Each sample is compared with two references:
+
+    * the last accepted yaw - the jump from it must be no larger than
+      MAX_YAW_STEP plus MAX_YAW_RATE times the time since it was accepted;
+    * the median of the last FILTER_WINDOW raw samples - the sample must be
+      within HAMPEL_THRESHOLD scaled MADs (and at least HAMPEL_MIN_DEVIATION
+      degrees) of it. The window is taken as offsets from the last accepted
+      yaw, so the 0/360 wrap does not matter, and is detrended with the median
+      step of recently accepted samples, so a steady turn does not inflate the
+      MAD and let spikes through.
+
+    A sample within HAMPEL_MIN_DEVIATION of where the last accepted yaw and
+    that trend predict only has to pass the rate gate, so the stream snaps
+    back as soon as a burst of glitches ends.
+
+    If a full window of samples in a row is rejected and they agree with each
+    other, the filter re-anchors on them, so a bad first sample or a real
+    discontinuity cannot lock it out.
+
+    update() returns (yaw, ok). For a rejected sample yaw is the last accepted
+    value and ok is False, so callers can hold their estimate and skip it.
+    """
+
+    def __init__(self, window=FILTER_WINDOW, threshold=HAMPEL_THRESHOLD,
+                 min_deviation=HAMPEL_MIN_DEVIATION, max_rate=MAX_YAW_RATE, max_step=MAX_YAW_STEP):
+        self.samples = deque(maxlen=window)
+        self.steps = deque(maxlen=window)  # Per-sample yaw change of accepted samples
+        self.window = window
+        self.threshold = threshold
+        self.min_deviation = min_deviation
+        self.max_rate = max_rate
+        self.max_step = max_step
+        self.last_yaw = None
+        self.last_time = None
+        self.rejected_run = 0
+        self.accepted = 0
+        self.rejected = 0
+
+    def reset(self):
+        self.samples.clear()
+        self.steps.clear()
+        self.last_yaw = None
+        self.last_time = None
+        self.rejected_run = 0
+
+    def update(self, yaw, t):
+        """Feeds one raw yaw sample (degrees) taken at time t (seconds)."""
+        self.samples.append(yaw)
+        if self.last_yaw is None:
+            return self._accept(yaw, t)
+
+        trend = _median(self.steps) if self.steps else 0.0
+        newest = len(self.samples) - 1
+        offsets = [wrap_degrees(sample - self.last_yaw) + trend * (newest - index)
+                   for index, sample in enumerate(self.samples)]
+        offset = offsets[-1]
+        median = _median(offsets)
+        mad = _median([abs(value - median) for value in offsets])
+        agrees_with_median = (len(offsets) < 3
+                              or abs(offset - median) <= max(self.threshold * MAD_SCALE * mad, self.min_deviation))
+        within_rate = abs(offset) <= self.max_step + self.max_rate * max(t - self.last_time, 0.0)
+        # Where the last accepted yaw plus the recent trend says this sample should be.
+        follows_trend = abs(offset - trend * (self.rejected_run + 1)) <= self.min_deviation
+
+        if within_rate and (follows_trend or agrees_with_median):
+            return self._accept(yaw, t)
+        self.rejected_run += 1
+        if self.rejected_run >= self.window and agrees_with_median and mad <= self.min_deviation:
+            self.steps.clear()
+            return self._accept(yaw, t)
+        self.rejected += 1
+        return self.last_yaw, False
+
+    def _accept(self, yaw, t):
+        if self.last_yaw is not None:
+            self.steps.append(wrap_degrees(yaw - self.last_yaw) / (self.rejected_run + 1))
+        self.accepted += 1
+        self.rejected_run = 0
+        self.last_yaw = yaw
+        self.last_time = t
+        return yaw, True
@@ -0,0 +1,187 @@
+# yawReplay.py
+# Replays recorded yaw logs through the host-side yaw parsing, filtering and
+# turn-termination code, faster than real time and without a robot.
+#
+# Usage:
+#   python yawReplay.py yawOutputs.txt
+#   python yawReplay.py capture.txt --turn -90 --rate 50 --check
+#
+# Two log formats are understood:
+#   * the turn debug output, e.g. "Yaw: 202.6° → Target: 292.6° (Δ=-90.0°)";
+#     every run of lines with the same target after an "ACTION: Turning"
+#     line is one turn trial
+#   * raw serial captures with "ICM:"/"MCU:" lines; the whole capture is one
+#     trial and the requested turn comes from --turn
+
+import argparse
+import re
+import sys
+import time
+from array import array
+
+from imuReader import parse_imu_line
+from turnControl import TurnTracker, TURN_TOLERANCE, wrap_degrees
+from yawFilter import YawFilter
+
+# --- Replay Configuration ---
+SAMPLE_RATE = 20.0    # Assumed IMU rate of the log (Hz), used for filter timestamps
+REFERENCE_WINDOW = 9  # Centred median window used to build the reference yaw
+REPEATS = 20          # Each trial is replayed this many times when timing
+
+YAW_LOG_LINE = re.compile(r"Yaw:\s*(-?[\d.]+)°?\s*→\s*Target:\s*(-?[\d.]+)")
+
+
+def load_trials(path, turn=None):
+    """
+    Parses a log into a list of (yaw array, requested turn in degrees) trials.
+    """
+    trials = []
+    yaws = array('d')
+    target = None
+    raw_yaws = array('d')
+
+    def finish():
+        if len(yaws):
+            trials.append((yaws, wrap_degrees(target - yaws[0]) if turn is None else turn))
+
+    with open(path, encoding="utf-8", errors="ignore") as log:
+        for line in log:
+            line = line.strip()
+            if line.startswith("ACTION: Turning"):
+                # A new turn starts, even if it has the same target as the last one.
+                finish()
+                yaws = array('d')
+                target = None
+                continue
+            match = YAW_LOG_LINE.search(line)
+            if match:
+                line_target = float(match.group(2))
+                if target is not None and line_target != target:
+                    finish()
+                    yaws = array('d')
+                target = line_target
+                yaws.append(float(match.group(1)) % 360)
+                continue
+            values = parse_imu_line(line)
+            if values is not None:
+                raw_yaws.append(values[0])
+    finish()
+    if len(raw_yaws):
+        trials.append((raw_yaws, 90.0 if turn is None else turn))
+    return trials
+
+
+def reference_completion(yaws, degrees, tolerance):
+    """
+    Returns the sample index at which the turn really completed, judged from a
+    centred (non-causal) circular median of the log, or None if it did not
+    complete. This is the ground truth the live decision is compared against.
+    The last REFERENCE_WINDOW // 2 samples have no look-ahead and are not
+    judged.
+    """
+    half = REFERENCE_WINDOW // 2
+    tracker = TurnTracker(degrees, tolerance)
+    for index in range(len(yaws) - half):
+        window = yaws[max(0, index - half):index + half + 1]
+        offsets = sorted(wrap_degrees(value - yaws[index]) for value in window)
+        if tracker.update((yaws[index] + offsets[len(offsets) // 2]) % 360):
+            return index
+    return None
+
+
+def decide(lines, degrees, tolerance, use_filter, period):
+    """
+    Runs one trial through the live pipeline: parse_imu_line, the optional
+    YawFilter, then TurnTracker. Returns the index of the sample on which the
+    turn was declared complete, or None.
+    """
+    yaw_filter = YawFilter() if use_filter else None
+    tracker = TurnTracker(degrees, tolerance)
+    for index, line in enumerate(lines):
+        yaw = parse_imu_line(line)[0]
+        ok = True
+        if yaw_filter is not None:
+            yaw, ok = yaw_filter.update(yaw, index * period)
+        if tracker.update(yaw, ok):
+            return index
+    return None
+
+
+def replay(trials, tolerance=TURN_TOLERANCE, rate=SAMPLE_RATE, repeats=REPEATS):
+    """
+    Replays every trial through the unfiltered and the filtered pipeline.
+
+    Returns a dict per pipeline with the total samples, the time they took,
+    false completions, missed completions, decisions that fell in the
+    unjudged tail of a log, and decision latencies in samples.
+    """
+    period = 1.0 / rate
+    results = {}
+    for name, use_filter in (("raw", False), ("filtered", True)):
+        stats = {"samples": 0, "seconds": 0.0, "false_completions": 0, "missed": 0, "undetermined": 0,
+                 "latencies": []}
+        for yaws, degrees in trials:
+            # Feed the production parser the same text the firmware would send.
+            lines = [f"ICM: 0.0 0.0 0.0 {yaw:.2f} 0.0 0.0" for yaw in yaws]
+            truth = reference_completion(yaws, degrees, tolerance)
+
+            start = time.perf_counter()
+            for _ in range(repeats):
+                decision = decide(lines, degrees, tolerance, use_filter, period)
+            stats["seconds"] += time.perf_counter() - start
+            stats["samples"] += len(lines) * repeats
+
+            if decision is None:
+                if truth is not None:
+                    stats["missed"] += 1
+            elif truth is None and decision >= len(yaws) - REFERENCE_WINDOW // 2:
+                stats["undetermined"] += 1
+            elif truth is None or decision < truth:
+                stats["false_completions"] += 1
+            else:
+                stats["latencies"].append(decision - truth)
+        results[name] = stats
+    return results
+
+
+def print_report(results, trial_count, rate):
+    print(f"\n--- YAW REPLAY REPORT ({trial_count} trial(s), {rate:.0f} Hz assumed) ---")
+    for name, stats in results.items():
+        throughput = stats["samples"] / stats["seconds"] if stats["seconds"] else 0.0
+        latencies = sorted(stats["latencies"])
+        if latencies:
+            median = latencies[len(latencies) // 2]
+            latency = f"{median} samples ({1000.0 * median / rate:.0f} ms) median, {latencies[-1]} max"
+        else:
+            latency = "n/a"
+        print(f"  {name:<9} throughput {throughput:10.0f} samples/s | "
+              f"false completions {stats['false_completions']} | missed {stats['missed']} | "
+              f"unjudged {stats['undetermined']} | decision latency {latency}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay yaw logs through the turn logic without a robot.")
+    parser.add_argument("logs", nargs="+", help="yawOutputs.txt-style logs or raw ICM:/MCU: captures")
+    parser.add_argument("--turn", type=float, help="requested turn in degrees (default: from the log, or 90)")
+    parser.add_argument("--tolerance", type=float, default=TURN_TOLERANCE, help="turn tolerance in degrees")
+    parser.add_argument("--rate", type=float, default=SAMPLE_RATE, help="IMU sample rate of the logs (Hz)")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="replays per trial when timing")
+    parser.add_argument("--check", action="store_true",
+                        help="exit with status 1 if the filtered pipeline completes a turn falsely")
+    args = parser.parse_args()
+
+    trials = []
+    for path in args.logs:
+        trials.extend(load_trials(path, args.turn))
+    if not trials:
+        print("ERROR: No yaw samples found in the given logs.")
+        sys.exit(2)
+
+    results = replay(trials, args.tolerance, args.rate, args.repeats)
+    print_report(results, len(trials), args.rate)
+    if args.check and results["filtered"]["false_completions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()